@@ -7,6 +7,7 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 import models, schemas, database
+from cache import LocalCache
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -16,7 +17,15 @@ SECRET_KEY = os.getenv("SECRET_KEY", "supersecretkey") # Change this in producti
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
+# Authenticated users are cached per process for this long. Changes made
+# through this process invalidate at once; other workers see them once
+# their entry expires.
+AUTH_CACHE_TTL = int(os.getenv("AUTH_CACHE_TTL", "30"))
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "1024"))
+
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
+# Same, for endpoints that also serve anonymous requests
+oauth2_scheme_optional = OAuth2PasswordBearer(tokenUrl="login", auto_error=False)
 
 # --- SHA-256 with Salt Manual Implementation ---
 
@@ -43,22 +52,107 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(database.get_db)):
-    credentials_exception = HTTPException(
+class AuthUser:
+    """Detached copy of the User columns authenticated endpoints read."""
+
+    __slots__ = ("id", "username", "email", "is_active", "created_at", "preferred_subreddit")
+
+    def __init__(self, user: models.User):
+        for field in self.__slots__:
+            setattr(self, field, getattr(user, field))
+
+
+_user_cache = LocalCache(maxsize=AUTH_CACHE_SIZE)
+
+
+def _cache_keys(user_id: Optional[int], username: Optional[str]) -> list:
+    keys = []
+    if user_id is not None:
+        keys.append(f"id:{user_id}")
+    if username is not None:
+        keys.append(f"name:{username}")
+    return keys
+
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+
+def _decode_token(token: str) -> tuple:
+    """(user id, username) from the token; tokens issued before "uid" was added have no id."""
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username: str = payload.get("sub")
         if username is None:
-            raise credentials_exception
+            raise _credentials_exception()
         token_data = schemas.TokenData(username=username)
     except JWTError:
-        raise credentials_exception
-    
-    user = db.query(models.User).filter(models.User.username == token_data.username).first()
+        raise _credentials_exception()
+    user_id = payload.get("uid")
+    return (user_id if isinstance(user_id, int) else None), token_data.username
+
+
+def _load_user(db: Session, user_id: Optional[int], username: str) -> Optional[models.User]:
+    if user_id is not None:
+        user = db.get(models.User, user_id)
+        # Ids are never reused for another name, but do not trust a mismatch
+        return user if user is not None and user.username == username else None
+    return db.query(models.User).filter(models.User.username == username).first()
+
+
+def remember_user(user: models.User):
+    """Cache a snapshot of user, e.g. right after changing and committing it."""
+    cached = AuthUser(user)
+    for key in _cache_keys(user.id, user.username):
+        _user_cache.set(key, cached, AUTH_CACHE_TTL)
+
+
+def invalidate_user(user_id: Optional[int] = None, username: Optional[str] = None):
+    for key in _cache_keys(user_id, username):
+        _user_cache.delete(key)
+
+
+async def get_current_user(token: str = Depends(oauth2_scheme)) -> AuthUser:
+    """
+    The authenticated user as an AuthUser snapshot. Served from the user
+    cache, so most requests authenticate without a database round trip;
+    use get_current_user_fresh when the endpoint needs the live row.
+    """
+    return _cached_user(token)
+
+
+async def get_optional_user(token: Optional[str] = Depends(oauth2_scheme_optional)) -> Optional[AuthUser]:
+    """get_current_user, or None for requests without a token. A bad token is still a 401."""
+    return _cached_user(token) if token else None
+
+
+def _cached_user(token: str) -> AuthUser:
+    user_id, username = _decode_token(token)
+    key = _cache_keys(user_id, None if user_id is not None else username)[0]
+    user = _user_cache.get(key)
+    if user is not None and user.username == username:
+        return user
+
+    db = database.SessionLocal()
+    try:
+        row = _load_user(db, user_id, username)
+        if row is None:
+            raise _credentials_exception()
+        remember_user(row)
+        return AuthUser(row)
+    finally:
+        db.close()
+
+
+async def get_current_user_fresh(token: str = Depends(oauth2_scheme), db: Session = Depends(database.get_db)) -> models.User:
+    """The authenticated user's row, loaded by primary key in the request's session."""
+    user_id, username = _decode_token(token)
+    user = _load_user(db, user_id, username)
     if user is None:
-        raise credentials_exception
+        invalidate_user(user_id, username)
+        raise _credentials_exception()
     return user
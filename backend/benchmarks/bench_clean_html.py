@@ -0,0 +1,88 @@
+"""
+Summary sanitizing benchmark: BeautifulSoup-based clean_html vs sanitize.html_to_text.
+
+Run from backend/:  python -m benchmarks.bench_clean_html [--rounds N]
+"""
+import argparse
+import random
+import timeit
+import warnings
+
+from bs4 import BeautifulSoup, MarkupResemblesLocatorWarning
+
+import sanitize
+
+warnings.filterwarnings("ignore", category=MarkupResemblesLocatorWarning)
+
+
+def legacy_clean_html(text: str) -> str:
+    """feeds.clean_html before sanitize.py, kept verbatim for comparison."""
+    if not text:
+        return ""
+    soup = BeautifulSoup(text, "html.parser")
+    return soup.get_text(separator=" ", strip=True)[:500]
+
+
+_WORDS = (
+    "kernel latency compiler release rust python postgres cache outage patch security "
+    "browser startup model database cluster benchmark open source developer"
+).split()
+
+
+def _sentence(rng: random.Random) -> str:
+    words = [rng.choice(_WORDS) for _ in range(rng.randint(8, 20))]
+    text = " ".join(words).capitalize()
+    return text.replace(" cache ", " cache &amp; ").replace(" release ", " release &#8212; ") + "."
+
+
+def _short_summary(rng: random.Random) -> str:
+    """RSS <description>: a line or two with a link, like Slashdot or Techmeme."""
+    return (
+        f'<p>{_sentence(rng)} <a href="https://example.com/story?id={rng.randint(1, 99999)}&amp;src=rss">'
+        f"Read more</a>&nbsp;&raquo;</p>"
+    )
+
+
+def _long_body(rng: random.Random) -> str:
+    """content:encoded article body, like Ars Technica, Medium or HackerNoon."""
+    parts = ['<figure><img src="https://cdn.example.com/hero.jpg" alt="hero"/><figcaption>'
+             f"{_sentence(rng)}</figcaption></figure>"]
+    for _ in range(rng.randint(25, 60)):
+        kind = rng.random()
+        if kind < 0.6:
+            parts.append(f"<p>{_sentence(rng)} <em>{_sentence(rng)}</em> <a href=\"/x\">{_sentence(rng)}</a></p>")
+        elif kind < 0.75:
+            parts.append(f"<h2 id=\"s{rng.randint(1, 99)}\">{_sentence(rng)}</h2>")
+        elif kind < 0.9:
+            parts.append("<pre><code>def f(x):\n    return x &lt; 10 &amp;&amp; x &gt; 2\n</code></pre>")
+        else:
+            parts.append('<script type="text/javascript">window.dataLayer = window.dataLayer || [];</script>')
+    parts.append('<img src="https://medium.com/_/stat?event=post.clientViewed" width="1" height="1" alt=""/>')
+    return "\n".join(parts)
+
+
+def build_corpus(seed: int = 42):
+    rng = random.Random(seed)
+    short_feed = [_short_summary(rng) for _ in range(30)]
+    long_feed = [_long_body(rng) for _ in range(30)]
+    return {"short descriptions": short_feed, "content:encoded bodies": long_feed}
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--rounds", type=int, default=20, help="feeds processed per measurement")
+    args = ap.parse_args()
+
+    corpus = build_corpus()
+    print(f"{'feed (30 entries)':<26}{'avg KB':>8}{'legacy ms':>11}{'new ms':>9}{'speedup':>9}")
+    for label, feed in corpus.items():
+        for text in feed:
+            assert sanitize.html_to_text(text) == legacy_clean_html(text), text[:80]
+        legacy = timeit.timeit(lambda: [legacy_clean_html(t) for t in feed], number=args.rounds) / args.rounds
+        new = timeit.timeit(lambda: sanitize.html_to_text_batch(feed), number=args.rounds) / args.rounds
+        avg_kb = sum(len(t) for t in feed) / len(feed) / 1024
+        print(f"{label:<26}{avg_kb:>8.1f}{legacy * 1e3:>11.2f}{new * 1e3:>9.2f}{legacy / new:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
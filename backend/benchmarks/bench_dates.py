@@ -0,0 +1,117 @@
+"""
+Date parsing benchmark: the original feeds.parse_datetime chain vs dates.DateParser.
+
+Run from backend/:  python -m benchmarks.bench_dates [--rounds N]
+"""
+import argparse
+import timeit
+from datetime import datetime, timezone
+
+import dates
+
+# Timestamps in the shapes our sources actually send, keyed by source name
+CORPUS = {
+    "Hacker News": [  # converted from Unix time in fetch_hackernews
+        "2024-05-01T14:05:12+00:00", "2024-05-01T13:58:40+00:00", "2024-05-01T12:11:03+00:00",
+    ],
+    "Reddit": [
+        "2024-05-01T09:44:51+00:00", "2024-05-01T08:02:17+00:00", "2024-04-30T23:15:00+00:00",
+    ],
+    "Lobste.rs": [
+        "2024-05-01T10:22:33.000-05:00", "2024-05-01T08:47:09.000-05:00", "2024-04-30T19:03:55.000-05:00",
+    ],
+    "DEV.to": [
+        "2024-05-01T14:12:45Z", "2024-05-01T13:00:00Z", "2024-05-01T11:37:21Z",
+    ],
+    "Product Hunt": [
+        "2024-05-01T07:01:00Z", "2024-05-01T07:01:00Z", "2024-04-30T07:01:00Z",
+    ],
+    "Ars Technica": [
+        "Wed, 01 May 2024 14:05:12 +0000", "Wed, 01 May 2024 12:30:44 +0000", "Tue, 30 Apr 2024 21:10:09 +0000",
+    ],
+    "Slashdot": [
+        "2024-05-01T14:05:00+00:00", "2024-05-01T13:25:00+00:00", "2024-05-01T11:45:00+00:00",
+    ],
+    "Techmeme": [
+        "Wed, 01 May 2024 10:05:00 -0400", "Wed, 01 May 2024 09:35:00 -0400", "Wed, 01 May 2024 08:50:00 -0400",
+    ],
+    "The Changelog": [
+        "Wed, 01 May 2024 18:00:00 +0000", "Mon, 29 Apr 2024 20:15:00 +0000", "Fri, 26 Apr 2024 16:00:00 +0000",
+    ],
+    "Tech Blog": [
+        "Wed, 01 May 2024 18:00:47 GMT", "Tue, 23 Apr 2024 17:31:02 GMT", "Mon, 15 Apr 2024 22:01:10 GMT",
+    ],
+    "HackerNoon": [
+        "Wed, 01 May 2024 15:00:06 GMT", "Wed, 01 May 2024 14:30:09 GMT", "Wed, 01 May 2024 14:00:11 GMT",
+    ],
+}
+
+
+def legacy_parse_datetime(date_str: str) -> datetime:
+    """The chain feeds.parse_datetime used before dates.py, kept verbatim for comparison."""
+    if not date_str:
+        return datetime.min.replace(tzinfo=timezone.utc)
+    try:
+        if 'T' in date_str:
+            if date_str.endswith('Z'):
+                date_str = date_str[:-1] + '+00:00'
+            return datetime.fromisoformat(date_str.replace('Z', '+00:00'))
+        from email.utils import parsedate_to_datetime
+        try:
+            return parsedate_to_datetime(date_str)
+        except:  # noqa: E722
+            pass
+        try:
+            from dateutil import parser
+            return parser.parse(date_str)
+        except:  # noqa: E722
+            pass
+    except:  # noqa: E722
+        pass
+    return datetime.min.replace(tzinfo=timezone.utc)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--rounds", type=int, default=200, help="passes over the corpus per measurement")
+    args = ap.parse_args()
+
+    # Simulate a refresh: every source's items parsed once per request
+    pairs = [(source, value) for source, values in CORPUS.items() for value in values] * 15
+    n = len(pairs) * args.rounds
+
+    # Same instants from both implementations, except where the legacy chain
+    # gives up: any RSS date containing a "T" ("Tue", "Thu", "GMT") was sent
+    # down the ISO branch only and came back as datetime.min
+    legacy_misses = set()
+    for source, value in pairs:
+        parsed, old = dates.parse(value, source), legacy_parse_datetime(value)
+        if parsed != old:
+            assert old == dates.EPOCH_MIN and parsed is not None, value
+            legacy_misses.add(value)
+
+    legacy = timeit.timeit(lambda: [legacy_parse_datetime(v) for _, v in pairs], number=args.rounds)
+
+    def cold():
+        parser = dates.DateParser()
+        for source, value in pairs:
+            parser.parse(value, source)
+
+    # Cold: fresh parser each round, so only the format memory helps
+    cold_time = timeit.timeit(cold, number=args.rounds)
+
+    warm_parser = dates.DateParser()
+    warm_time = timeit.timeit(lambda: [warm_parser.parse(v, s) for s, v in pairs], number=args.rounds)
+
+    print(f"{n} parses over {len(CORPUS)} sources")
+    print(f"{'implementation':<28}{'us/parse':>10}{'speedup':>10}")
+    for label, total in (("legacy parse_datetime", legacy), ("DateParser (cold memo)", cold_time),
+                         ("DateParser (warm memo)", warm_time)):
+        print(f"{label:<28}{total / n * 1e6:>10.2f}{legacy / total:>9.1f}x")
+    print(f"winning formats: {warm_parser.winning_formats()}")
+    if legacy_misses:
+        print(f"legacy chain failed to parse {len(legacy_misses)} distinct strings, e.g. {sorted(legacy_misses)[0]!r}")
+
+
+if __name__ == "__main__":
+    main()
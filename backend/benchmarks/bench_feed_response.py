@@ -0,0 +1,97 @@
+"""
+Feed response benchmark: the cache-hit work behind GET /feeds before and after
+serving cached snapshot bodies as raw bytes.
+
+Run from backend/:  python -m benchmarks.bench_feed_response [--rounds N]
+"""
+import argparse
+import json
+import random
+import timeit
+
+from fastapi.responses import JSONResponse, Response
+from fastapi.utils import create_response_field
+
+import fastjson
+import feeds
+import schemas
+from cache import LocalCache
+
+SOURCES = ["Hacker News", "Reddit", "Lobste.rs", "Techmeme", "Ars Technica", "Slashdot", "GitHub Trending",
+           "Product Hunt", "The Changelog", "Tech Blog", "DEV.to", "HackerNoon"]
+
+
+def build_raw_payloads(seed: int = 7) -> dict:
+    """Per-source raw cache entries as _dump_records writes them (as Redis returns them: str)."""
+    rng = random.Random(seed)
+    words = "rust kernel latency postgres python release outage compiler cache browser model".split()
+    payloads = {}
+    for name in SOURCES:
+        records = []
+        for i in range(25):
+            summary = " ".join(rng.choice(words) for _ in range(rng.randint(20, 70)))
+            records.append(feeds.FeedRecord.from_dict({
+                "title": f"{name}: {' '.join(rng.choice(words) for _ in range(8))}",
+                "link": f"https://example.com/{name.replace(' ', '')}/{i}",
+                "source": name,
+                "published": f"2024-05-01T{rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:00+00:00",
+                "summary": f"⬆ {rng.randint(1, 900)} points | {summary}"[:500],
+                "extra": {"score": rng.randint(1, 900), "comments": rng.randint(0, 300)} if i % 2 else None,
+            }, name))
+        payloads[name] = json.dumps([r.to_dict(internal=True) for r in records])
+    return payloads
+
+
+def legacy_hit(payloads: dict, field) -> bytes:
+    """Before: decode every cached source, re-sort, then response_model validation and JSONResponse."""
+    items = []
+    for payload in payloads.values():
+        items.extend([feeds.FeedRecord.from_dict(it) for it in json.loads(payload)][:15])
+    content = [it.to_dict() for it in feeds.sort_items(items, "hot")]
+    value, errors = field.validate(content, {}, loc=("response",))
+    assert not errors
+    return JSONResponse(field.serialize(value)).body
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--rounds", type=int, default=200, help="requests simulated per measurement")
+    args = ap.parse_args()
+
+    payloads = build_raw_payloads()
+    field = create_response_field(name="response", type_=list[schemas.FeedItemResponse])
+
+    # After: the view key and snapshot body are two cache reads, the body is sent as-is
+    reference = legacy_hit(payloads, field)
+    local = LocalCache()
+    local.set("feed:view:all:*:hot", "0123456789abcdef", 60)
+    local.set("feed:snapshot:0123456789abcdef", fastjson.dumps(json.loads(reference)), 900)
+
+    def fast_hit() -> bytes:
+        snapshot_id = local.get("feed:view:all:*:hot")
+        return Response(local.get(f"feed:snapshot:{snapshot_id}"), media_type="application/json").body
+
+    assert json.loads(fast_hit()) == json.loads(reference)
+
+    records = [feeds.FeedRecord.from_dict(it) for it in json.loads(next(iter(payloads.values())))] * 12
+    dicts = [r.to_dict(internal=True) for r in records]
+    encoded = json.dumps(dicts)
+
+    rows = [
+        ("GET /feeds cache hit", timeit.timeit(lambda: legacy_hit(payloads, field), number=args.rounds),
+         timeit.timeit(fast_hit, number=args.rounds)),
+        ("raw cache encode (miss)", timeit.timeit(lambda: json.dumps(dicts), number=args.rounds),
+         timeit.timeit(lambda: fastjson.dumps(dicts), number=args.rounds)),
+        ("raw cache decode", timeit.timeit(lambda: json.loads(encoded), number=args.rounds),
+         timeit.timeit(lambda: fastjson.loads(encoded), number=args.rounds)),
+    ]
+    print(f"{len(SOURCES)} sources, {len(json.loads(reference))} items, {len(reference) / 1024:.0f} KB body, "
+          f"encoder: {fastjson.ENGINE}")
+    print(f"{'path':<26}{'before us':>11}{'after us':>10}{'speedup':>9}")
+    for label, before, after in rows:
+        print(f"{label:<26}{before / args.rounds * 1e6:>11.1f}{after / args.rounds * 1e6:>10.1f}"
+              f"{before / after:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
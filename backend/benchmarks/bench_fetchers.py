@@ -0,0 +1,178 @@
+"""
+Fetcher benchmark suite, offline: per-fetcher parse throughput and end-to-end
+GET /feeds latency against the replay stub in benchmarks/stub_upstream.py.
+
+Parse throughput runs every source's fetcher with the stub mounted in process
+(no sockets, no latency), so it measures parsing and normalization only. The
+end-to-end part serves the stub over HTTP with the given latency and drives
+the app through TestClient with a throwaway SQLite database and the
+in-process cache:
+
+- cold: every cache emptied, all sources fetched
+- rebuild: another sort of the same sources, from the cached raw items
+- warm: a repeated request, served from the cached snapshot
+
+Save a run with --json and pass it to --compare on a later commit to see the change.
+
+Run from backend/:  python -m benchmarks.bench_fetchers [--rounds N] [--requests N] [--json FILE] [--compare FILE]
+"""
+import argparse
+import json
+import os
+import subprocess
+import tempfile
+import time
+
+import feeds
+import health
+import http_client
+from seeds import SOURCES
+from benchmarks.stub_upstream import Faults, Fixtures, StubAdapter, StubServer, SyntheticUpstreams
+
+def reset_fetch_state():
+    """Forget everything that lets a fetcher skip work on a repeat fetch."""
+    feeds._validators.clear()
+    feeds._hn_item_cache.clear()
+    feeds._last_good.clear()
+    health.registry = health.HealthRegistry()
+
+
+def percentile(samples, pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def bench_parse(fixtures: Fixtures, rounds: int) -> dict:
+    """Per source: mean ms per fetch and items per second, with no network in the way."""
+    session = http_client.client.session
+    adapters = dict(session.adapters)
+    upstream, http_client.client.upstream = http_client.client.upstream, None
+    adapter = StubAdapter(fixtures)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    results = {}
+    try:
+        for source in SOURCES:
+            reset_fetch_state()
+            feeds.fetch_feed_for_source(source)  # Warm imports and fixture generation
+            elapsed, count = 0.0, 0
+            for _ in range(rounds):
+                reset_fetch_state()
+                start = time.perf_counter()
+                count = len(feeds.fetch_feed_for_source(source))
+                elapsed += time.perf_counter() - start
+            ms = elapsed / rounds * 1000
+            results[source["name"]] = {"items": count, "ms": round(ms, 3),
+                                       "items_per_s": round(count / (ms / 1000)) if ms else 0}
+    finally:
+        session.adapters.clear()
+        session.adapters.update(adapters)
+        http_client.client.upstream = upstream
+    return results
+
+
+def bench_feeds(fixtures: Fixtures, faults: Faults, requests_count: int) -> dict:
+    """Cold, rebuild and warm GET /feeds latency percentiles through the stub server."""
+    os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp(prefix='bench-feeds-')}/bench.db"
+    os.environ["INGEST_ENABLED"] = "0"
+    os.environ.pop("REDIS_URL", None)
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    from fastapi.testclient import TestClient
+    import main
+
+    samples = {"cold": [], "rebuild": [], "warm": []}
+    session = http_client.client.session
+    adapters = dict(session.adapters)
+    # Every upstream is one host now: give it the keep-alive sockets the real hosts would have between them
+    session.mount("http://", http_client.CountingAdapter(
+        http_client.client.stats, pool_maxsize=http_client.HTTP_POOL_MAXSIZE * len(SOURCES)))
+    with StubServer(fixtures, faults) as stub:
+        upstream, http_client.client.upstream = http_client.client.upstream, stub.url
+        try:
+            with TestClient(main.app) as client:  # Runs the app's startup: schema and sources
+                for _ in range(requests_count):
+                    reset_fetch_state()
+                    main.feed_cache.local.clear()
+                    main._snapshots.clear()
+                    for phase, params in (("cold", {}), ("rebuild", {"sort": "new"}), ("warm", {})):
+                        start = time.perf_counter()
+                        resp = client.get("/feeds", params=params)
+                        samples[phase].append(time.perf_counter() - start)
+                        assert resp.status_code == 200, resp.text
+        finally:
+            http_client.client.upstream = upstream
+            session.adapters.clear()
+            session.adapters.update(adapters)
+    return {
+        phase: {"p50_ms": round(percentile(s, 50) * 1000, 2), "p95_ms": round(percentile(s, 95) * 1000, 2),
+                "max_ms": round(max(s) * 1000, 2)}
+        for phase, s in samples.items()
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+def _delta(before, after) -> str:
+    return f"{after / before:>8.2f}x" if before else f"{'':>9}"
+
+
+def report(results: dict, baseline: dict = None):
+    baseline = baseline or {}
+    before_parse, before_feeds = baseline.get("parse", {}), baseline.get("feeds", {})
+    print(f"commit {results['commit']}" + (f", compared with {baseline.get('commit')}" if baseline else ""))
+    print(f"\n{'fetcher':<18}{'items':>6}{'ms/fetch':>10}{'items/s':>10}" + (f"{'before ms':>11}{'ratio':>9}" if baseline else ""))
+    for name, row in results["parse"].items():
+        line = f"{name:<18}{row['items']:>6}{row['ms']:>10.2f}{row['items_per_s']:>10}"
+        if name in before_parse:
+            line += f"{before_parse[name]['ms']:>11.2f}{_delta(before_parse[name]['ms'], row['ms'])}"
+        print(line)
+
+    print(f"\n{'GET /feeds':<18}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}" + (f"{'before p50':>12}{'ratio':>9}" if baseline else ""))
+    for phase, row in results["feeds"].items():
+        line = f"{phase:<18}{row['p50_ms']:>10.2f}{row['p95_ms']:>10.2f}{row['max_ms']:>10.2f}"
+        if phase in before_feeds:
+            line += f"{before_feeds[phase]['p50_ms']:>12.2f}{_delta(before_feeds[phase]['p50_ms'], row['p50_ms'])}"
+        print(line)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--rounds", type=int, default=20, help="fetches per source for parse throughput")
+    ap.add_argument("--requests", type=int, default=10, help="cold/rebuild/warm request triples")
+    ap.add_argument("--latency-ms", type=float, default=50, help="stub upstream latency")
+    ap.add_argument("--jitter-ms", type=float, default=20)
+    ap.add_argument("--error-rate", type=float, default=0)
+    ap.add_argument("--items", type=int, default=30, help="items per synthetic feed")
+    ap.add_argument("--summary-words", type=int, default=40)
+    ap.add_argument("--fixtures", help="recorded fixtures directory (see stub_upstream --record)")
+    ap.add_argument("--json", help="write the results to this file")
+    ap.add_argument("--compare", help="results file of an earlier run to compare against")
+    args = ap.parse_args()
+
+    fixtures = Fixtures(args.fixtures, SyntheticUpstreams(args.items, args.summary_words))
+    results = {
+        "commit": git_commit(),
+        "settings": {k: getattr(args, k) for k in ("rounds", "requests", "latency_ms", "jitter_ms", "error_rate",
+                                                   "items", "summary_words", "fixtures")},
+        "parse": bench_parse(fixtures, args.rounds),
+        "feeds": bench_feeds(fixtures, Faults(args.latency_ms, args.jitter_ms, args.error_rate), args.requests),
+    }
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    report(results, baseline)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nSaved to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,367 @@
+"""
+Load generator: concurrent simulated users driving mixed traffic against a
+running API, reporting throughput, latency percentiles and error rates per
+endpoint.
+
+Each virtual user registers, logs in, then loops through a weighted mix of
+/me, /sources, /feeds (every sort and category), /feeds/{id}, /subreddit
+reads and changes, and favorite list/add/remove, with think time in between.
+
+Against an app that is already running:
+
+    python -m benchmarks.loadgen --url http://127.0.0.1:8000 --users 50 --duration 60
+
+Or let it start the replay stub (benchmarks/stub_upstream.py) and uvicorn on a
+throwaway SQLite database, so no upstream is contacted:
+
+    python -m benchmarks.loadgen --spawn --workers 4 --users 50 --duration 60 --latency-ms 80
+
+Run from backend/. Save a run with --json and pass it to --compare later.
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+import requests
+
+from benchmarks.bench_fetchers import git_commit, percentile
+from benchmarks.stub_upstream import Faults, Fixtures, StubServer, SyntheticUpstreams
+
+SORTS = ["hot", "new"]
+SUBREDDITS = ["programming", "python", "rust", "golang", "learnprogramming", "webdev"]
+
+# Relative frequency of each action in a user's loop
+ACTIONS = {
+    "feeds": 30,
+    "feeds_category": 12,
+    "feeds_source": 12,
+    "sources": 8,
+    "me": 8,
+    "favorites_list": 8,
+    "favorite_add": 8,
+    "favorite_remove": 5,
+    "subreddit_get": 5,
+    "subreddit_put": 4,
+}
+
+_user_ids = itertools.count()
+
+
+class Results:
+    """Thread-safe latencies and outcomes per endpoint."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+
+    def record(self, endpoint: str, seconds: float, error: Optional[str]):
+        with self._lock:
+            self.latencies[endpoint].append(seconds)
+            if error:
+                self.errors[endpoint][error] += 1
+
+    def summary(self, elapsed: float) -> dict:
+        with self._lock:
+            latencies = {k: list(v) for k, v in self.latencies.items()}
+            errors = {k: dict(v) for k, v in self.errors.items()}
+        endpoints = {}
+        for endpoint in sorted(latencies):
+            samples = latencies[endpoint]
+            failed = sum(errors.get(endpoint, {}).values())
+            endpoints[endpoint] = {
+                "requests": len(samples), "rps": round(len(samples) / elapsed, 2),
+                "p50_ms": round(percentile(samples, 50) * 1000, 2), "p95_ms": round(percentile(samples, 95) * 1000, 2),
+                "p99_ms": round(percentile(samples, 99) * 1000, 2), "max_ms": round(max(samples) * 1000, 2),
+                "error_rate": round(failed / len(samples), 4), "errors": errors.get(endpoint, {}),
+            }
+        total = sum(e["requests"] for e in endpoints.values())
+        failed = sum(sum(e["errors"].values()) for e in endpoints.values())
+        all_samples = [s for samples in latencies.values() for s in samples]
+        return {
+            "elapsed_s": round(elapsed, 2), "requests": total, "rps": round(total / elapsed, 2),
+            "error_rate": round(failed / total, 4) if total else 0.0,
+            "p50_ms": round(percentile(all_samples, 50) * 1000, 2) if all_samples else 0,
+            "p95_ms": round(percentile(all_samples, 95) * 1000, 2) if all_samples else 0,
+            "endpoints": endpoints,
+        }
+
+
+class VirtualUser(threading.Thread):
+    """One simulated user session on its own keep-alive connection."""
+
+    def __init__(self, base_url: str, results: Results, stop: threading.Event, think_ms: float,
+                 timeout: float, seed: int):
+        super().__init__(daemon=True)
+        self.base_url = base_url.rstrip("/")
+        self.results = results
+        self.stop_event = stop
+        self.think_ms = think_ms
+        self.timeout = timeout
+        self.rng = random.Random(seed)
+        self.session = requests.Session()
+        self.sources: List[dict] = []
+        self.seen_items: List[dict] = []
+        self.favorites: List[str] = []
+
+    def call(self, endpoint: str, method: str, path: str, expect=(200,), **kwargs) -> Optional[requests.Response]:
+        """One request, timed and recorded under endpoint; None when it failed."""
+        start = time.perf_counter()
+        error = None
+        resp = None
+        try:
+            resp = self.session.request(method, self.base_url + path, timeout=self.timeout, **kwargs)
+            if resp.status_code not in expect:
+                error = str(resp.status_code)
+            else:
+                resp.content  # Count reading the body
+        except requests.Timeout:
+            error = "timeout"
+        except requests.RequestException:
+            error = "connection"
+        self.results.record(endpoint, time.perf_counter() - start, error)
+        return None if error else resp
+
+    def sign_up(self) -> bool:
+        name = f"load{os.getpid()}_{next(_user_ids)}_{self.rng.randrange(10 ** 6)}"
+        password = f"pw-{name}"
+        if not self.call("POST /register", "POST", "/register",
+                         json={"username": name, "email": f"{name}@loadtest.devpulse.io", "password": password}):
+            return False
+        resp = self.call("POST /login", "POST", "/login", json={"username": name, "password": password})
+        if not resp:
+            return False
+        self.session.headers["Authorization"] = f"Bearer {resp.json()['access_token']}"
+        return True
+
+    def _remember_items(self, resp: Optional[requests.Response]):
+        if resp is None:
+            return
+        # Only items that can be favorited: feed_link is required
+        items = [item for item in resp.json() if item.get("link")]
+        if items:
+            self.seen_items = items[:50]
+
+    def act(self, action: str):
+        rng = self.rng
+        if action == "feeds":
+            self._remember_items(self.call("GET /feeds", "GET", "/feeds", params={"sort": rng.choice(SORTS)}))
+        elif action == "feeds_category":
+            categories = sorted({s.get("category") for s in self.sources if s.get("category")})
+            params = {"sort": rng.choice(SORTS)}
+            if categories:
+                params["category"] = rng.choice(categories)
+            self._remember_items(self.call("GET /feeds?category", "GET", "/feeds", params=params))
+        elif action == "feeds_source":
+            if not self.sources:
+                return self.act("sources")
+            source = rng.choice(self.sources)
+            self.call("GET /feeds/{id}", "GET", f"/feeds/{source['id']}", params={"sort": rng.choice(SORTS)})
+        elif action == "sources":
+            resp = self.call("GET /sources", "GET", "/sources")
+            if resp is not None:
+                self.sources = resp.json()
+        elif action == "me":
+            self.call("GET /me", "GET", "/me")
+        elif action == "favorites_list":
+            self.call("GET /favorites", "GET", "/favorites")
+        elif action == "favorite_add":
+            if not self.seen_items:
+                return self.act("feeds")
+            item = rng.choice(self.seen_items)
+            if self.call("POST /favorites", "POST", "/favorites", json={
+                "feed_link": item["link"], "feed_title": item.get("title") or item["link"],
+                "feed_source": item.get("source") or "unknown", "feed_published": item.get("published"),
+                "feed_summary": item.get("summary"),
+            }) and item["link"] not in self.favorites:
+                self.favorites.append(item["link"])
+        elif action == "favorite_remove":
+            if not self.favorites:
+                return self.act("favorite_add")
+            link = self.favorites.pop(rng.randrange(len(self.favorites)))
+            self.call("DELETE /favorites", "DELETE", "/favorites", params={"feed_link": link})
+        elif action == "subreddit_get":
+            self.call("GET /subreddit", "GET", "/subreddit")
+        elif action == "subreddit_put":
+            self.call("PUT /subreddit", "PUT", "/subreddit", json={"subreddit": rng.choice(SUBREDDITS)})
+
+    def run(self):
+        if not self.sign_up():
+            return
+        self.act("sources")
+        actions, weights = list(ACTIONS), list(ACTIONS.values())
+        while not self.stop_event.is_set():
+            self.act(self.rng.choices(actions, weights)[0])
+            if self.think_ms:
+                self.stop_event.wait(self.rng.expovariate(1 / self.think_ms) / 1000)
+
+
+def run_load(base_url: str, users: int, duration: float, ramp_up: float, think_ms: float, timeout: float,
+             seed: int = 7) -> dict:
+    results = Results()
+    stop = threading.Event()
+    threads = []
+    start = time.perf_counter()
+    for i in range(users):
+        user = VirtualUser(base_url, results, stop, think_ms, timeout, seed + i)
+        user.start()
+        threads.append(user)
+        if ramp_up and i < users - 1:
+            time.sleep(ramp_up / users)
+    remaining = duration - (time.perf_counter() - start)
+    if remaining > 0:
+        time.sleep(remaining)
+    stop.set()
+    for user in threads:
+        user.join(timeout + 1)
+    return results.summary(time.perf_counter() - start)
+
+
+class SpawnedApp:
+    """
+    The replay stub plus `uvicorn main:app` on a throwaway SQLite database,
+    with ingestion in one `python ingest.py` process as in a multi-worker deploy.
+    """
+
+    def __init__(self, port: int, workers: int, faults: Faults, fixtures: Fixtures):
+        self.port = port
+        self.workers = workers
+        self.stub = StubServer(fixtures, faults)
+        self.process = None
+        self.ingester = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def __enter__(self) -> "SpawnedApp":
+        try:
+            self._start()
+        except BaseException:
+            # Don't leave the stub or the ingester behind when uvicorn never came up
+            self.__exit__(None, None, None)
+            raise
+        return self
+
+    def _start(self):
+        self.stub.start()
+        env = dict(os.environ)
+        env.pop("REDIS_URL", None)
+        env.update({
+            "HTTP_UPSTREAM_OVERRIDE": self.stub.url,
+            "DATABASE_URL": env.get("LOADGEN_DATABASE_URL")
+                            or f"sqlite:///{tempfile.mkdtemp(prefix='loadgen-')}/load.db",
+            "LOG_LEVEL": env.get("LOG_LEVEL", "WARNING"),
+            # Every upstream is one host now: give it the keep-alive sockets the real hosts would have between them
+            "HTTP_POOL_MAXSIZE": env.get("HTTP_POOL_MAXSIZE", "100"),
+        })
+        # Set the database up once, as a deploy does, rather than in every worker
+        subprocess.run([sys.executable, "seeds.py"], env=env, check=True)
+        env["DB_AUTO_SETUP"] = "0"
+        # One ingester for the whole app, not one thread per worker
+        if env.get("INGEST_ENABLED", "1") == "1":
+            self.ingester = subprocess.Popen([sys.executable, "ingest.py"], env=env)
+        env["INGEST_IN_PROCESS"] = "0"
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--port", str(self.port),
+             "--workers", str(self.workers), "--log-level", "warning", "--no-access-log"],
+            env=env,
+        )
+        deadline = time.monotonic() + 60
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"uvicorn exited with {self.process.returncode}")
+            try:
+                if requests.get(f"{self.url}/sources", timeout=1).ok:
+                    return
+            except requests.RequestException:
+                pass
+            time.sleep(0.25)
+        raise RuntimeError("uvicorn did not become ready within 60s")
+
+    def __exit__(self, *exc):
+        for process in (self.process, self.ingester):
+            if process and process.poll() is None:
+                process.terminate()
+                try:
+                    process.wait(10)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+        self.stub.stop()
+
+
+def report(summary: dict, baseline: dict = None):
+    baseline = baseline or {}
+    before = baseline.get("summary", {}).get("endpoints", {})
+    print(f"{summary['requests']} requests in {summary['elapsed_s']}s: {summary['rps']} req/s, "
+          f"p50 {summary['p50_ms']} ms, p95 {summary['p95_ms']} ms, errors {summary['error_rate']:.2%}")
+    if baseline:
+        b = baseline["summary"]
+        print(f"before ({baseline.get('commit')}): {b['rps']} req/s, p50 {b['p50_ms']} ms, p95 {b['p95_ms']} ms, "
+              f"errors {b['error_rate']:.2%}")
+    print(f"\n{'endpoint':<22}{'reqs':>7}{'req/s':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}{'errors':>8}"
+          + (f"{'before p95':>12}" if baseline else ""))
+    for endpoint, row in summary["endpoints"].items():
+        line = (f"{endpoint:<22}{row['requests']:>7}{row['rps']:>8.1f}{row['p50_ms']:>9.1f}{row['p95_ms']:>9.1f}"
+                f"{row['p99_ms']:>9.1f}{row['max_ms']:>9.1f}{row['error_rate']:>8.1%}")
+        if endpoint in before:
+            line += f"{before[endpoint]['p95_ms']:>12.1f}"
+        print(line)
+    failures = {e: row["errors"] for e, row in summary["endpoints"].items() if row["errors"]}
+    if failures:
+        print("\nerrors: " + "; ".join(f"{e} {codes}" for e, codes in failures.items()))
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--url", default="http://127.0.0.1:8000", help="API to load (ignored with --spawn)")
+    ap.add_argument("--users", type=int, default=20, help="concurrent virtual users")
+    ap.add_argument("--duration", type=float, default=30, help="seconds of load, ramp-up included")
+    ap.add_argument("--ramp-up", type=float, default=5, help="seconds over which users start")
+    ap.add_argument("--think-ms", type=float, default=500, help="mean pause between a user's requests")
+    ap.add_argument("--timeout", type=float, default=30, help="per-request timeout in seconds")
+    ap.add_argument("--spawn", action="store_true", help="start the replay stub and uvicorn, then load them")
+    ap.add_argument("--port", type=int, default=8765, help="port for the spawned app")
+    ap.add_argument("--workers", type=int, default=1, help="uvicorn workers for the spawned app")
+    ap.add_argument("--latency-ms", type=float, default=80, help="stub upstream latency with --spawn")
+    ap.add_argument("--jitter-ms", type=float, default=40)
+    ap.add_argument("--error-rate", type=float, default=0.01, help="stub upstream error rate with --spawn")
+    ap.add_argument("--fixtures", help="recorded fixtures directory for the spawned stub")
+    ap.add_argument("--json", help="write the results to this file")
+    ap.add_argument("--compare", help="results file of an earlier run to compare against")
+    args = ap.parse_args()
+
+    settings = {k: getattr(args, k) for k in ("users", "duration", "ramp_up", "think_ms", "spawn", "workers",
+                                              "latency_ms", "jitter_ms", "error_rate")}
+    load = dict(users=args.users, duration=args.duration, ramp_up=args.ramp_up, think_ms=args.think_ms,
+                timeout=args.timeout)
+    if args.spawn:
+        faults = Faults(args.latency_ms, args.jitter_ms, args.error_rate)
+        with SpawnedApp(args.port, args.workers, faults, Fixtures(args.fixtures, SyntheticUpstreams())) as app:
+            summary = run_load(app.url, **load)
+    else:
+        summary = run_load(args.url, **load)
+
+    results = {"commit": git_commit(), "settings": settings, "summary": summary}
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    report(summary, baseline)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nSaved to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
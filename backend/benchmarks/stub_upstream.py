@@ -0,0 +1,424 @@
+"""
+Replay stub for every upstream the fetchers in feeds.py talk to, so they can
+be run and benchmarked without network access.
+
+Responses come from recorded fixtures when there are any for the endpoint,
+otherwise from synthetic payloads in the upstream's own format (RSS, the HN
+Firebase API, Reddit listings, DEV.to, Lobste.rs, GitHub Trending HTML and
+Product Hunt GraphQL). Latency, jitter, error rate and payload size are
+configurable, globally or per upstream host.
+
+Serve it and point the API at it:
+
+    python -m benchmarks.stub_upstream --port 8900 --latency-ms 80 --jitter-ms 40
+    HTTP_UPSTREAM_OVERRIDE=http://127.0.0.1:8900 uvicorn main:app
+
+Record real responses once (needs network), then replay them:
+
+    python -m benchmarks.stub_upstream --record --fixtures benchmarks/fixtures
+    python -m benchmarks.stub_upstream --fixtures benchmarks/fixtures
+
+Run from backend/. benchmarks/bench_fetchers.py uses the same pieces in process.
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from html import escape
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+from urllib.parse import unquote, urlsplit
+
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+
+Payload = Tuple[int, str, bytes]  # status, content type, body
+
+_WORDS = ("rust kernel latency postgres python release outage compiler cache browser model database "
+          "scheduler memory vector query async runtime container network protocol parser benchmark").split()
+_LANGUAGES = ["Python", "Rust", "Go", "TypeScript", "C++", "Zig"]
+_NOW = datetime(2024, 5, 1, 15, 0, tzinfo=timezone.utc)
+
+
+def _host(netloc: str) -> str:
+    """Lowercased host without port, userinfo or stray whitespace."""
+    host = unquote(netloc).rsplit("@", 1)[-1].split(":")[0]
+    return re.sub(r"\s+", "", host).lower()
+
+
+class SyntheticUpstreams:
+    """Deterministic payloads shaped like each upstream's real responses."""
+
+    def __init__(self, items: int = 30, summary_words: int = 40, seed: int = 7):
+        self.items = items
+        self.summary_words = summary_words
+        self.seed = seed
+
+    def _rng(self, key: str) -> random.Random:
+        return random.Random(self.seed ^ zlib.crc32(key.encode()))
+
+    def _sentence(self, rng: random.Random, words: int) -> str:
+        return " ".join(rng.choice(_WORDS) for _ in range(words))
+
+    def _when(self, rng: random.Random, i: int) -> datetime:
+        return _NOW - timedelta(minutes=17 * i + rng.randint(0, 15))
+
+    def payload(self, method: str, host: str, path: str) -> Payload:
+        rng = self._rng(f"{host}{path}")
+        if host == "hacker-news.firebaseio.com":
+            match = re.search(r"/item/(\d+)\.json$", path)
+            if match:
+                return self._json(self._hn_item(int(match.group(1))))
+            return self._json([40000000 + i for i in range(max(self.items, 30))])
+        if host.endswith("reddit.com"):
+            if path.endswith("/access_token"):
+                return self._json({"access_token": "stub-reddit-token", "token_type": "bearer", "expires_in": 86400})
+            return self._json(self._reddit_listing(rng))
+        if host == "api.producthunt.com":
+            if path.endswith("/oauth/token"):
+                return self._json({"access_token": "stub-ph-token", "token_type": "Bearer", "expires_in": 86400})
+            return self._json(self._product_hunt(rng))
+        if host == "dev.to":
+            return self._json(self._devto(rng))
+        if host == "lobste.rs":
+            return self._json(self._lobsters(rng))
+        if host == "github.com":
+            return 200, "text/html; charset=utf-8", self._github_trending(rng).encode()
+        return 200, "application/rss+xml; charset=utf-8", self._rss(rng, host).encode()
+
+    def _json(self, data) -> Payload:
+        return 200, "application/json; charset=utf-8", json.dumps(data).encode()
+
+    def _hn_item(self, story_id: int) -> dict:
+        rng = self._rng(f"hn-{story_id}")
+        i = story_id % 1000
+        return {
+            "by": f"user{rng.randint(1, 999)}", "descendants": rng.randint(0, 400), "id": story_id,
+            "kids": [story_id * 10 + k for k in range(rng.randint(0, 8))], "score": rng.randint(1, 900),
+            "time": int(self._when(rng, i).timestamp()), "title": self._sentence(rng, rng.randint(5, 12)).capitalize(),
+            "type": "story", "url": f"https://example.com/hn/{story_id}",
+        }
+
+    def _reddit_listing(self, rng: random.Random) -> dict:
+        children = []
+        for i in range(self.items):
+            children.append({"kind": "t3", "data": {
+                "title": self._sentence(rng, rng.randint(6, 14)).capitalize(),
+                "permalink": f"/r/programming/comments/{i:06x}/post_{i}/",
+                "created_utc": self._when(rng, i).timestamp(),
+                "score": rng.randint(1, 3000), "num_comments": rng.randint(0, 500),
+                "stickied": i == 0, "selftext": self._sentence(rng, self.summary_words),
+            }})
+        return {"kind": "Listing", "data": {"after": None, "children": children}}
+
+    def _product_hunt(self, rng: random.Random) -> dict:
+        edges = [{"node": {
+            "id": str(400000 + i), "name": self._sentence(rng, 2).title(),
+            "tagline": self._sentence(rng, rng.randint(5, 10)), "url": f"https://www.producthunt.com/posts/p-{i}",
+            "votesCount": rng.randint(1, 800), "createdAt": self._when(rng, i).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        }} for i in range(min(self.items, 20))]
+        return {"data": {"posts": {"edges": edges}}}
+
+    def _devto(self, rng: random.Random) -> list:
+        return [{
+            "id": 1800000 + i, "title": self._sentence(rng, rng.randint(5, 11)).capitalize(),
+            "description": self._sentence(rng, self.summary_words)[:240],
+            "url": f"https://dev.to/someone/post-{i}",
+            "published_at": self._when(rng, i).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "positive_reactions_count": rng.randint(0, 300), "comments_count": rng.randint(0, 60),
+            "tag_list": rng.sample(_WORDS, 3),
+        } for i in range(self.items)]
+
+    def _lobsters(self, rng: random.Random) -> list:
+        return [{
+            "short_id": f"{i:06x}", "short_id_url": f"https://lobste.rs/s/{i:06x}",
+            "created_at": self._when(rng, i).astimezone(timezone(timedelta(hours=-5))).isoformat(timespec="milliseconds"),
+            "title": self._sentence(rng, rng.randint(5, 11)).capitalize(), "url": f"https://example.com/lobsters/{i}",
+            "score": rng.randint(1, 120), "comment_count": rng.randint(0, 80),
+            "description": "", "comments_url": f"https://lobste.rs/s/{i:06x}/comments",
+            "tags": rng.sample(_WORDS, 2),
+        } for i in range(self.items)]
+
+    def _github_trending(self, rng: random.Random) -> str:
+        rows = []
+        for i in range(min(self.items, 25)):
+            owner, repo = rng.choice(_WORDS), f"{rng.choice(_WORDS)}-{i}"
+            rows.append(f"""
+<article class="Box-row">
+  <div class="float-right"><a href="/login" class="btn btn-sm">Star</a></div>
+  <h2 class="h3 lh-condensed"><a href="/{owner}/{repo}" class="Link">
+    <span class="text-normal">{owner} /</span>
+    {repo}</a></h2>
+  <p class="col-9 color-fg-muted my-1 pr-4">{escape(self._sentence(rng, self.summary_words // 2))}</p>
+  <div class="f6 color-fg-muted mt-2">
+    <span class="d-inline-block ml-0 mr-3"><span itemprop="programmingLanguage">{rng.choice(_LANGUAGES)}</span></span>
+    <a href="/{owner}/{repo}/stargazers" class="Link--muted d-inline-block mr-3">{rng.randint(100, 90000):,}</a>
+    <a href="/{owner}/{repo}/forks" class="Link--muted d-inline-block mr-3">{rng.randint(10, 9000):,}</a>
+  </div>
+</article>""")
+        return ("<!DOCTYPE html><html><head><title>Trending repositories on GitHub today</title></head><body>"
+                "<main><div class=\"Box\">" + "".join(rows) + "</div></main></body></html>")
+
+    def _rss(self, rng: random.Random, host: str) -> str:
+        entries = []
+        for i in range(self.items):
+            body = self._sentence(rng, self.summary_words)
+            words = body.split()
+            cut = len(words) // 2
+            html = (f"<p>{' '.join(words[:cut])} <a href=\"https://{host}/read/{i}\">{words[cut]}</a> "
+                    f"&amp; {' '.join(words[cut + 1:])}</p><p><img src=\"https://{host}/img/{i}.png\"/> &#8220;more&#8221;</p>")
+            entries.append(
+                f"<item><title>{escape(self._sentence(rng, rng.randint(5, 12)).capitalize())}</title>"
+                f"<link>https://{host}/posts/{i}</link><guid>https://{host}/posts/{i}</guid>"
+                f"<pubDate>{format_datetime(self._when(rng, i))}</pubDate>"
+                f"<description>{escape(html)}</description></item>"
+            )
+        return ("<?xml version=\"1.0\" encoding=\"UTF-8\"?><rss version=\"2.0\"><channel>"
+                f"<title>{host}</title><link>https://{host}/</link><description>Stub feed</description>"
+                + "".join(entries) + "</channel></rss>")
+
+
+class Fixtures:
+    """
+    Recorded responses keyed by method, host and path (the query string is
+    ignored), falling back to SyntheticUpstreams. Payloads are built once
+    and reused, so generating them is not part of any measurement.
+    """
+
+    def __init__(self, directory: Optional[str] = None, synthetic: Optional[SyntheticUpstreams] = None):
+        self.directory = directory
+        self.synthetic = synthetic or SyntheticUpstreams()
+        self._lock = threading.Lock()
+        self._index: Dict[str, dict] = {}
+        self._payloads: Dict[str, Payload] = {}
+        if directory and os.path.exists(os.path.join(directory, "index.json")):
+            with open(os.path.join(directory, "index.json")) as f:
+                self._index = json.load(f)
+
+    def payload(self, method: str, host: str, path: str) -> Payload:
+        key = f"{method} {host}{path}"
+        with self._lock:
+            cached = self._payloads.get(key)
+        if cached is not None:
+            return cached
+        recorded = self._index.get(key)
+        if recorded is not None:
+            with open(os.path.join(self.directory, recorded["file"]), "rb") as f:
+                payload = (recorded["status"], recorded["content_type"], f.read())
+        else:
+            payload = self.synthetic.payload(method, host, path)
+        with self._lock:
+            self._payloads[key] = payload
+        return payload
+
+    def record(self, method: str, host: str, path: str, payload: Payload):
+        key = f"{method} {host}{path}"
+        status, content_type, body = payload
+        name = f"{host}_{hashlib.sha1(key.encode()).hexdigest()[:12]}"
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, name), "wb") as f:
+            f.write(body)
+        with self._lock:
+            self._index[key] = {"file": name, "status": status, "content_type": content_type}
+            self._payloads[key] = payload
+            with open(os.path.join(self.directory, "index.json"), "w") as f:
+                json.dump(self._index, f, indent=1, sort_keys=True)
+
+
+class Faults:
+    """Latency, jitter and error injection, with optional per-host overrides."""
+
+    def __init__(self, latency_ms: float = 0, jitter_ms: float = 0, error_rate: float = 0,
+                 error_status: int = 503, seed: int = 7):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.host_latency_ms: Dict[str, float] = {}
+        self.host_error_rate: Dict[str, float] = {}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def delay(self, host: str) -> float:
+        """Seconds to wait before answering a request for host."""
+        with self._lock:
+            jitter = self._rng.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0
+        return max(0.0, self.host_latency_ms.get(host, self.latency_ms) + jitter) / 1000
+
+    def fails(self, host: str) -> bool:
+        rate = self.host_error_rate.get(host, self.error_rate)
+        if not rate:
+            return False
+        with self._lock:
+            return self._rng.random() < rate
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # Keep-alive, like the real upstreams, so the client's connection pool is exercised
+    protocol_version = "HTTP/1.1"
+    server: "StubServer"
+
+    def log_message(self, *args):
+        pass
+
+    def _serve(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        # /<upstream host>/<upstream path>?<query>, as HttpClient rewrites it
+        parts = urlsplit(self.path)
+        netloc, _, rest = parts.path.lstrip("/").partition("/")
+        host, path = _host(netloc), "/" + rest
+        stub = self.server
+
+        delay = stub.faults.delay(host)
+        if delay:
+            time.sleep(delay)
+        if stub.faults.fails(host):
+            payload = (stub.faults.error_status, "text/plain", b"stub upstream error")
+        elif stub.record:
+            payload = stub.forward(self.command, host, path, parts.query, self.headers, body)
+        else:
+            payload = stub.fixtures.payload(self.command, host, path)
+
+        status, content_type, data = payload
+        etag = f'"{hashlib.sha1(data).hexdigest()[:16]}"'
+        if stub.etags and status == 200 and self.headers.get("If-None-Match") == etag:
+            status, data = 304, b""
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        if stub.etags and status in (200, 304):
+            self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(data)
+
+    do_GET = _serve
+    do_POST = _serve
+
+
+class StubServer(ThreadingHTTPServer):
+    """Threaded HTTP server replaying Fixtures with Faults applied."""
+
+    daemon_threads = True
+
+    def __init__(self, fixtures: Optional[Fixtures] = None, faults: Optional[Faults] = None,
+                 host: str = "127.0.0.1", port: int = 0, etags: bool = False, record: bool = False):
+        super().__init__((host, port), _Handler)
+        self.fixtures = fixtures or Fixtures()
+        self.faults = faults or Faults()
+        self.etags = etags
+        self.record = record
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def forward(self, method: str, host: str, path: str, query: str, headers, body: bytes) -> Payload:
+        """Record mode: fetch from the real upstream and save the response as a fixture."""
+        url = f"https://{host}{path}" + (f"?{query}" if query else "")
+        keep = {k: v for k, v in headers.items() if k.lower() in ("user-agent", "accept", "authorization", "content-type")}
+        resp = requests.request(method, url, headers=keep, data=body or None, timeout=20)
+        payload = (resp.status_code, resp.headers.get("Content-Type", "application/octet-stream"), resp.content)
+        if resp.ok:
+            self.fixtures.record(method, host, path, payload)
+        return payload
+
+    def start(self) -> "StubServer":
+        self._thread = threading.Thread(target=self.serve_forever, name="stub-upstream", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        # shutdown() waits for serve_forever, so only when it was started
+        if self._thread is not None:
+            self.shutdown()
+            self._thread = None
+        self.server_close()
+
+    def __enter__(self) -> "StubServer":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class StubAdapter(BaseAdapter):
+    """
+    requests transport answering from Fixtures in process, with no sockets,
+    latency or faults: mounted on a Session it isolates the fetchers' own
+    parsing and normalization cost.
+    """
+
+    def __init__(self, fixtures: Optional[Fixtures] = None):
+        super().__init__()
+        self.fixtures = fixtures or Fixtures()
+
+    def send(self, request, **kwargs):
+        parts = urlsplit(request.url)
+        status, content_type, body = self.fixtures.payload(request.method, _host(parts.netloc), parts.path)
+        response = requests.Response()
+        response.status_code = status
+        response.headers = CaseInsensitiveDict({"Content-Type": content_type, "Content-Length": str(len(body))})
+        response._content = body
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        response.url = request.url
+        response.request = request
+        response.reason = "OK" if status < 400 else "Error"
+        return response
+
+    def close(self):
+        pass
+
+
+def _host_values(pairs, cast) -> Dict[str, float]:
+    values = {}
+    for pair in pairs or ():
+        host, _, value = pair.partition("=")
+        values[_host(host)] = cast(value)
+    return values
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8900)
+    ap.add_argument("--fixtures", help="directory of recorded fixtures (index.json + bodies)")
+    ap.add_argument("--record", action="store_true", help="forward to the real upstreams and save their responses")
+    ap.add_argument("--latency-ms", type=float, default=0)
+    ap.add_argument("--jitter-ms", type=float, default=0)
+    ap.add_argument("--error-rate", type=float, default=0, help="fraction of requests answered with --error-status")
+    ap.add_argument("--error-status", type=int, default=503)
+    ap.add_argument("--slow", action="append", metavar="HOST=MS", help="per-host latency, repeatable")
+    ap.add_argument("--failing", action="append", metavar="HOST=RATE", help="per-host error rate, repeatable")
+    ap.add_argument("--items", type=int, default=30, help="items per synthetic feed")
+    ap.add_argument("--summary-words", type=int, default=40, help="words per synthetic summary")
+    ap.add_argument("--etags", action="store_true", help="send ETags and answer If-None-Match with 304")
+    args = ap.parse_args()
+    if args.record and not args.fixtures:
+        ap.error("--record needs --fixtures")
+
+    fixtures = Fixtures(args.fixtures, SyntheticUpstreams(args.items, args.summary_words))
+    faults = Faults(args.latency_ms, args.jitter_ms, args.error_rate, args.error_status)
+    faults.host_latency_ms = _host_values(args.slow, float)
+    faults.host_error_rate = _host_values(args.failing, float)
+    server = StubServer(fixtures, faults, args.host, args.port, etags=args.etags, record=args.record)
+    print(f"Stub upstreams on {server.url} ({'recording' if args.record else 'replaying'})")
+    print(f"Point the API at it: HTTP_UPSTREAM_OVERRIDE={server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,313 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+LOCAL_CACHE_MAXSIZE = int(os.getenv("LOCAL_CACHE_MAXSIZE", "256"))
+CACHE_REFRESH_WORKERS = int(os.getenv("CACHE_REFRESH_WORKERS", "4"))
+
+# Background revalidation of stale entries
+_refresh_pool = ThreadPoolExecutor(max_workers=CACHE_REFRESH_WORKERS, thread_name_prefix="cache-refresh")
+
+
+class LocalCache:
+    """
+    Bounded in-process LRU whose entries expire after their own TTL.
+
+    An entry may also carry a shorter soft TTL: past it the entry is still
+    returned by get_entry() but flagged as stale.
+    """
+
+    def __init__(self, maxsize: int = LOCAL_CACHE_MAXSIZE):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (expires_at, fresh_until, value)
+
+    def get_entry(self, key: str) -> Tuple[Optional[Any], bool]:
+        """(value, is_fresh), or (None, False) when absent or past its hard TTL."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None, False
+            expires_at, fresh_until, value = entry
+            now = time.monotonic()
+            if expires_at <= now:
+                del self._entries[key]
+                return None, False
+            self._entries.move_to_end(key)
+            return value, fresh_until > now
+
+    def get(self, key: str) -> Optional[Any]:
+        return self.get_entry(key)[0]
+
+    def set(self, key: str, value: Any, ttl: float, soft_ttl: Optional[float] = None):
+        with self._lock:
+            now = time.monotonic()
+            fresh_for = ttl if soft_ttl is None else min(soft_ttl, ttl)
+            self._entries[key] = (now + ttl, now + fresh_for, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Coalesces concurrent calls for the same key into one execution."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def in_flight(self, key: str) -> bool:
+        with self._lock:
+            return key in self._calls
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Run fn once per key at a time. Returns (result, shared) where shared
+        is True for callers that waited on another caller's execution."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+            return call.result, False
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+
+# TieredCache counter -> devpulse_cache_lookups_total result
+_LOOKUP_RESULTS = {
+    "local_hits": "local_hit", "redis_hits": "redis_hit", "stale_hits": "stale",
+    "misses": "miss", "coalesced": "coalesced",
+}
+
+
+class TieredCache:
+    """
+    In-process LRU in front of Redis, with single-flight loading.
+
+    Values are the serialized payload strings stored in Redis. Redis is
+    optional: when it is missing or erroring, the local tier keeps serving
+    and concurrent misses for a key still trigger only one load.
+
+    Entries written with a soft TTL are served stale-while-revalidate:
+    past the soft TTL the old value is returned immediately and a single
+    background refresh is started; only past the hard TTL does a caller
+    block on the loader. In Redis freshness is a companion "<key>:fresh"
+    marker that expires at the soft TTL (or with the value when there is none).
+    """
+
+    def __init__(self, redis_client=None, local: Optional[LocalCache] = None):
+        self.redis = redis_client
+        self.local = local or LocalCache()
+        self.flight = SingleFlight()
+        self._lock = threading.Lock()
+        self._counters = {
+            "local_hits": 0, "redis_hits": 0, "stale_hits": 0, "misses": 0,
+            "coalesced": 0, "refreshes": 0, "refresh_errors": 0, "redis_errors": 0,
+        }
+
+    def _count(self, name: str, key: Optional[str] = None):
+        with self._lock:
+            self._counters[name] += 1
+        if key is not None:
+            family = ":".join(key.split(":", 2)[:2])
+            metrics.CACHE_LOOKUPS.inc(family=family, result=_LOOKUP_RESULTS[name])
+
+    def _redis_get(self, key: str) -> Tuple[Optional[str], bool]:
+        if not self.redis:
+            return None, False
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.get(key)
+            pipe.pttl(key)
+            pipe.pttl(f"{key}:fresh")
+            value, ttl_ms, fresh_ms = pipe.execute()
+        except Exception as e:
+            self._count("redis_errors")
+            logger.warning(f"⚠️ Cache read error: {e}")
+            return None, False
+        if value is None:
+            return None, False
+        # The marker is always written with an expiry, so a missing one means stale
+        fresh = fresh_ms is not None and fresh_ms > 0
+        # Mirror locally for no longer than Redis will keep it
+        if ttl_ms and ttl_ms > 0:
+            self.local.set(key, value, ttl_ms / 1000, fresh_ms / 1000 if fresh else 0)
+        return value, fresh
+
+    def get_entry(self, key: str) -> Tuple[Optional[str], bool]:
+        """(value, is_fresh) from the first tier that has the key."""
+        value, fresh = self.local.get_entry(key)
+        if value is not None:
+            self._count("local_hits" if fresh else "stale_hits", key)
+            return value, fresh
+        value, fresh = self._redis_get(key)
+        if value is not None:
+            self._count("redis_hits" if fresh else "stale_hits", key)
+        return value, fresh
+
+    def get(self, key: str) -> Optional[str]:
+        return self.get_entry(key)[0]
+
+    def get_many(self, keys: List[str]) -> Dict[str, Tuple[str, bool]]:
+        """
+        {key: (value, is_fresh)} for every key found in either tier. Keys
+        missing locally are read from Redis in a single pipelined round trip.
+        """
+        found = {}
+        remote = []
+        for key in keys:
+            value, fresh = self.local.get_entry(key)
+            if value is None:
+                remote.append(key)
+                continue
+            self._count("local_hits" if fresh else "stale_hits", key)
+            found[key] = (value, fresh)
+        if not remote or not self.redis:
+            return found
+
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.mget(remote)
+            for key in remote:
+                pipe.pttl(key)
+                pipe.pttl(f"{key}:fresh")
+            replies = pipe.execute()
+        except Exception as e:
+            self._count("redis_errors")
+            logger.warning(f"⚠️ Cache read error: {e}")
+            return found
+
+        values, ttls = replies[0], replies[1:]
+        for i, (key, value) in enumerate(zip(remote, values)):
+            if value is None:
+                continue
+            ttl_ms, fresh_ms = ttls[2 * i], ttls[2 * i + 1]
+            fresh = fresh_ms is not None and fresh_ms > 0
+            if ttl_ms and ttl_ms > 0:
+                self.local.set(key, value, ttl_ms / 1000, fresh_ms / 1000 if fresh else 0)
+            self._count("redis_hits" if fresh else "stale_hits", key)
+            found[key] = (value, fresh)
+        return found
+
+    def set(self, key: str, value: str, ttl: int, soft_ttl: Optional[int] = None):
+        self.local.set(key, value, ttl, soft_ttl)
+        if self.redis:
+            try:
+                pipe = self.redis.pipeline(transaction=False)
+                pipe.setex(key, ttl, value)
+                pipe.setex(f"{key}:fresh", ttl if soft_ttl is None else min(soft_ttl, ttl), 1)
+                pipe.execute()
+            except Exception as e:
+                self._count("redis_errors")
+                logger.warning(f"⚠️ Cache write error: {e}")
+
+    def delete(self, key: str):
+        self.local.delete(key)
+        if self.redis:
+            try:
+                self.redis.delete(key, f"{key}:fresh")
+            except Exception as e:
+                self._count("redis_errors")
+                logger.warning(f"⚠️ Cache delete error: {e}")
+
+    def _refresh(self, key: str, loader: Callable[[], Tuple[str, int]], soft_ttl: Optional[int]):
+        try:
+            self.flight.do(key, lambda: self._store(key, loader, soft_ttl))
+            self._count("refreshes")
+        except Exception as e:
+            # Keep serving the stale copy until the hard TTL runs out
+            self._count("refresh_errors")
+            logger.warning(f"⚠️ Background refresh failed for {key}: {e}")
+
+    def refresh_in_background(self, key: str, loader: Callable[[], Tuple[str, int]], soft_ttl: Optional[int] = None):
+        """Start one background reload of key unless a load is already running."""
+        if not self.flight.in_flight(key):
+            _refresh_pool.submit(self._refresh, key, loader, soft_ttl)
+
+    def _store(self, key: str, loader: Callable[[], Tuple[str, int]], soft_ttl: Optional[int]) -> str:
+        loaded, ttl = loader()
+        self.set(key, loaded, ttl, soft_ttl)
+        return loaded
+
+    def get_or_load(
+        self,
+        key: str,
+        loader: Callable[[], Tuple[str, int]],
+        soft_ttl: Optional[int] = None,
+    ) -> str:
+        """
+        Return the cached value for key, or call loader() -> (value, ttl)
+        and cache its result. Concurrent misses share one loader call.
+        With soft_ttl, stale values are returned at once and refreshed in
+        the background; the loader then runs outside the caller's request.
+        """
+        value, fresh = self.get_entry(key)
+        if value is not None:
+            if not fresh:
+                self.refresh_in_background(key, loader, soft_ttl)
+            return value
+
+        def load():
+            # Another flight may have filled the cache while we queued
+            cached = self.get(key)
+            if cached is not None:
+                return cached
+            self._count("misses", key)
+            return self._store(key, loader, soft_ttl)
+
+        value, shared = self.flight.do(key, load)
+        if shared:
+            self._count("coalesced", key)
+        return value
+
+    def stats(self) -> dict:
+        with self._lock:
+            counters = dict(self._counters)
+        hits = counters["local_hits"] + counters["redis_hits"] + counters["stale_hits"] + counters["coalesced"]
+        lookups = hits + counters["misses"]
+        return {
+            **counters,
+            "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+            "local_entries": len(self.local),
+            "redis_enabled": self.redis is not None,
+        }
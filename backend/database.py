@@ -23,3 +23,14 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def dialect_insert():
+    """The dialect's insert() with on_conflict_do_update support, or None on other databases."""
+    if engine.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif engine.dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        return None
+    return insert
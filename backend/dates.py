@@ -0,0 +1,124 @@
+import os
+import threading
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict, Optional
+
+DATE_CACHE_SIZE = int(os.getenv("DATE_CACHE_SIZE", "4096"))
+
+_MISSING = object()
+
+# Returned by feeds.parse_datetime for missing/unparseable dates, sorts as oldest
+EPOCH_MIN = datetime.min.replace(tzinfo=timezone.utc)
+
+
+def _parse_iso(value: str) -> Optional[datetime]:
+    """ISO 8601 as sent by JSON APIs (HN/Reddit after conversion, DEV.to, Lobste.rs)."""
+    if value.endswith("Z"):
+        value = value[:-1] + "+00:00"
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return None
+
+
+def _parse_rfc822(value: str) -> Optional[datetime]:
+    """RFC 822 / 2822 as used by RSS pubDate."""
+    try:
+        return parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+def _parse_dateutil(value: str) -> Optional[datetime]:
+    """Last resort for odd formats; only when python-dateutil is installed."""
+    try:
+        from dateutil import parser
+    except ImportError:
+        return None
+    try:
+        return parser.parse(value)
+    except (ValueError, OverflowError):
+        return None
+
+
+FORMATS: Dict[str, Callable[[str], Optional[datetime]]] = {
+    "iso": _parse_iso,
+    "rfc822": _parse_rfc822,
+    "dateutil": _parse_dateutil,
+}
+
+
+class DateParser:
+    """
+    Memoizing date parser for feed timestamps.
+
+    Each source tends to use one format for every item, so the format that
+    last worked for a source is tried first next time. Parsed strings are
+    memoized, since refreshes mostly see the same items again; the memo is
+    bounded and evicts oldest-first so lookups stay a lock-free dict read.
+    Results are always timezone-aware UTC; naive values are taken as UTC.
+    """
+
+    def __init__(self, cache_size: int = DATE_CACHE_SIZE):
+        self.cache_size = cache_size
+        self._lock = threading.Lock()
+        self._memo = {}  # date string -> datetime or None, in insertion order
+        self._winners = {}  # source -> format name
+        self.hits = 0  # approximate: bumped without the lock on the fast path
+        self.misses = 0
+
+    def _candidates(self, value: str, source: Optional[str]):
+        winner = self._winners.get(source) if source else None
+        if winner:
+            yield winner
+        # Cheap shape check: ISO strings start with the year, RSS with a weekday/day
+        first = ("iso", "rfc822") if value[:4].isdigit() else ("rfc822", "iso")
+        for name in first + ("dateutil",):
+            if name != winner:
+                yield name
+
+    def _parse_uncached(self, value: str, source: Optional[str]) -> Optional[datetime]:
+        for name in self._candidates(value, source):
+            dt = FORMATS[name](value)
+            if dt is None:
+                continue
+            if source:
+                self._winners[source] = name
+            if dt.tzinfo is None:
+                return dt.replace(tzinfo=timezone.utc)
+            return dt.astimezone(timezone.utc)
+        return None
+
+    def parse(self, value: Optional[str], source: Optional[str] = None) -> Optional[datetime]:
+        """UTC datetime for value, or None when it is empty or unparseable."""
+        if not value:
+            return None
+        dt = self._memo.get(value, _MISSING)
+        if dt is not _MISSING:
+            self.hits += 1
+            return dt
+        dt = self._parse_uncached(value.strip(), source)
+        with self._lock:
+            self.misses += 1
+            self._memo[value] = dt
+            if len(self._memo) > self.cache_size:
+                del self._memo[next(iter(self._memo))]
+        return dt
+
+    def winning_formats(self) -> Dict[str, str]:
+        return dict(self._winners)
+
+    def clear(self):
+        with self._lock:
+            self._memo.clear()
+            self._winners.clear()
+            self.hits = self.misses = 0
+
+
+# Shared parser used by feeds and ingest
+parser = DateParser()
+
+
+def parse(value: Optional[str], source: Optional[str] = None) -> Optional[datetime]:
+    return parser.parse(value, source)
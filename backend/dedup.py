@@ -0,0 +1,154 @@
+"""
+Cross-source deduplication for the aggregated feed.
+
+Two items are the same story when their links are equal after
+canonicalization, or when their titles are near-duplicates. Titles are
+compared through MinHash signatures banded into an LSH index, so each
+item is checked against a handful of candidates instead of every other
+item; candidates are confirmed with the exact word-set Jaccard similarity.
+"""
+import os
+import re
+import zlib
+from functools import lru_cache
+from typing import Dict, List, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from feeds import FeedRecord
+
+# Word-set Jaccard similarity at which two titles are the same story
+DEDUP_TITLE_THRESHOLD = float(os.getenv("DEDUP_TITLE_THRESHOLD", "0.7"))
+# Titles shorter than this many words only merge when their word sets are equal
+DEDUP_MIN_TITLE_WORDS = 3
+
+# MinHash signature of BANDS * ROWS hashes. Titles at the threshold collide in
+# at least one band with probability 1 - (1 - 0.7**2)**8 > 99%
+_BANDS, _ROWS = 8, 2
+_SEEDS = [zlib.crc32(f"minhash-{i}".encode()) for i in range(_BANDS * _ROWS)]
+# Confirm at most this many candidates per item to stay linear on degenerate input
+_MAX_CANDIDATES = 8
+
+_TRACKING_PARAMS = {
+    "fbclid", "gclid", "dclid", "msclkid", "mc_cid", "mc_eid", "igshid", "yclid",
+    "ref", "ref_src", "ref_url", "referrer", "source", "src", "via", "share", "smid", "cmpid",
+}
+_HOST_PREFIXES = ("www.", "m.", "mobile.", "amp.")
+
+# "Show HN: ...", "Ask HN: ..."
+_TITLE_PREFIX_RE = re.compile(r"^\s*(?:show|ask|tell|launch)\s+hn\s*:\s*", re.I)
+# Trailing "(2023)", "[pdf]", "(Mark Gurman/Bloomberg)"
+_TITLE_SUFFIX_RE = re.compile(r"\s*(?:\([^()]*\)|\[[^\[\]]*\])\s*$")
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have how i in is it its of on or that the this to was "
+    "we what when why with you your".split()
+)
+
+
+@lru_cache(maxsize=8192)
+def canonical_url(url: Optional[str]) -> Optional[str]:
+    """Scheme-less, lowercased host, no tracking params, fragment or trailing slash."""
+    if not url:
+        return None
+    try:
+        parts = urlsplit(url.strip())
+    except ValueError:
+        return url
+    host = (parts.hostname or "").lower()
+    for prefix in _HOST_PREFIXES:
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+            break
+    if parts.port and parts.port not in (80, 443):
+        host = f"{host}:{parts.port}"
+    path = parts.path.rstrip("/")
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith("utm_") and k.lower() not in _TRACKING_PARAMS
+    )
+    return urlunsplit(("", host, path, urlencode(query), ""))
+
+
+def title_words(title: Optional[str]) -> frozenset:
+    """Normalized word set of a title, without HN prefixes, trailing tags and stopwords."""
+    if not title:
+        return frozenset()
+    title = _TITLE_PREFIX_RE.sub("", title)
+    title = _TITLE_SUFFIX_RE.sub("", title) or title
+    return frozenset(w for w in _WORD_RE.findall(title.lower()) if w not in _STOPWORDS)
+
+
+def _signature(words: frozenset) -> List[int]:
+    hashes = [zlib.crc32(w.encode()) for w in words]
+    return [min(h ^ seed for h in hashes) for seed in _SEEDS]
+
+
+def _similar(a: frozenset, b: frozenset) -> bool:
+    if len(a) < DEDUP_MIN_TITLE_WORDS or len(b) < DEDUP_MIN_TITLE_WORDS:
+        return a == b
+    return len(a & b) / len(a | b) >= DEDUP_TITLE_THRESHOLD
+
+
+def _merge(group: List[FeedRecord]) -> FeedRecord:
+    """One record for a story: the highest-scored item, with the combined
+    score and every source it appeared on (in extra["sources"])."""
+    if len(group) == 1:
+        return group[0]
+    best = max(group, key=lambda r: r.upvotes)
+    extra = dict(best.extra or {})
+    extra["sources"] = [
+        {"source": r.source, "link": r.link, "score": r.upvotes} for r in group
+    ]
+    extra["combined_score"] = sum(r.upvotes for r in group)
+    return FeedRecord(
+        best.title, best.link, best.source, best.published, best.summary, extra,
+        best.timestamp, extra["combined_score"],
+    )
+
+
+def merge_duplicates(records: List[FeedRecord]) -> List[FeedRecord]:
+    """
+    Collapse records that describe the same story into one, in a single
+    pass. Unmerged records are returned as-is, in their original order;
+    a merged story takes the position of its first occurrence.
+    """
+    groups: List[List[FeedRecord]] = []
+    group_words: List[frozenset] = []
+    by_url: Dict[str, int] = {}
+    buckets: Dict[tuple, List[int]] = {}
+
+    for record in records:
+        url = canonical_url(record.link)
+        words = title_words(record.title)
+        signature = _signature(words) if words else None
+        band_keys = [
+            (band, tuple(signature[band * _ROWS:(band + 1) * _ROWS])) for band in range(_BANDS)
+        ] if signature else []
+
+        match = by_url.get(url) if url else None
+        if match is None and words:
+            seen = set()
+            for key in band_keys:
+                for candidate in buckets.get(key, ()):
+                    if candidate in seen:
+                        continue
+                    seen.add(candidate)
+                    if _similar(words, group_words[candidate]):
+                        match = candidate
+                        break
+                    if len(seen) >= _MAX_CANDIDATES:
+                        break
+                if match is not None or len(seen) >= _MAX_CANDIDATES:
+                    break
+
+        if match is None:
+            match = len(groups)
+            groups.append([])
+            group_words.append(words)
+            for key in band_keys:
+                buckets.setdefault(key, []).append(match)
+        groups[match].append(record)
+        if url:
+            by_url.setdefault(url, match)
+
+    return [_merge(group) for group in groups]
@@ -0,0 +1,23 @@
+import json
+from typing import Any, Union
+
+# orjson is several times faster than the stdlib for our payloads; fall back
+# to json when it is not installed
+try:
+    import orjson
+
+    def dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj)
+
+    def loads(data: Union[bytes, str]) -> Any:
+        return orjson.loads(data)
+
+    ENGINE = "orjson"
+except ImportError:
+    def dumps(obj: Any) -> bytes:
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode()
+
+    def loads(data: Union[bytes, str]) -> Any:
+        return json.loads(data)
+
+    ENGINE = "json"
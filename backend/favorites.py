@@ -0,0 +1,178 @@
+"""
+Favorites storage: upserts on (user_id, feed_link), bulk add/remove,
+keyset pagination, and the per-user change log that lets clients sync
+/favorites/links incrementally instead of downloading every link.
+"""
+import logging
+import os
+from typing import List, Optional
+
+from sqlalchemy import inspect, func, text
+from sqlalchemy.orm import Session
+from sqlalchemy.schema import CreateIndex
+
+import database
+import models
+import schemas
+
+logger = logging.getLogger(__name__)
+
+FAVORITES_BULK_MAX = int(os.getenv("FAVORITES_BULK_MAX", "500"))
+FAVORITES_PAGE_MAX = int(os.getenv("FAVORITES_PAGE_MAX", "100"))
+
+_FIELDS = ("feed_title", "feed_source", "feed_published", "feed_summary")
+
+
+def ensure_indexes(engine):
+    """
+    create_all() does not add indexes to a table that already exists, so
+    databases created before uq_favorites_user_link get it here. Duplicate
+    rows left by the old read-then-insert race are dropped first, keeping
+    the oldest.
+    """
+    existing = {ix["name"] for ix in inspect(engine).get_indexes("favorites")}
+    missing = [ix for ix in models.Favorite.__table__.indexes if ix.name not in existing]
+    if not missing:
+        return
+    with engine.begin() as conn:
+        if any(ix.unique for ix in missing):
+            removed = conn.execute(text(
+                "DELETE FROM favorites WHERE id NOT IN "
+                "(SELECT MIN(id) FROM favorites GROUP BY user_id, feed_link)"
+            )).rowcount
+            if removed:
+                logger.info(f"🧹 Removed {removed} duplicate favorites")
+        for ix in missing:
+            # IF NOT EXISTS: another worker may be creating it at the same time
+            conn.execute(CreateIndex(ix, if_not_exists=True))
+            logger.info(f"✅ Created index {ix.name}")
+
+
+def _record_changes(db: Session, user_id: int, links: List[str], removed: bool):
+    """
+    Append one change per link, replacing that link's previous change.
+
+    Change ids are the user's sync versions, so they must become visible in
+    id order: Postgres hands out sequence values before commit, and two
+    concurrent writers could otherwise commit ids N+1 and N in that order,
+    letting a client sync to N+1 and never see N. The user's row is locked
+    until the caller commits, so one user's changes are written one
+    transaction at a time. SQLite already allows only one writer.
+    """
+    if not links:
+        return
+    db.query(models.User.id).filter(models.User.id == user_id).with_for_update().first()
+    db.query(models.FavoriteChange).filter(
+        models.FavoriteChange.user_id == user_id,
+        models.FavoriteChange.feed_link.in_(links),
+    ).delete(synchronize_session=False)
+    db.add_all([models.FavoriteChange(user_id=user_id, feed_link=link, removed=removed) for link in links])
+
+
+def upsert_favorites(db: Session, user_id: int, items: List[schemas.FavoriteCreate]) -> List[str]:
+    """Add or refresh favorites in one statement; returns the links written."""
+    values = {}
+    for item in items:
+        # Last one wins for a link repeated within the request
+        values[item.feed_link] = {"user_id": user_id, "feed_link": item.feed_link,
+                                  **{field: getattr(item, field) for field in _FIELDS}}
+    if not values:
+        return []
+
+    insert = database.dialect_insert()
+    if insert is not None:
+        stmt = insert(models.Favorite).values(list(values.values()))
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["user_id", "feed_link"],
+            set_={field: stmt.excluded[field] for field in _FIELDS},
+        )
+        db.execute(stmt)
+    else:
+        # Portable fallback: update what exists, insert the rest
+        existing = {
+            row.feed_link: row for row in db.query(models.Favorite).filter(
+                models.Favorite.user_id == user_id,
+                models.Favorite.feed_link.in_(values),
+            )
+        }
+        for link, value in values.items():
+            row = existing.get(link)
+            if row:
+                for field in _FIELDS:
+                    setattr(row, field, value[field])
+            else:
+                db.add(models.Favorite(**value))
+
+    links = list(values)
+    _record_changes(db, user_id, links, removed=False)
+    db.commit()
+    return links
+
+
+def remove_favorites(db: Session, user_id: int, links: List[str]) -> List[str]:
+    """Delete favorites by link; returns the links that were actually favorited."""
+    if not links:
+        return []
+    found = [row.feed_link for row in db.query(models.Favorite.feed_link).filter(
+        models.Favorite.user_id == user_id,
+        models.Favorite.feed_link.in_(set(links)),
+    )]
+    if found:
+        db.query(models.Favorite).filter(
+            models.Favorite.user_id == user_id,
+            models.Favorite.feed_link.in_(found),
+        ).delete(synchronize_session=False)
+        _record_changes(db, user_id, found, removed=True)
+        db.commit()
+    return found
+
+
+def get_favorite(db: Session, user_id: int, link: str) -> Optional[models.Favorite]:
+    return db.query(models.Favorite).filter(
+        models.Favorite.user_id == user_id,
+        models.Favorite.feed_link == link,
+    ).first()
+
+
+def list_favorites(db: Session, user_id: int, limit: Optional[int] = None,
+                   before_id: Optional[int] = None) -> List[models.Favorite]:
+    """Newest first. Keyset pagination on id: pass the last id seen as before_id."""
+    query = db.query(models.Favorite).filter(models.Favorite.user_id == user_id)
+    if before_id is not None:
+        query = query.filter(models.Favorite.id < before_id)
+    query = query.order_by(models.Favorite.id.desc())
+    if limit is not None:
+        query = query.limit(limit)
+    return query.all()
+
+
+def current_version(db: Session, user_id: int) -> int:
+    version = db.query(func.max(models.FavoriteChange.id)).filter(
+        models.FavoriteChange.user_id == user_id
+    ).scalar()
+    return version or 0
+
+
+def changes_since(db: Session, user_id: int, since: int) -> dict:
+    """
+    {"version", "added", "removed"} relative to a version the client already
+    has. since=0 is a full sync: every current link, nothing removed.
+    """
+    version = current_version(db, user_id)
+    if since <= 0:
+        links = [row.feed_link for row in db.query(models.Favorite.feed_link).filter(
+            models.Favorite.user_id == user_id
+        )]
+        return {"version": version, "added": links, "removed": []}
+
+    changes = db.query(
+        models.FavoriteChange.id, models.FavoriteChange.feed_link, models.FavoriteChange.removed
+    ).filter(
+        models.FavoriteChange.user_id == user_id,
+        models.FavoriteChange.id > since,
+    ).order_by(models.FavoriteChange.id).all()
+    added, removed = [], []
+    for change_id, link, was_removed in changes:
+        (removed if was_removed else added).append(link)
+        version = max(version, change_id)
+    return {"version": max(version, since), "added": added, "removed": removed}
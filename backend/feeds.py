@@ -1,11 +1,26 @@
+import contextvars
+import logging
 import os
+import re
+import threading
+import time
 import requests
-import feedparser
-from bs4 import BeautifulSoup
-from typing import List
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout, as_completed
+from typing import Callable, Iterator, List, Optional, Tuple
 from dotenv import load_dotenv
 from fastapi import HTTPException
 from datetime import datetime, timezone
+import http_client
+from http_client import client as http
+import dates
+import sanitize
+import tokens
+import health
+import metrics
+import timing
+from cache import LocalCache
+
+logger = logging.getLogger(__name__)
 
 # Load environment variables regardless of where this module lives.
 # Try repo root, current dir, then default dotenv search which also
@@ -33,6 +48,49 @@ PRODUCT_HUNT_API_KEY = os.getenv("Product_hunt_API_Key")
 PRODUCT_HUNT_API_SECRET = os.getenv("Product_hunt_API_Secret")
 
 
+# Conditional GET: validators and parsed items per feed URL, so a 304 Not
+# Modified reuses the last parse instead of re-running feedparser/BeautifulSoup.
+# url -> {"etag": str|None, "last_modified": str|None, "items": list}
+_validators = {}
+
+
+def _conditional_get(url: str, headers: dict) -> tuple:
+    """
+    GET with If-None-Match / If-Modified-Since for a URL we have parsed before.
+    Returns (response, None), or (None, copies of the previously parsed items)
+    when upstream answered 304. A 304 we have no stored copy for (validators
+    added by someone else, e.g. a proxy) is retried once, then reported.
+    """
+    # The entry the validators came from; another thread may replace or drop it meanwhile
+    cached = _validators.get(url)
+    conditional = dict(headers)
+    if cached:
+        if cached["etag"]:
+            conditional["If-None-Match"] = cached["etag"]
+        if cached["last_modified"]:
+            conditional["If-Modified-Since"] = cached["last_modified"]
+    response = http.get(url, headers=conditional)
+    if response.status_code != 304:
+        return response, None
+    if cached:
+        # Copies, because callers tag items in place
+        return None, [dict(it) for it in cached["items"]]
+    logger.warning(f"⚠️ 304 from {url} with no stored copy, retrying without validators")
+    response = http.get(url, headers=headers)
+    if response.status_code == 304:
+        raise HTTPException(status_code=502, detail=f"Upstream answered 304 with nothing cached: {url}")
+    return response, None
+
+
+def _remember_validators(url: str, response, items: List[dict]):
+    etag = response.headers.get("ETag")
+    last_modified = response.headers.get("Last-Modified")
+    if etag or last_modified:
+        _validators[url] = {"etag": etag, "last_modified": last_modified, "items": [dict(it) for it in items]}
+    else:
+        _validators.pop(url, None)
+
+
 def fetch_rss(url: str) -> List[dict]:
     """Fetch and parse RSS/Atom feeds."""
     try:
@@ -41,29 +99,37 @@ def fetch_rss(url: str) -> List[dict]:
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
             "Accept": "application/rss+xml, application/xml, application/atom+xml, text/xml, */*",
             "Accept-Language": "en-US,en;q=0.9",
-            "Accept-Encoding": "gzip, deflate",
-            "Connection":  "keep-alive"
         }
         
-        # Fetch the feed content
-        response = requests.get(url, headers=headers, timeout=15)
+        # Fetch the feed content (pooled keep-alive connection, compressed)
+        response, unchanged = _conditional_get(url, headers)
+        if unchanged is not None:
+            return unchanged
         response.raise_for_status()
         
-        # Parse the fetched content
-        parsed = feedparser.parse(response.content)
+        # Parse the fetched content; feedparser is imported on first use to keep worker startup fast
+        import feedparser
+        with metrics.PARSE_SECONDS.time(parser="feedparser"), timing.span("feedparser"):
+            parsed = feedparser.parse(response.content)
         
         # Check if parsing was successful
         if parsed.bozo and not parsed.entries:
             raise HTTPException(status_code=502, detail=f"Failed to parse RSS feed: {url}")
 
+        entries = parsed.entries[: 30]
+        with metrics.PARSE_SECONDS.time(parser="html_to_text"), timing.span("clean_html"):
+            summaries = sanitize.html_to_text_batch(
+                entry.get("summary", entry.get("description", "")) for entry in entries
+            )
         items = []
-        for entry in parsed.entries[: 30]: 
+        for entry, summary in zip(entries, summaries):
             items.append({
                 "title": entry.get("title"),
                 "link": entry.get("link"),
                 "published": entry.get("published", entry.get("updated")),
-                "summary": clean_html(entry.get("summary", entry.get("description", ""))),
+                "summary": summary,
             })
+        _remember_validators(url, response, items)
         return items
     except HTTPException:
         raise
@@ -75,98 +141,130 @@ def fetch_rss(url: str) -> List[dict]:
 
 def clean_html(text: str) -> str:
     """Remove HTML tags and clean up text for display."""
-    if not text:
-        return ""
-    soup = BeautifulSoup(text, "html.parser")
-    return soup.get_text(separator=" ", strip=True)[:500]
+    with timing.span("clean_html"):
+        return sanitize.html_to_text(text)
 
 
-def parse_datetime(date_str: str) -> datetime:
-    """Parse various datetime formats to datetime object."""
-    if not date_str:
-        return datetime.min.replace(tzinfo=timezone.utc)
-    
-    try:
-        # Try ISO format first
-        if 'T' in date_str:
-            # Handle ISO format with or without timezone
-            if date_str.endswith('Z'):
-                date_str = date_str[:-1] + '+00:00'
-            return datetime.fromisoformat(date_str.replace('Z', '+00:00'))
-        
-        # Try common RSS formats
-        from email.utils import parsedate_to_datetime
-        try:
-            return parsedate_to_datetime(date_str)
-        except:
-            pass
-        
-        # Fallback - try dateutil if available
-        try:
-            from dateutil import parser
-            return parser.parse(date_str)
-        except:
-            pass
-            
-    except:
-        pass
-    
-    return datetime.min.replace(tzinfo=timezone.utc)
+def parse_datetime(date_str: str, source: Optional[str] = None) -> datetime:
+    """Parse various datetime formats to a UTC datetime; datetime.min when unparseable."""
+    return dates.parse(date_str, source) or dates.EPOCH_MIN
+
 
+# Hot-score inputs scraped from summaries like "⬆ 42 | ..." or "Score: 42 points"
+_UPVOTES_RE = re.compile(r'(?:⬆|↑|Score:?)\s*(\d+)')
+# Epoch seconds of datetime.min; unparseable dates sort as oldest, as before
+MIN_TIMESTAMP = dates.EPOCH_MIN.timestamp()
 
-def calculate_hot_score(item: dict, gravity: float = 1.8) -> float:
+
+def _timestamp(published: Optional[str], source: Optional[str] = None) -> Optional[float]:
+    """Epoch seconds for a published string, None when there is none."""
+    if not published:
+        return None
+    dt = dates.parse(published, source)
+    return dt.timestamp() if dt is not None else MIN_TIMESTAMP
+
+
+def _upvotes(extra: Optional[dict], summary: Optional[str]) -> int:
+    """Get upvotes from extra or parse from summary"""
+    if extra and extra.get("score"):
+        return extra["score"]
+    match = _UPVOTES_RE.search(summary or "")
+    return int(match.group(1)) if match else 0
+
+
+class FeedRecord:
+    """
+    Compact feed item with its sort keys parsed once, at fetch time.
+
+    `timestamp` is epoch seconds (None when upstream gave no date) and
+    `upvotes` the score used by the hot ranking. Both travel with the
+    record through the caches as the "ts"/"upvotes" keys of to_dict(internal=True),
+    so sorting never re-parses dates or summaries.
+    """
+    __slots__ = ("title", "link", "source", "published", "summary", "extra", "timestamp", "upvotes")
+
+    def __init__(self, title, link=None, source=None, published=None, summary=None, extra=None,
+                 timestamp=None, upvotes=0):
+        self.title = title
+        self.link = link
+        self.source = source
+        self.published = published
+        self.summary = summary
+        self.extra = extra
+        self.timestamp = timestamp
+        self.upvotes = upvotes
+
+    @classmethod
+    def from_dict(cls, item: dict, source: Optional[str] = None) -> "FeedRecord":
+        """Build from a fetcher dict, or from to_dict(internal=True) without re-parsing.
+        `source` lets the date parser try that source's usual format first."""
+        if "ts" in item:
+            timestamp, upvotes = item["ts"], item.get("upvotes", 0)
+        else:
+            timestamp = _timestamp(item.get("published"), source)
+            upvotes = _upvotes(item.get("extra"), item.get("summary"))
+        return cls(
+            item.get("title"), item.get("link"), item.get("source"), item.get("published"),
+            item.get("summary"), item.get("extra"), timestamp, upvotes,
+        )
+
+    def to_dict(self, internal: bool = False) -> dict:
+        item = {
+            "title": self.title,
+            "link": self.link,
+            "source": self.source,
+            "published": self.published,
+            "summary": self.summary,
+        }
+        if self.extra is not None:
+            item["extra"] = self.extra
+        if internal:
+            item["ts"] = self.timestamp
+            item["upvotes"] = self.upvotes
+        return item
+
+
+def calculate_hot_score(item, gravity: float = 1.8, now: Optional[float] = None) -> float:
     """
     Calculate hot score using algorithm similar to Hacker News/Reddit.
     Score = Upvotes / (Age + 2)^Gravity
     """
-    # Get upvotes from extra or parse from summary
-    upvotes = 0
-    if item.get("extra") and item["extra"].get("score"):
-        upvotes = item["extra"]["score"]
-    else:
-        # Try to parse from summary
-        summary = item.get("summary", "")
-        import re
-        match = re.search(r'(?:⬆|↑|Score:?)\s*(\d+)', summary)
-        if match:
-            upvotes = int(match.group(1))
-    
-    # Get age in hours
-    published = item.get("published")
-    if published:
-        pub_dt = parse_datetime(published)
-        now = datetime.now(timezone.utc)
-        age_hours = max(0, (now - pub_dt).total_seconds() / 3600)
-    else:
+    record = item if isinstance(item, FeedRecord) else FeedRecord.from_dict(item)
+    if record.timestamp is None:
         age_hours = 24  # Default to 24 hours if no timestamp
-    
-    # Calculate score
-    score = upvotes / ((age_hours + 2) ** gravity)
-    return score
+    else:
+        now = time.time() if now is None else now
+        age_hours = max(0, (now - record.timestamp) / 3600)
+    return record.upvotes / ((age_hours + 2) ** gravity)
 
 
-def sort_items(items: List[dict], sort_by: str = "hot") -> List[dict]:
+SORT_MODES = ("hot", "new")
+
+
+def sort_items(items: List[FeedRecord], sort_by: str = "hot", gravity: float = 1.8) -> List[FeedRecord]:
     """Sort items by 'hot' (score-based) or 'new' (time-based)."""
-    if sort_by == "new":
-        # Sort by published date, newest first
-        return sorted(
-            items,
-            key=lambda x: parse_datetime(x.get("published", "")),
-            reverse=True
-        )
-    else:  # hot
-        # Sort by hot score
-        return sorted(
-            items,
-            key=lambda x: calculate_hot_score(x),
-            reverse=True
-        )
+    records = [it if isinstance(it, FeedRecord) else FeedRecord.from_dict(it) for it in items]
+    with metrics.SORT_SECONDS.time(sort="new" if sort_by == "new" else "hot"), timing.span("sort"):
+        if sort_by == "new":
+            # Sort by published date, newest first
+            keys = [MIN_TIMESTAMP if r.timestamp is None else r.timestamp for r in records]
+        else:  # hot
+            # One pass over the precomputed upvotes/timestamps with a shared "now"
+            now = time.time()
+            keys = [
+                r.upvotes / (((24 if r.timestamp is None else max(0, (now - r.timestamp) / 3600)) + 2) ** gravity)
+                for r in records
+            ]
+        order = sorted(range(len(records)), key=keys.__getitem__, reverse=True)
+    return [records[i] for i in order]
 
 
 def fetch_json(url: str) -> List[dict]:
     """Fetch JSON feeds like Lobste.rs."""
     try:
-        resp = requests.get(url, headers={"User-Agent": "DevPulse/1.0"}, timeout=15)
+        resp, unchanged = _conditional_get(url, {})
+        if unchanged is not None:
+            return unchanged
         resp.raise_for_status()
         data = resp.json()
 
@@ -180,10 +278,8 @@ def fetch_json(url: str) -> List[dict]:
                     "published": entry.get("created_at") if isinstance(entry.get("created_at"), str) else None,
                     "summary": entry.get("description") or entry.get("comments_url", ""),
                 })
-            return items
-
         # If the structure is unknown, try to coerce
-        if isinstance(data, dict) and "items" in data:
+        elif isinstance(data, dict) and "items" in data:
             items = []
             for entry in data.get("items", [])[:30]:
                 items.append({
@@ -192,46 +288,110 @@ def fetch_json(url: str) -> List[dict]:
                     "published": entry.get("published"),
                     "summary": entry.get("summary", entry.get("description", "")),
                 })
-            return items
+        else:
+            raise HTTPException(status_code=502, detail=f"Unsupported JSON feed structure for {url}")
 
-        raise HTTPException(status_code=502, detail=f"Unsupported JSON feed structure for {url}")
+        _remember_validators(url, resp, items)
+        return items
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=502, detail=f"JSON fetch error for {url}: {str(e)}")
 
 
-def fetch_hackernews(api_base: str) -> List[dict]:
+# Hacker News tuning
+HN_STORY_LIMIT = int(os.getenv("HN_STORY_LIMIT", "25"))
+HN_MAX_WORKERS = int(os.getenv("HN_MAX_WORKERS", "10"))
+# Title/url/time never change once a story exists; only score and comment
+# counts move, so a cached story is re-fetched at most this often.
+HN_SCORE_REFRESH_SECONDS = int(os.getenv("HN_SCORE_REFRESH_SECONDS", "120"))
+
+# Item fetches share the pooled client; keep HTTP_POOL_MAXSIZE >= HN_MAX_WORKERS
+# so every worker gets a keep-alive socket. Separate from _fetch_pool: fetch_hackernews itself runs inside that pool
+_hn_pool = ThreadPoolExecutor(max_workers=HN_MAX_WORKERS, thread_name_prefix="hn-item")
+
+# story id -> {"story": raw item JSON, "refreshed_at": monotonic time}
+_hn_item_cache = {}
+# Held while reading or changing _hn_item_cache, never across network calls:
+# the ingestion worker and requests can run fetch_hackernews at the same time
+_hn_item_lock = threading.Lock()
+
+
+def _fetch_hn_story(api_base: str, story_id: int) -> Optional[dict]:
+    """Fetch a single Hacker News item, returning None on any failure."""
+    try:
+        return http.get(f"{api_base}item/{story_id}.json", timeout=5).json()
+    except Exception:
+        return None
+
+
+def _hn_story_to_item(story_id: int, it: dict) -> dict:
+    """Convert a Hacker News item JSON object to a feed item."""
+    title = it.get("title")
+    url = it.get("url") or f"https://news.ycombinator.com/item?id={story_id}"
+    score = it.get("score", 0)
+    # Convert Unix timestamp to ISO format
+    timestamp = it.get("time")
+    published = None
+    if timestamp:
+        published = datetime.fromtimestamp(timestamp, tz=timezone.utc).isoformat()
+    return {
+        "title": f"{title}",
+        "link": url,
+        "published": published,
+        "summary": f"Score: {score} points | {it.get('descendants', 0)} comments",
+        "extra": {"score": score, "comments": it.get('descendants', 0), "timestamp": timestamp}
+    }
+
+
+def fetch_hackernews(api_base: str, limit: Optional[int] = None) -> List[dict]:
     """Fetch top stories from Hacker News API."""
     try:
         top_url = api_base.rstrip("/") + "/topstories.json"
-        resp = requests.get(top_url, headers={"User-Agent": "DevPulse/1.0"}, timeout=15)
+        resp = http.get(top_url)
         resp.raise_for_status()
-        ids = resp.json()[:25]  # Limit to 25 for performance
-
-        items = []
-        for story_id in ids:
-            try:
-                it = requests.get(f"{api_base}item/{story_id}.json", timeout=5).json()
-                if not it:
+        ids = resp.json()[:limit or HN_STORY_LIMIT]
+
+        # Only fetch stories we have never seen or whose counts are due a refresh
+        now = time.monotonic()
+        with _hn_item_lock:
+            stale_ids = [
+                story_id for story_id in ids
+                if story_id not in _hn_item_cache
+                or now - _hn_item_cache[story_id]["refreshed_at"] >= HN_SCORE_REFRESH_SECONDS
+            ]
+        # Item fetches run on other threads; they share this fetch's deadline
+        deadline = http_client.current_deadline()
+
+        def fetch_story(story_id):
+            with http_client.deadline(at=deadline):
+                return _fetch_hn_story(api_base, story_id)
+
+        fetched = list(_hn_pool.map(fetch_story, stale_ids))
+        with _hn_item_lock:
+            for story_id, story in zip(stale_ids, fetched):
+                if not story:
                     continue
-                title = it.get("title")
-                url = it.get("url") or f"https://news.ycombinator.com/item?id={story_id}"
-                score = it.get("score", 0)
-                # Convert Unix timestamp to ISO format
-                timestamp = it.get("time")
-                published = None
-                if timestamp:
-                    published = datetime.fromtimestamp(timestamp, tz=timezone.utc).isoformat()
-                items.append({
-                    "title": f"{title}",
-                    "link": url,
-                    "published": published,
-                    "summary": f"Score: {score} points | {it.get('descendants', 0)} comments",
-                    "extra": {"score": score, "comments": it.get('descendants', 0), "timestamp": timestamp}
-                })
-            except:
-                continue
+                cached = _hn_item_cache.get(story_id)
+                if cached:
+                    # Immutable fields stay as first seen; only the counters move
+                    cached["story"]["score"] = story.get("score", 0)
+                    cached["story"]["descendants"] = story.get("descendants", 0)
+                    cached["refreshed_at"] = now
+                else:
+                    _hn_item_cache[story_id] = {"story": story, "refreshed_at": now}
+
+            # Drop stories that fell off the front page so the cache stays bounded
+            wanted = set(ids)
+            for story_id in list(_hn_item_cache):
+                if story_id not in wanted:
+                    _hn_item_cache.pop(story_id, None)
+
+            items = []
+            for story_id in ids:
+                cached = _hn_item_cache.get(story_id)
+                if cached:
+                    items.append(_hn_story_to_item(story_id, cached["story"]))
         return items
     except Exception as e:
         raise HTTPException(status_code=502, detail=f"Hacker News fetch error: {str(e)}")
@@ -244,10 +404,9 @@ def fetch_devto() -> List[dict]:
         if DEVTO_API_KEY:
             headers["api-key"] = DEVTO_API_KEY
         
-        resp = requests.get(
+        resp = http.get(
             "https://dev.to/api/articles?per_page=30",
             headers=headers,
-            timeout=15
         )
         resp.raise_for_status()
         articles = resp.json()
@@ -265,42 +424,50 @@ def fetch_devto() -> List[dict]:
         raise HTTPException(status_code=502, detail=f"DEV.to fetch error: {str(e)}")
 
 
+def _fetch_reddit_token() -> Tuple[str, Optional[int]]:
+    """Client-credentials token for oauth.reddit.com."""
+    token_resp = http.post(
+        "https://www.reddit.com/api/v1/access_token",
+        auth=requests.auth.HTTPBasicAuth(REDDIT_CLIENT_ID, REDDIT_CLIENT_SECRET),
+        data={"grant_type": "client_credentials"},
+        headers={"User-Agent": "DevPulse/1.0"},
+        timeout=10
+    )
+    token_resp.raise_for_status()
+    body = token_resp.json()
+    return body.get("access_token"), body.get("expires_in")
+
+
+tokens.manager.register("reddit", _fetch_reddit_token)
+
+
+# Reddit's own rule for subreddit names; anything else would end up in the URL path
+SUBREDDIT_RE = re.compile(r"[A-Za-z0-9_]{2,21}")
+
+
 def fetch_reddit(subreddit: str = "programming") -> List[dict]:
     """Fetch posts from Reddit using OAuth."""
     try:
         # Reddit requires OAuth for reliable API access
         if REDDIT_CLIENT_ID and REDDIT_CLIENT_SECRET:
-            # Get OAuth token
-            auth = requests.auth.HTTPBasicAuth(REDDIT_CLIENT_ID, REDDIT_CLIENT_SECRET)
-            data = {"grant_type": "client_credentials"}
             headers = {"User-Agent": "DevPulse/1.0"}
-            
-            token_resp = requests.post(
-                "https://www.reddit.com/api/v1/access_token",
-                auth=auth,
-                data=data,
-                headers=headers,
-                timeout=10
-            )
-            token_resp.raise_for_status()
-            token = token_resp.json().get("access_token")
-            
-            # Fetch posts with OAuth
+            url = f"https://oauth.reddit.com/r/{subreddit}/hot?limit=25"
+            token = tokens.manager.get("reddit")
             headers["Authorization"] = f"Bearer {token}"
-            resp = requests.get(
-                f"https://oauth.reddit.com/r/{subreddit}/hot?limit=25",
-                headers=headers,
-                timeout=15
-            )
+            resp = http.get(url, headers=headers)
+            if resp.status_code == 401:
+                # Revoked or expired early: get a new token and retry once
+                tokens.manager.invalidate("reddit", token)
+                headers["Authorization"] = f"Bearer {tokens.manager.get('reddit')}"
+                resp = http.get(url, headers=headers)
             resp.raise_for_status()
             posts = resp.json().get("data", {}).get("children", [])
         else:
             # Fallback to public JSON endpoint (less reliable, rate limited)
             headers = {"User-Agent": "DevPulse/1.0"}
-            resp = requests.get(
+            resp = http.get(
                 f"https://www.reddit.com/r/{subreddit}/hot.json?limit=25",
                 headers=headers,
-                timeout=15
             )
             resp.raise_for_status()
             posts = resp.json().get("data", {}).get("children", [])
@@ -336,10 +503,12 @@ def fetch_github_trending(url: str) -> List[dict]:
         if GITHUB_TOKEN:
             headers["Authorization"] = f"token {GITHUB_TOKEN}"
         
-        resp = requests.get(url, headers=headers, timeout=15)
+        resp = http.get(url, headers=headers)
         resp.raise_for_status()
 
-        soup = BeautifulSoup(resp.text, "html.parser")
+        from bs4 import BeautifulSoup  # Imported on first use, like feedparser
+        with metrics.PARSE_SECONDS.time(parser="beautifulsoup"), timing.span("beautifulsoup"):
+            soup = BeautifulSoup(resp.text, "html.parser")
         items = []
 
         # GitHub trending page structure - find repository rows
@@ -387,6 +556,25 @@ def fetch_github_trending(url: str) -> List[dict]:
         raise HTTPException(status_code=502, detail=f"GitHub Trending fetch error: {str(e)}")
 
 
+def _fetch_product_hunt_token() -> Tuple[str, Optional[int]]:
+    """OAuth2 client-credentials token for the Product Hunt GraphQL API."""
+    token_resp = http.post(
+        "https://api.producthunt.com/v2/oauth/token",
+        json={
+            "client_id": PRODUCT_HUNT_API_KEY,
+            "client_secret": PRODUCT_HUNT_API_SECRET,
+            "grant_type": "client_credentials"
+        },
+        headers={"Content-Type": "application/json"},
+    )
+    token_resp.raise_for_status()
+    body = token_resp.json()
+    return body.get("access_token"), body.get("expires_in")
+
+
+tokens.manager.register("product_hunt", _fetch_product_hunt_token)
+
+
 def fetch_product_hunt() -> List[dict]:
     """Fetch products from Product Hunt GraphQL API using OAuth2."""
     try:
@@ -394,23 +582,7 @@ def fetch_product_hunt() -> List[dict]:
             # Fallback to RSS if no API credentials
             return fetch_rss("https://www.producthunt.com/feed")
         
-        # Step 1: Get OAuth2 access token using client credentials
-        token_resp = requests.post(
-            "https://api.producthunt.com/v2/oauth/token",
-            json={
-                "client_id": PRODUCT_HUNT_API_KEY,
-                "client_secret": PRODUCT_HUNT_API_SECRET,
-                "grant_type": "client_credentials"
-            },
-            headers={"Content-Type": "application/json"},
-            timeout=15
-        )
-        token_resp.raise_for_status()
-        access_token = token_resp.json().get("access_token")
-        
-        if not access_token:
-            # Fallback to RSS if token retrieval fails
-            return fetch_rss("https://www.producthunt.com/feed")
+        access_token = tokens.manager.get("product_hunt")
         
         headers = {
             "Authorization": f"Bearer {access_token}",
@@ -436,12 +608,14 @@ def fetch_product_hunt() -> List[dict]:
         }
         """
         
-        resp = requests.post(
+        resp = http.post(
             "https://api.producthunt.com/v2/api/graphql",
             headers=headers,
             json={"query": query},
-            timeout=15
         )
+        if resp.status_code == 401:
+            # Next call gets a fresh token; this one falls back to RSS below
+            tokens.manager.invalidate("product_hunt", access_token)
         resp.raise_for_status()
         data = resp.json()
         
@@ -472,7 +646,44 @@ def fetch_product_hunt() -> List[dict]:
             raise HTTPException(status_code=502, detail=f"Product Hunt fetch error: {str(e)}")
 
 
-def fetch_feed_for_source(source: dict) -> List[dict]:
+# Last successful result per source, served while the source is failing
+HEALTH_LAST_GOOD_TTL = int(os.getenv("HEALTH_LAST_GOOD_TTL", "21600"))
+_last_good = LocalCache(maxsize=256)
+
+
+def fetch_feed_for_source(source: dict, allow_stale: bool = True) -> List[FeedRecord]:
+    """
+    Fetch a source and return its items as FeedRecords with sort keys precomputed.
+    Goes through the source's circuit breaker and latency-based deadline; while
+    the source is failing, its last good items are returned if there are any,
+    unless allow_stale is False (ingestion, which must see the failure).
+    """
+    name = source.get("name")
+    key = f"{name} r/{source['custom_subreddit']}" if source.get("custom_subreddit") else name
+    breaker = health.registry.get(key, label=name)
+    start = time.perf_counter()
+    try:
+        with metrics.SOURCE_FETCHES_IN_FLIGHT.track(source=name), timing.span("fetch"):
+            items = breaker.call(lambda: _fetch_source_items(source))
+    except Exception as e:
+        rejected = isinstance(e, health.CircuitOpen)
+        if not rejected:
+            metrics.SOURCE_FETCH_SECONDS.observe(time.perf_counter() - start, source=name)
+        last_good = _last_good.get(key) if allow_stale else None
+        if last_good is None:
+            metrics.SOURCE_FETCHES.inc(source=name, outcome="circuit_open" if rejected else "error")
+            raise
+        metrics.SOURCE_FETCHES.inc(source=name, outcome="last_good")
+        logger.warning(f"⚠️ {key} unavailable, serving last good items: {getattr(e, 'detail', e)}")
+        return last_good
+    metrics.SOURCE_FETCH_SECONDS.observe(time.perf_counter() - start, source=name)
+    metrics.SOURCE_FETCHES.inc(source=name, outcome="ok")
+    records = [FeedRecord.from_dict(it, name) for it in items]
+    _last_good.set(key, records, HEALTH_LAST_GOOD_TTL)
+    return records
+
+
+def _fetch_source_items(source: dict) -> List[dict]:
     """Main dispatcher to fetch feed based on source type."""
     feed_type = (source.get("feed_type") or "").lower()
     url = source.get("url", "")
@@ -546,3 +757,71 @@ def fetch_feed_for_source(source: dict) -> List[dict]:
             return fetch_json(url)
         except Exception:
             raise HTTPException(status_code=502, detail=f"Could not fetch feed from {url}")
+
+
+
+# ============ CONCURRENT FAN-OUT ============
+
+# Upper bound on upstream fetches running at the same time across all requests
+FEEDS_MAX_WORKERS = int(os.getenv("FEEDS_MAX_WORKERS", "8"))
+
+# Shared pool: fetches that overrun a request's budget keep running here
+# instead of blocking the response, and never exceed FEEDS_MAX_WORKERS.
+_fetch_pool = ThreadPoolExecutor(max_workers=FEEDS_MAX_WORKERS, thread_name_prefix="feed-fetch")
+
+
+def iter_sources_concurrently(
+    sources: List[dict],
+    budget_ms: Optional[int] = None,
+    fetch: Optional[Callable[[dict], List[dict]]] = None,
+) -> Iterator[Tuple[str, str, Optional[list]]]:
+    """
+    Fetch several sources in parallel and yield (name, outcome, items) as
+    each one finishes, fastest first. outcome is "ok" (items set), "failed",
+    or, once the budget runs out, "timed_out" for fetches still running and
+    "skipped" for ones that never started. Without a budget, waits for all.
+    """
+    fetch = fetch or fetch_feed_for_source
+    # Each fetch runs in a copy of the caller's context, so its spans count toward the caller's request
+    futures = {
+        _fetch_pool.submit(contextvars.copy_context().run, fetch, source): source["name"] for source in sources
+    }
+    timeout = budget_ms / 1000 if budget_ms is not None else None
+    pending = set(futures)
+    try:
+        for future in as_completed(futures, timeout=timeout):
+            pending.discard(future)
+            try:
+                items = future.result()
+            except Exception:
+                yield futures[future], "failed", None
+                continue
+            yield futures[future], "ok", items
+    except FuturesTimeout:
+        for future in pending:
+            # cancel() only succeeds for fetches still waiting for a worker
+            yield futures[future], "skipped" if future.cancel() else "timed_out", None
+
+
+def fetch_sources_concurrently(
+    sources: List[dict],
+    budget_ms: Optional[int] = None,
+    fetch: Optional[Callable[[dict], List[dict]]] = None,
+) -> Tuple[dict, dict]:
+    """
+    Fetch several sources in parallel and return whatever finished in time.
+    `fetch` replaces fetch_feed_for_source, e.g. to go through a cache.
+
+    Returns (results, report). `results` maps source name -> items for every
+    source that completed. `report` lists source names that "failed", that
+    "timed_out" while still fetching, or that were "skipped" because they
+    never started before the deadline. Without a budget, waits for all.
+    """
+    results = {}
+    report = {"failed": [], "timed_out": [], "skipped": []}
+    for name, outcome, items in iter_sources_concurrently(sources, budget_ms, fetch):
+        if outcome == "ok":
+            results[name] = items
+        else:
+            report[outcome].append(name)
+    return results, report
@@ -0,0 +1,213 @@
+"""
+Per-source health: a circuit breaker plus latency tracking that sizes
+each source's fetch deadline.
+
+A source whose fetches keep failing is "open" for a cooldown and fails
+fast instead of tying up a worker for a full timeout. After the cooldown
+one trial fetch is let through ("half_open"): success closes the breaker,
+failure re-opens it with a doubled cooldown. The deadline for a whole
+source fetch, every HTTP call in it included, is a multiple of that
+source's recent p95 latency. Fetches cut off by the deadline count as
+samples at the time they ran, so a source that got slower raises its own
+deadline, and trial fetches get the full HEALTH_MAX_TIMEOUT.
+"""
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Callable, Dict, Optional
+
+from fastapi import HTTPException
+
+import http_client
+import metrics
+
+logger = logging.getLogger(__name__)
+
+HEALTH_FAILURE_THRESHOLD = int(os.getenv("HEALTH_FAILURE_THRESHOLD", "3"))
+HEALTH_OPEN_SECONDS = float(os.getenv("HEALTH_OPEN_SECONDS", "30"))
+HEALTH_MAX_OPEN_SECONDS = float(os.getenv("HEALTH_MAX_OPEN_SECONDS", "600"))
+# Deadline = p95 of the last HEALTH_LATENCY_SAMPLES fetches (successes and
+# timeouts) x multiplier, clamped
+HEALTH_LATENCY_SAMPLES = int(os.getenv("HEALTH_LATENCY_SAMPLES", "50"))
+HEALTH_MIN_SAMPLES = int(os.getenv("HEALTH_MIN_SAMPLES", "5"))
+HEALTH_TIMEOUT_MULTIPLIER = float(os.getenv("HEALTH_TIMEOUT_MULTIPLIER", "2.0"))
+HEALTH_MIN_TIMEOUT = float(os.getenv("HEALTH_MIN_TIMEOUT", "2"))
+HEALTH_MAX_TIMEOUT = float(os.getenv("HEALTH_MAX_TIMEOUT", "30"))
+# Until enough samples exist
+HEALTH_DEFAULT_TIMEOUT = float(os.getenv("HEALTH_DEFAULT_TIMEOUT", "20"))
+# Breakers kept for user-chosen variants of a source (custom subreddits), least recently used dropped
+HEALTH_MAX_VARIANTS = int(os.getenv("HEALTH_MAX_VARIANTS", "256"))
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class CircuitOpen(HTTPException):
+    """Raised instead of fetching while a source's breaker is open."""
+
+    def __init__(self, name: str):
+        super().__init__(status_code=503, detail=f"{name} is unavailable (circuit open)")
+
+
+def _percentile(samples, pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+class SourceHealth:
+    """Breaker state and recent fetch latencies for one source."""
+
+    def __init__(self, name: str, label: Optional[str] = None):
+        self.name = name
+        # Metrics label; custom subreddits share their source's to bound cardinality
+        self.label = label or name
+        self._lock = threading.Lock()
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.open_seconds = HEALTH_OPEN_SECONDS
+        self.opened_until = 0.0
+        self.trial_running = False
+        self.latencies = deque(maxlen=HEALTH_LATENCY_SAMPLES)
+        self.successes = 0
+        self.failures = 0
+        self.rejected = 0
+        self.last_error: Optional[str] = None
+
+    def timeout(self) -> float:
+        """Seconds a whole fetch of this source may take."""
+        with self._lock:
+            if len(self.latencies) < HEALTH_MIN_SAMPLES:
+                return HEALTH_DEFAULT_TIMEOUT
+            p95 = _percentile(self.latencies, 95)
+        return min(max(p95 * HEALTH_TIMEOUT_MULTIPLIER, HEALTH_MIN_TIMEOUT), HEALTH_MAX_TIMEOUT)
+
+    def _allow(self) -> bool:
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and time.monotonic() >= self.opened_until:
+                self.state = HALF_OPEN
+            if self.state == HALF_OPEN and not self.trial_running:
+                self.trial_running = True
+                return True
+            self.rejected += 1
+            return False
+
+    def _record_success(self, seconds: float):
+        with self._lock:
+            self.latencies.append(seconds)
+            self.successes += 1
+            self.consecutive_failures = 0
+            self.trial_running = False
+            if self.state != CLOSED:
+                metrics.SOURCE_CIRCUITS_OPEN.dec(source=self.label)
+                logger.info(f"✅ {self.name} recovered, circuit closed")
+            self.state = CLOSED
+            self.open_seconds = HEALTH_OPEN_SECONDS
+
+    def _record_failure(self, error: Exception, timed_out_after: Optional[float] = None):
+        with self._lock:
+            if timed_out_after is not None:
+                # A lower bound on the real latency, but enough to let the deadline grow
+                self.latencies.append(timed_out_after)
+            self.failures += 1
+            self.consecutive_failures += 1
+            self.last_error = str(getattr(error, "detail", None) or error)[:200]
+            if self.state == HALF_OPEN:
+                # Trial failed: stay away twice as long
+                self.open_seconds = min(self.open_seconds * 2, HEALTH_MAX_OPEN_SECONDS)
+            elif self.consecutive_failures < HEALTH_FAILURE_THRESHOLD:
+                return
+            if self.state == CLOSED:
+                metrics.SOURCE_CIRCUITS_OPEN.inc(source=self.label)
+            self.trial_running = False
+            self.state = OPEN
+            self.opened_until = time.monotonic() + self.open_seconds
+            logger.warning(f"🚫 {self.name} circuit open for {self.open_seconds:g}s: {self.last_error}")
+
+    def call(self, fn: Callable[[], list]) -> list:
+        """Run a fetch under the breaker, with every HTTP call in it bounded by timeout()."""
+        if not self._allow():
+            raise CircuitOpen(self.name)
+        with self._lock:
+            trial = self.state == HALF_OPEN
+        # The trial decides whether the source is back; don't fail it on a deadline sized for the old latency
+        seconds = HEALTH_MAX_TIMEOUT if trial else self.timeout()
+        start = time.monotonic()
+        try:
+            with http_client.deadline(seconds):
+                result = fn()
+        except Exception as e:
+            elapsed = time.monotonic() - start
+            # Fetchers wrap the requests.Timeout, so tell a deadline hit by the clock
+            self._record_failure(e, elapsed if elapsed >= seconds * 0.95 else None)
+            raise
+        self._record_success(time.monotonic() - start)
+        return result
+
+    def forget(self):
+        """Take this breaker out of the open-circuits gauge before it is dropped."""
+        with self._lock:
+            if self.state != CLOSED:
+                metrics.SOURCE_CIRCUITS_OPEN.dec(source=self.label)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            latencies = list(self.latencies)
+            state = self.state
+            if state == OPEN and time.monotonic() >= self.opened_until:
+                state = HALF_OPEN  # Next call is the trial
+            snapshot = {
+                "state": state,
+                "consecutive_failures": self.consecutive_failures,
+                "successes": self.successes,
+                "failures": self.failures,
+                "rejected": self.rejected,
+                "last_error": self.last_error,
+                "retry_in": round(max(0.0, self.opened_until - time.monotonic()), 1) if state == OPEN else 0,
+            }
+        if latencies:
+            snapshot["p50_ms"] = round(_percentile(latencies, 50) * 1000)
+            snapshot["p95_ms"] = round(_percentile(latencies, 95) * 1000)
+        snapshot["timeout_s"] = round(self.timeout(), 2)
+        return snapshot
+
+
+class HealthRegistry:
+    """
+    Breakers by name. Configured sources are kept for the life of the process;
+    variants named by users (label differs from name) live in a bounded LRU so
+    arbitrary input cannot grow it.
+    """
+
+    def __init__(self, max_variants: int = HEALTH_MAX_VARIANTS):
+        self.max_variants = max_variants
+        self._lock = threading.Lock()
+        self._sources: Dict[str, SourceHealth] = {}
+        self._variants: "OrderedDict[str, SourceHealth]" = OrderedDict()
+
+    def get(self, name: str, label: Optional[str] = None) -> SourceHealth:
+        with self._lock:
+            if label is None or label == name:
+                health = self._sources.get(name)
+                if health is None:
+                    health = self._sources[name] = SourceHealth(name, label)
+                return health
+            health = self._variants.get(name)
+            if health is None:
+                health = self._variants[name] = SourceHealth(name, label)
+                while len(self._variants) > self.max_variants:
+                    _, evicted = self._variants.popitem(last=False)
+                    evicted.forget()
+            self._variants.move_to_end(name)
+            return health
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            sources = list(self._sources.values()) + list(self._variants.values())
+        return {health.name: health.snapshot() for health in sources}
+
+
+# Shared by every fetch in this process
+registry = HealthRegistry()
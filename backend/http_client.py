@@ -0,0 +1,208 @@
+import contextvars
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+import metrics
+
+# Advertise brotli only when urllib3 can actually decode it
+try:
+    import brotli  # noqa: F401
+    ACCEPT_ENCODING = "br, gzip, deflate"
+except ImportError:
+    try:
+        import brotlicffi  # noqa: F401
+        ACCEPT_ENCODING = "br, gzip, deflate"
+    except ImportError:
+        ACCEPT_ENCODING = "gzip, deflate"
+
+# Pool and timeout tuning
+HTTP_POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", "20"))  # hosts kept pooled
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "10"))  # keep-alive sockets per host
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "15"))
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "0"))
+# Send every upstream request to this base URL instead, with the original host
+# as the first path segment: e.g. the replay stub in benchmarks/stub_upstream.py
+HTTP_UPSTREAM_OVERRIDE = os.getenv("HTTP_UPSTREAM_OVERRIDE") or None
+
+
+class ConnectionStats:
+    """Thread-safe per-host counters of requests sent and connections opened."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._hosts = {}
+
+    def _host(self, host: str) -> dict:
+        return self._hosts.setdefault(host, {"requests": 0, "connections": 0})
+
+    def record_request(self, host: str):
+        with self._lock:
+            self._host(host)["requests"] += 1
+
+    def record_connection(self, host: str):
+        with self._lock:
+            self._host(host)["connections"] += 1
+
+    def snapshot(self) -> dict:
+        """Totals and per-host numbers; every reused request is a skipped TCP/TLS handshake."""
+        with self._lock:
+            hosts = {}
+            for host, counts in self._hosts.items():
+                hosts[host] = {**counts, "reused": max(0, counts["requests"] - counts["connections"])}
+        total_requests = sum(h["requests"] for h in hosts.values())
+        total_connections = sum(h["connections"] for h in hosts.values())
+        reused = sum(h["reused"] for h in hosts.values())
+        return {
+            "requests": total_requests,
+            "connections": total_connections,
+            "reused": reused,
+            "reuse_ratio": round(reused / total_requests, 4) if total_requests else 0.0,
+            "hosts": hosts,
+        }
+
+    def reset(self):
+        with self._lock:
+            self._hosts.clear()
+
+
+def _counting_pool(base, stats: ConnectionStats):
+    """Subclass a urllib3 pool class so every new socket is counted."""
+    class CountingPool(base):
+        def _new_conn(self):
+            stats.record_connection(self.host)
+            return super()._new_conn()
+    CountingPool.__name__ = f"Counting{base.__name__}"
+    return CountingPool
+
+
+class CountingAdapter(HTTPAdapter):
+    """HTTPAdapter whose per-host pools report new connections to `stats`."""
+
+    def __init__(self, stats: ConnectionStats, **kwargs):
+        self.stats = stats
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _counting_pool(HTTPConnectionPool, self.stats),
+            "https": _counting_pool(HTTPSConnectionPool, self.stats),
+        }
+
+
+# Absolute time.monotonic() by which the current fetch must be done
+_deadline = contextvars.ContextVar("http_deadline", default=None)
+
+
+@contextmanager
+def deadline(seconds: Optional[float] = None, at: Optional[float] = None):
+    """
+    Cap the timeout of every request made in this block so the block as a
+    whole finishes within `seconds` (or by the monotonic time `at`). Nested
+    blocks keep the earlier deadline. Context does not follow work handed to
+    other threads: pass current_deadline() along and re-enter with at=.
+    """
+    if at is None and seconds is not None:
+        at = time.monotonic() + seconds
+    outer = _deadline.get()
+    if at is None or (outer is not None and outer <= at):
+        yield
+        return
+    token = _deadline.set(at)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def current_deadline() -> Optional[float]:
+    return _deadline.get()
+
+
+def _capped_timeout(timeout, remaining: float):
+    if isinstance(timeout, tuple):
+        return tuple(remaining if t is None else min(t, remaining) for t in timeout)
+    return remaining if timeout is None else min(timeout, remaining)
+
+
+class HttpClient:
+    """
+    Shared HTTP client for all upstream fetchers.
+
+    Wraps one requests.Session so connections are pooled per host and kept
+    alive between calls, applies default timeouts and compression
+    negotiation, and tracks how often a pooled connection was reused.
+    """
+
+    def __init__(
+        self,
+        pool_connections: int = HTTP_POOL_CONNECTIONS,
+        pool_maxsize: int = HTTP_POOL_MAXSIZE,
+        connect_timeout: float = HTTP_CONNECT_TIMEOUT,
+        read_timeout: float = HTTP_READ_TIMEOUT,
+        max_retries: int = HTTP_MAX_RETRIES,
+        upstream: Optional[str] = HTTP_UPSTREAM_OVERRIDE,
+    ):
+        self.timeout = (connect_timeout, read_timeout)
+        self.upstream = upstream
+        self.stats = ConnectionStats()
+        self.session = requests.Session()
+        self.session.headers.update({
+            "User-Agent": "DevPulse/1.0",
+            "Accept-Encoding": ACCEPT_ENCODING,
+        })
+        adapter = CountingAdapter(
+            self.stats,
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            max_retries=max_retries,
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        kwargs.setdefault("timeout", self.timeout)
+        at = _deadline.get()
+        if at is not None:
+            remaining = at - time.monotonic()
+            if remaining <= 0:
+                raise requests.Timeout(f"Deadline exceeded before requesting {url}")
+            kwargs["timeout"] = _capped_timeout(kwargs["timeout"], remaining)
+        parts = urlsplit(url)
+        host = parts.hostname or ""
+        self.stats.record_request(host)
+        if self.upstream:
+            url = f"{self.upstream.rstrip('/')}/{parts.netloc}{parts.path}" + (f"?{parts.query}" if parts.query else "")
+        try:
+            response = self.session.request(method, url, **kwargs)
+        except requests.Timeout:
+            metrics.UPSTREAM_ERRORS.inc(host=host, status="timeout")
+            raise
+        except requests.ConnectionError:
+            metrics.UPSTREAM_ERRORS.inc(host=host, status="connection")
+            raise
+        except requests.RequestException:
+            metrics.UPSTREAM_ERRORS.inc(host=host, status="error")
+            raise
+        if response.status_code >= 400:
+            metrics.UPSTREAM_ERRORS.inc(host=host, status=response.status_code)
+        return response
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+
+# Process-wide client shared by every fetcher in feeds.py
+client = HttpClient()
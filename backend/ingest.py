@@ -0,0 +1,302 @@
+"""
+Background ingestion: polls every Source on its own interval and upserts
+the normalized items into the feed_items table, so the /feeds endpoints
+can serve a database read instead of waiting on upstream.
+
+Runs inside the API process when it is the only worker, or on its own
+with `python ingest.py` when the API runs several (docker-entrypoint.sh
+does this). In-process ingestion defaults to off when WEB_CONCURRENCY,
+which uvicorn and gunicorn read as their worker count, is above 1; set
+INGEST_IN_PROCESS to override, e.g. INGEST_IN_PROCESS=0 with
+`uvicorn --workers N`.
+"""
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy import func, and_, inspect
+from sqlalchemy.orm import Session
+from sqlalchemy.schema import CreateIndex
+
+import database
+import feeds
+import models
+
+logger = logging.getLogger(__name__)
+
+INGEST_ENABLED = os.getenv("INGEST_ENABLED", "1") == "1"
+# One ingestion thread per API worker would poll and write everything N times
+INGEST_IN_PROCESS = os.getenv("INGEST_IN_PROCESS", "1" if int(os.getenv("WEB_CONCURRENCY") or 1) <= 1 else "0") == "1"
+INGEST_DEFAULT_INTERVAL = int(os.getenv("INGEST_DEFAULT_INTERVAL", "300"))
+# After a failed poll, retry sooner than the normal interval
+INGEST_RETRY_INTERVAL = int(os.getenv("INGEST_RETRY_INTERVAL", "60"))
+# Stored items older than this (seconds) are not served; the caller goes upstream
+INGEST_MAX_AGE = int(os.getenv("INGEST_MAX_AGE", "3600"))
+# Items not seen upstream for this many days are deleted, checked every INGEST_PRUNE_INTERVAL seconds
+INGEST_RETENTION_DAYS = int(os.getenv("INGEST_RETENTION_DAYS", "7"))
+INGEST_PRUNE_INTERVAL = int(os.getenv("INGEST_PRUNE_INTERVAL", "3600"))
+
+# Seconds between polls per source name; fast-moving sources poll more often,
+# slow scrapes less. Anything not listed uses INGEST_DEFAULT_INTERVAL.
+SOURCE_POLL_INTERVALS = {
+    "Hacker News": 120,
+    "Reddit": 180,
+    "Lobste.rs": 300,
+    "Product Hunt": 900,
+    "GitHub Trending": 3600,
+}
+
+
+def poll_interval(source: models.Source) -> int:
+    return SOURCE_POLL_INTERVALS.get(source.name, INGEST_DEFAULT_INTERVAL)
+
+
+def _upsert_statement(values: List[dict]):
+    """INSERT ... ON CONFLICT (source_id, link) DO UPDATE for the two dialects we run on."""
+    insert = database.dialect_insert()
+    if insert is None:
+        return None
+    stmt = insert(models.FeedItem).values(values)
+    updated = {col: stmt.excluded[col] for col in
+               ("title", "published", "published_at", "summary", "extra", "upvotes", "position", "last_seen_at")}
+    return stmt.on_conflict_do_update(index_elements=["source_id", "link"], set_=updated)
+
+
+def upsert_items(db: Session, source_id: int, items: List[feeds.FeedRecord], seen_at: datetime) -> int:
+    """Insert or refresh a source's items; all rows get the same last_seen_at batch stamp."""
+    values = []
+    seen_links = set()
+    for position, it in enumerate(items):
+        link = it.link
+        # link is the key; skip link-less entries and duplicates within one response
+        if not link or link in seen_links:
+            continue
+        seen_links.add(link)
+        published_at = None
+        if it.timestamp is not None and it.timestamp != feeds.MIN_TIMESTAMP:
+            published_at = datetime.fromtimestamp(it.timestamp, tz=timezone.utc)
+        values.append({
+            "source_id": source_id,
+            "link": link,
+            "title": it.title or "",
+            "published": it.published,
+            "published_at": published_at,
+            "summary": it.summary,
+            "extra": it.extra,
+            "upvotes": it.upvotes,
+            "position": position,
+            "last_seen_at": seen_at,
+        })
+    if not values:
+        return 0
+
+    stmt = _upsert_statement(values)
+    if stmt is not None:
+        db.execute(stmt)
+    else:
+        # Portable fallback: read existing rows, then update or insert
+        existing = {
+            row.link: row for row in db.query(models.FeedItem).filter(
+                models.FeedItem.source_id == source_id,
+                models.FeedItem.link.in_(seen_links),
+            )
+        }
+        for value in values:
+            row = existing.get(value["link"])
+            if row:
+                for key, val in value.items():
+                    setattr(row, key, val)
+            else:
+                db.add(models.FeedItem(**value))
+    db.commit()
+    return len(values)
+
+
+def ingest_sources(sources: List[models.Source]) -> dict:
+    """Fetch the given sources in parallel and persist what came back."""
+    by_name = {src.name: src for src in sources}
+    # No last-good fallback: a failing source must count as failed (retry sooner) and
+    # not have its old items re-stamped as the latest poll
+    results, report = feeds.fetch_sources_concurrently(
+        [{"name": src.name, "url": src.url, "feed_type": src.feed_type} for src in sources],
+        fetch=lambda source: feeds.fetch_feed_for_source(source, allow_stale=False),
+    )
+    seen_at = datetime.now(timezone.utc)
+    db = database.SessionLocal()
+    try:
+        for name, items in results.items():
+            try:
+                count = upsert_items(db, by_name[name].id, items, seen_at)
+                logger.info(f"📥 Ingested {count} items from {name}")
+            except Exception as e:
+                db.rollback()
+                report["failed"].append(name)
+                logger.error(f"❌ Ingest write error for {name}: {e}")
+    finally:
+        db.close()
+    return report
+
+
+def ensure_indexes(engine):
+    """create_all() skips indexes on an existing table; add ix_feed_items_source_seen there."""
+    existing = {ix["name"] for ix in inspect(engine).get_indexes("feed_items")}
+    missing = [ix for ix in models.FeedItem.__table__.indexes if ix.name not in existing]
+    if not missing:
+        return
+    with engine.begin() as conn:
+        for ix in missing:
+            conn.execute(CreateIndex(ix, if_not_exists=True))
+            logger.info(f"✅ Created index {ix.name}")
+
+
+def prune_items(db: Session, retention_days: int = INGEST_RETENTION_DAYS) -> int:
+    """Delete items no poll has returned for retention_days; returns how many."""
+    cutoff = datetime.now(timezone.utc) - timedelta(days=retention_days)
+    removed = (
+        db.query(models.FeedItem)
+        .filter(models.FeedItem.last_seen_at < cutoff)
+        .delete(synchronize_session=False)
+    )
+    db.commit()
+    if removed:
+        logger.info(f"🧹 Pruned {removed} feed items older than {retention_days} days")
+    return removed
+
+
+def load_latest_items(db: Session, source_ids: List[int],
+                      max_age: int = INGEST_MAX_AGE) -> Dict[int, List[feeds.FeedRecord]]:
+    """
+    Items from each source's most recent successful poll, in upstream order.
+    A source whose last poll is more than max_age seconds old is left out
+    (and logged), so callers fetch it upstream instead of serving stale data.
+    """
+    latest = (
+        db.query(models.FeedItem.source_id, func.max(models.FeedItem.last_seen_at).label("seen_at"))
+        .filter(models.FeedItem.source_id.in_(source_ids))
+        .group_by(models.FeedItem.source_id)
+        .subquery()
+    )
+    rows = (
+        db.query(models.FeedItem, models.Source.name)
+        .join(latest, and_(
+            models.FeedItem.source_id == latest.c.source_id,
+            models.FeedItem.last_seen_at == latest.c.seen_at,
+        ))
+        .join(models.Source, models.Source.id == models.FeedItem.source_id)
+        .order_by(models.FeedItem.source_id, models.FeedItem.position)
+        .all()
+    )
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=max_age)
+    items = {}
+    stale = {}
+    for row, source_name in rows:
+        seen_at = row.last_seen_at
+        # SQLite hands back naive datetimes; they were stored as UTC
+        if seen_at is not None and seen_at.tzinfo is None:
+            seen_at = seen_at.replace(tzinfo=timezone.utc)
+        if seen_at is None or seen_at < cutoff:
+            stale[source_name] = seen_at
+            continue
+        if row.published_at is not None:
+            published_at = row.published_at
+            # SQLite hands back naive datetimes; they were stored as UTC
+            if published_at.tzinfo is None:
+                published_at = published_at.replace(tzinfo=timezone.utc)
+            timestamp = published_at.timestamp()
+        else:
+            # A date we could not parse still sorts as oldest, like before ingest
+            timestamp = feeds.MIN_TIMESTAMP if row.published else None
+        items.setdefault(row.source_id, []).append(feeds.FeedRecord(
+            row.title, row.link, source_name, row.published, row.summary, row.extra,
+            timestamp, row.upvotes or 0,
+        ))
+    for source_name, seen_at in stale.items():
+        logger.warning(f"⚠️ Stored items for {source_name} are stale (last seen {seen_at}), fetching upstream")
+    return items
+
+
+class IngestionWorker(threading.Thread):
+    """Daemon thread that polls each source whenever its interval has elapsed."""
+
+    def __init__(self, tick_seconds: float = 1.0):
+        super().__init__(name="feed-ingest", daemon=True)
+        self.tick_seconds = tick_seconds
+        self._stop_event = threading.Event()
+        self._next_due = {}  # source id -> monotonic time of next poll
+        self._next_prune = 0.0
+
+    def stop(self):
+        self._stop_event.set()
+
+    def run_once(self):
+        """Poll every source that is due; new sources are picked up on the next tick."""
+        db = database.SessionLocal()
+        try:
+            sources = db.query(models.Source).all()
+            db.expunge_all()
+        finally:
+            db.close()
+
+        now = time.monotonic()
+        if self._next_prune <= now:
+            self._next_prune = now + INGEST_PRUNE_INTERVAL
+            db = database.SessionLocal()
+            try:
+                prune_items(db)
+            finally:
+                db.close()
+        due = [src for src in sources if self._next_due.get(src.id, 0) <= now]
+        if not due:
+            return
+        report = ingest_sources(due)
+        failed = set(report["failed"]) | set(report["timed_out"]) | set(report["skipped"])
+        now = time.monotonic()
+        for src in due:
+            interval = poll_interval(src)
+            if src.name in failed:
+                interval = min(interval, INGEST_RETRY_INTERVAL)
+            self._next_due[src.id] = now + interval
+
+    def run(self):
+        logger.info("🔄 Ingestion worker started")
+        while not self._stop_event.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.exception(f"❌ Ingestion error: {e}")
+            self._stop_event.wait(self.tick_seconds)
+        logger.info("🛑 Ingestion worker stopped")
+
+
+_worker: Optional[IngestionWorker] = None
+
+
+def start_worker() -> IngestionWorker:
+    global _worker
+    if _worker is None or not _worker.is_alive():
+        _worker = IngestionWorker()
+        _worker.start()
+    return _worker
+
+
+def stop_worker():
+    global _worker
+    if _worker is not None:
+        _worker.stop()
+        _worker = None
+
+
+if __name__ == "__main__":
+    import logs
+    import seeds
+    logs.configure()
+    seeds.setup_database()
+    worker = start_worker()
+    try:
+        while worker.is_alive():
+            worker.join(1)
+    except KeyboardInterrupt:
+        stop_worker()
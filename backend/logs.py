@@ -0,0 +1,18 @@
+"""
+Logging setup shared by the API and the standalone ingestion worker.
+
+LOG_LEVEL picks the level (DEBUG, INFO, WARNING, ERROR); LOG_LEVEL=OFF
+turns the application's logging off entirely.
+"""
+import logging
+import os
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+
+def configure():
+    if LOG_LEVEL == "OFF":
+        logging.disable(logging.CRITICAL)
+        return
+    logging.basicConfig(level=LOG_LEVEL, format=LOG_FORMAT)
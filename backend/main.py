@@ -1,78 +1,98 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+import time
+_import_started = time.perf_counter()
+
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Depends, HTTPException, Response, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+import logging
 from sqlalchemy.orm import Session
 import models, schemas, auth, database
 from database import engine
 import os
 import json
+import base64
+import hashlib
+
+import logs
+logs.configure()
+logger = logging.getLogger(__name__)
 
 # Feeds
+import fastjson
 import feeds
+import http_client
+import ingest
+import cache
+import tokens
+import favorites
+import search
+import dedup
+import metrics
+import timing
+import seeds
+
+# Local LRU in front of Redis (or on its own when Redis is absent), with
+# concurrent misses for the same key coalesced into one fetch. Redis is
+# attached at startup (see lifespan).
+feed_cache = cache.TieredCache()
+
+# Per-source feeds are served stale-while-revalidate: fresh for FEED_SOFT_TTL,
+# then served stale while a background refresh runs, until FEED_HARD_TTL
+FEED_SOFT_TTL = int(os.getenv("FEED_SOFT_TTL", "300"))
+FEED_HARD_TTL = int(os.getenv("FEED_HARD_TTL", "3600"))
+# Merge the same story showing up on several sources in /feeds
+FEED_DEDUP = os.getenv("FEED_DEDUP", "1") == "1"
+# Create tables, indexes and default sources at startup. Off by default when
+# several workers run (WEB_CONCURRENCY, as for ingest.INGEST_IN_PROCESS):
+# run `python seeds.py` once before starting them, as docker-entrypoint.sh does.
+DB_AUTO_SETUP = os.getenv("DB_AUTO_SETUP", "1" if int(os.getenv("WEB_CONCURRENCY") or 1) <= 1 else "0") == "1"
+
+# SQL time shows up as the "db" span in Server-Timing
+timing.instrument_engine(engine)
+
+
+def connect_redis():
+    """Redis client for REDIS_URL, or None to use the in-process cache only"""
+    url = os.getenv("REDIS_URL")
+    if not url:
+        logger.warning("⚠️ No REDIS_URL found, using in-process cache only")
+        return None
+    try:
+        import redis
+        client = redis.from_url(url, decode_responses=True)
+        client.ping()
+        logger.info("✅ Redis connected!")
+        return client
+    except Exception as e:
+        logger.warning(f"⚠️ Redis connection failed: {e}")
+        return None
 
-# Redis for caching
-try:
-    import redis
-    REDIS_URL = os.getenv("REDIS_URL")
-    if REDIS_URL:
-        redis_client = redis.from_url(REDIS_URL, decode_responses=True)
-        print("✅ Redis connected!")
-    else:
-        redis_client = None
-        print("⚠️ No REDIS_URL found, caching disabled")
-except Exception as e:
-    redis_client = None
-    print(f"⚠️ Redis connection failed: {e}")
 
-# Create tables
-models.Base.metadata.create_all(bind=engine)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    started = time.perf_counter()
+    if DB_AUTO_SETUP:
+        seeds.setup_database(engine)
+    redis_client = connect_redis()
+    feed_cache.redis = redis_client
+    # Share Reddit / Product Hunt OAuth tokens across workers
+    tokens.manager.redis = redis_client
+    if ingest.INGEST_ENABLED and ingest.INGEST_IN_PROCESS:
+        ingest.start_worker()
+    startup = time.perf_counter() - started
+    metrics.STARTUP_SECONDS.set(_import_seconds, phase="import")
+    metrics.STARTUP_SECONDS.set(startup, phase="startup")
+    logger.info(f"🚀 Ready: imports {_import_seconds * 1000:.0f} ms, startup {startup * 1000:.0f} ms")
+    yield
+    ingest.stop_worker()
 
-def seed_if_empty():
-    """Seed the database with sources if it's empty"""
-    db = database.SessionLocal()
-    try:
-        # Check if sources exist
-        count = db.query(models.Source).count()
-        if count == 0:
-            print("📦 Database is empty, seeding sources...")
-            
-            sources_data = [
-                # News & Discussions
-                {"name": "Hacker News", "url": "https://hacker-news.firebaseio. com/v0/", "feed_type": "API", "category": "News & Discussions", "icon": "Y"},
-                {"name": "Reddit", "url": "https://www.reddit.com/r/learnprogramming/. rss", "feed_type": "RSS", "category": "News & Discussions", "icon": "reddit"},
-                {"name": "Lobste.rs", "url": "https://lobste.rs/hottest. json", "feed_type": "JSON", "category": "News & Discussions", "icon": "lobster"},
-                {"name": "Techmeme", "url": "https://www.techmeme.com/feed. xml", "feed_type": "RSS", "category": "News & Discussions", "icon": "techmeme"},
-                {"name":  "Ars Technica", "url": "https://feeds.arstechnica.com/arstechnica/index", "feed_type": "RSS", "category": "News & Discussions", "icon": "ars"},
-                {"name": "Slashdot", "url": "http://rss.slashdot.org/Slashdot/slashdot", "feed_type": "RSS", "category": "News & Discussions", "icon":   "slashdot"},
-                
-                # Code, Tools & Products
-                {"name": "GitHub Trending", "url": "https://github.com/trending", "feed_type": "Scraping", "category": "Code, Tools & Products", "icon": "github"},
-                {"name": "Product Hunt", "url": "https://www.producthunt.com/feed", "feed_type": "RSS", "category": "Code, Tools & Products", "icon": "producthunt"},
-                {"name":   "The Changelog", "url": "https://changelog.com/feed", "feed_type": "RSS", "category":   "Code, Tools & Products", "icon": "changelog"},
-                
-                # Knowledge & Tutorials
-                {"name": "Tech Blog", "url": "https://medium.com/feed/netflix-techblog", "feed_type": "RSS", "category":   "Knowledge & Tutorials", "icon": "techblog"},
-                {"name":  "DEV.to", "url": "https://dev.to/api/articles", "feed_type":  "API", "category": "Knowledge & Tutorials", "icon": "dev"},
-                {"name": "HackerNoon", "url": "https://hackernoon.com/feed", "feed_type": "RSS", "category": "Knowledge & Tutorials", "icon": "hackernoon"}
-            ]
-            
-            for source in sources_data:
-                new_source = models.Source(**source)
-                db.add(new_source)
-                print(f"  ✅ Added {source['name']}")
-            
-            db.commit()
-            print("✨ Seeding complete!")
-        else:
-            print(f"✅ Database already has {count} sources")
-    except Exception as e:
-        print(f"❌ Error seeding database: {e}")
-    finally:
-        db.close()
 
-# Run seeding on startup
-seed_if_empty()
+app = FastAPI(title="DevPulse API", lifespan=lifespan)
+
 
-app = FastAPI(title="DevPulse API")
+# Server-Timing on every response; sampling profiles on request (timing.PROFILE_TOKEN)
+app.add_middleware(timing.ServerTimingMiddleware)
 
 # CORS Setup
 origins = [
@@ -87,6 +107,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Feeds-Failed", "X-Feeds-Timed-Out", "X-Feeds-Skipped", "X-Next-Cursor", "X-Favorites-Version",
+                    "Server-Timing", "X-Profile-File"],
 )
 
 @app.post("/register", response_model=schemas.UserResponse)
@@ -124,11 +146,11 @@ def login(user_credentials: schemas.UserLogin, db: Session = Depends(database. g
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    access_token = auth.create_access_token(data={"sub": user.username})
+    access_token = auth.create_access_token(data={"sub": user.username, "uid": user.id})
     return {"access_token": access_token, "token_type": "bearer"}
 
 @app.get("/me", response_model=schemas.UserResponse)
-def read_users_me(current_user: models.User = Depends(auth.get_current_user)):
+def read_users_me(current_user: auth.AuthUser = Depends(auth.get_current_user)):
     return current_user
 
 @app.get("/sources", response_model=list[schemas.SourceResponse])
@@ -140,7 +162,7 @@ def get_sources(db: Session = Depends(database. get_db)):
 
 @app. get("/subreddit")
 def get_subreddit_preference(
-    current_user: models.User = Depends(auth. get_current_user)
+    current_user: auth.AuthUser = Depends(auth.get_current_user)
 ):
     """Get user's preferred subreddit"""
     return {"subreddit": current_user. preferred_subreddit or "learnprogramming"}
@@ -149,7 +171,7 @@ def get_subreddit_preference(
 @app.put("/subreddit")
 def update_subreddit_preference(
     data: schemas.SubredditUpdate,
-    current_user: models.User = Depends(auth. get_current_user),
+    current_user: models.User = Depends(auth.get_current_user_fresh),
     db: Session = Depends(database.get_db)
 ):
     """Update user's preferred subreddit"""
@@ -161,194 +183,552 @@ def update_subreddit_preference(
     
     if not subreddit:
         raise HTTPException(status_code=400, detail="Subreddit cannot be empty")
+    if not feeds.SUBREDDIT_RE.fullmatch(subreddit):
+        raise HTTPException(status_code=400, detail="Invalid subreddit name")
     
     current_user.preferred_subreddit = subreddit
     db. commit()
+    # Later requests on this worker see the new preference without a lookup
+    auth.remember_user(current_user)
     return {"subreddit": subreddit, "message": "Subreddit preference updated"}
 
 
-@app.get("/feeds/{source_id}", response_model=list[schemas. FeedItemResponse])
-def get_feed(
-    source_id: int, 
-    sort: str = "hot", 
-    subreddit: str = None,
-    db: Session = Depends(database. get_db)
-):
-    # Create cache key
-    cache_key = f"feed:{source_id}:{sort}:{subreddit or 'default'}"
-    
-    # Try to get from cache
-    if redis_client:
-        try:
-            cached = redis_client.get(cache_key)
-            if cached: 
-                print(f"✅ Cache HIT for {cache_key}")
-                return json.loads(cached)
-        except Exception as e:
-            print(f"⚠️ Cache read error: {e}")
-    
-    # Cache miss - fetch from source
-    print(f"❌ Cache MISS for {cache_key}")
-    src = db.query(models.Source).filter(models.Source.id == source_id).first()
-    if not src:
-        raise HTTPException(status_code=404, detail="Source not found")
-
-    # Build a simple dict to pass to feed fetcher
-    source = {"name": src.name, "url":  src.url, "feed_type": src.feed_type}
-    
-    # If this is Reddit and a custom subreddit is provided, use it
-    if "reddit" in src.name. lower() and subreddit:
-        source["custom_subreddit"] = subreddit
-    
-    items = feeds.fetch_feed_for_source(source)
+def _check_view_params(sort: str, subreddit: str = None):
+    """Sort and subreddit become part of cache keys, so only known values get that far"""
+    if sort not in feeds.SORT_MODES:
+        raise HTTPException(status_code=400, detail=f"sort must be one of: {', '.join(feeds.SORT_MODES)}")
+    if subreddit and not feeds.SUBREDDIT_RE.fullmatch(subreddit.strip()):
+        raise HTTPException(status_code=400, detail="Invalid subreddit name")
+
+
+def _raw_key(source_id: int, subreddit: str = None) -> str:
+    """Cache key for a source's unsorted items; every sort and aggregate is built from it"""
+    return f"feed:raw:{source_id}:{(subreddit or 'default').strip().lower()}"
+
+
+def _load_raw_items(source_id: int, subreddit: str = None) -> tuple:
+    """Cache loader for _raw_key. Uses its own session because a background
+    refresh can outlive the request that started it."""
+    db = database.SessionLocal()
+    try:
+        src = db.query(models.Source).filter(models.Source.id == source_id).first()
+        if not src:
+            raise HTTPException(status_code=404, detail="Source not found")
+
+        # Build a simple dict to pass to feed fetcher
+        source = {"name": src.name, "url":  src.url, "feed_type": src.feed_type}
+        
+        # If this is Reddit and a custom subreddit is provided, use it
+        if "reddit" in src.name. lower() and subreddit and f"/r/{subreddit.lower()}/" not in src.url.lower():
+            source["custom_subreddit"] = subreddit
+        
+        # Serve the ingested copy; only custom subreddits and sources the
+        # ingestion worker has not polled yet go upstream
+        items = None
+        if ingest.INGEST_ENABLED and "custom_subreddit" not in source:
+            items = ingest.load_latest_items(db, [src.id]).get(src.id)
+    finally:
+        db.close()
+    if items is None:
+        logger.debug(f"❌ Cache MISS for {_raw_key(source_id, subreddit)}")
+        items = feeds.fetch_feed_for_source(source)
 
     # tag items with source name for frontend
     for it in items:
-        it.setdefault("source", src.name)
-
-    # Sort items
-    items = feeds.sort_items(items, sort)
-
-    # Store in cache for 5 minutes
-    if redis_client:
-        try:
-            redis_client.setex(cache_key, 300, json.dumps(items))
-            print(f"💾 Cached {cache_key}")
-        except Exception as e: 
-            print(f"⚠️ Cache write error: {e}")
-    
+        it.source = it.source or src.name
+    return _dump_records(items), FEED_HARD_TTL
+
+
+def _dump_records(records: list) -> bytes:
+    """Serialize records for the cache, keeping their precomputed sort keys"""
+    return fastjson.dumps([r.to_dict(internal=True) for r in records])
+
+
+def _load_records(payload) -> list:
+    return [feeds.FeedRecord.from_dict(it) for it in fastjson.loads(payload)]
+
+
+# Cached feed bodies are rendered in FeedItemResponse's shape up front, so
+# they can be sent as-is instead of being validated and re-encoded per request
+_RESPONSE_FIELDS = tuple(schemas.FeedItemResponse.model_fields)
+
+
+def _response_items(records: list) -> list:
+    with timing.span("render"):
+        return [{field: getattr(r, field) for field in _RESPONSE_FIELDS} for r in records]
+
+
+def _json_response(body, response: Response) -> Response:
+    """Send an already-encoded JSON body, keeping the X- headers set on response"""
+    headers = {k: v for k, v in response.headers.items() if k.startswith("x-")}
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def _cached_raw_items(source_id: int, subreddit: str = None) -> list:
+    payload = feed_cache.get_or_load(
+        _raw_key(source_id, subreddit),
+        lambda: _load_raw_items(source_id, subreddit),
+        soft_ttl=FEED_SOFT_TTL,
+    )
+    return _load_records(payload)
+
+
+FEED_PAGE_MAX = int(os.getenv("FEED_PAGE_MAX", "100"))
+# A first page reuses the same sorted snapshot for this long
+FEED_VIEW_TTL = int(os.getenv("FEED_VIEW_TTL", "60"))
+# Cursors stay valid for as long as their snapshot is kept
+FEED_SNAPSHOT_TTL = int(os.getenv("FEED_SNAPSHOT_TTL", "900"))
+
+# Parsed snapshots, so paging does not re-decode the cached JSON
+_snapshots = cache.LocalCache(maxsize=64)
+
+
+def _encode_cursor(snapshot_id: str, offset: int, last_link: str) -> str:
+    raw = json.dumps({"s": snapshot_id, "o": offset, "l": last_link}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> dict:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data = json.loads(raw)
+        if not isinstance(data["s"], str) or not isinstance(data["o"], int) or data["o"] < 0:
+            raise ValueError
+        return data
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _load_snapshot(snapshot_id: str):
+    items = _snapshots.get(snapshot_id)
+    if items is None:
+        payload = feed_cache.get(f"feed:snapshot:{snapshot_id}")
+        if payload is None:
+            return None
+        items = fastjson.loads(payload)
+        _snapshots.set(snapshot_id, items, FEED_SNAPSHOT_TTL)
     return items
 
 
-@app.get("/feeds", response_model=list[schemas. FeedItemResponse])
-def get_all_feeds(sort: str = "hot", category:  str = None, db: Session = Depends(database. get_db)):
-    """Aggregate feed items from all enabled sources or a specific category.  
-    Returns a combined list sorted together by hot/new algorithm."""
-    
-    # Create cache key
-    cache_key = f"feeds: all:{sort}:{category or 'all'}"
-    
-    # Try to get from cache
-    if redis_client:
-        try: 
-            cached = redis_client.get(cache_key)
-            if cached:
-                print(f"✅ Cache HIT for {cache_key}")
-                return json.loads(cached)
-        except Exception as e:
-            print(f"⚠️ Cache read error: {e}")
-    
-    # Cache miss - fetch from sources
-    print(f"❌ Cache MISS for {cache_key}")
-    
-    # Filter sources by category if provided
+def _view_snapshot(view_key: str, build) -> tuple:
+    """(snapshot_id, encoded body, report) for a view, building the sorted list
+    at most once per FEED_VIEW_TTL. build() -> (items, report), report listing
+    the sources that failed, timed out or were skipped; an incomplete result is
+    not reused by later first pages. The report is cached with the view, so
+    coalesced and cached callers get it as well as the one that built it."""
+    def load():
+        items, report = build()
+        with timing.span("render"):
+            payload = fastjson.dumps(items)
+        snapshot_id = hashlib.sha1(payload).hexdigest()[:16]
+        feed_cache.set(f"feed:snapshot:{snapshot_id}", payload, FEED_SNAPSHOT_TTL)
+        _snapshots.set(snapshot_id, items, FEED_SNAPSHOT_TTL)
+        report = {outcome: names for outcome, names in report.items() if names}
+        if not report:
+            return snapshot_id, FEED_VIEW_TTL
+        return json.dumps({"s": snapshot_id, "r": report}), 1
+
+    for _ in range(2):
+        view = feed_cache.get_or_load(view_key, load)
+        # A complete view is the bare snapshot id
+        snapshot_id, report = view, {}
+        if view.startswith("{"):
+            view = json.loads(view)
+            snapshot_id, report = view["s"], view["r"]
+        payload = feed_cache.get(f"feed:snapshot:{snapshot_id}")
+        if payload is not None:
+            return snapshot_id, payload, report
+        # Snapshot evicted before its view key expired
+        feed_cache.delete(view_key)
+    raise HTTPException(status_code=503, detail="Feed snapshot unavailable")
+
+
+def _report_headers(response: Response, report: dict):
+    for outcome, names in report.items():
+        response.headers[f"X-Feeds-{outcome.replace('_', '-').title()}"] = ", ".join(names)
+
+
+def _serve_view(response: Response, view_key: str, build, limit: int, cursor: str) -> Response:
+    """The whole sorted feed, or one page of it when limit or cursor is given.
+    Either way the body comes from the cached snapshot without re-validation."""
+    # Clients that always send the parameter send cursor= for the first page
+    cursor = cursor or None
+    if limit is None and cursor is None:
+        _, payload, report = _view_snapshot(view_key, build)
+        _report_headers(response, report)
+        return _json_response(payload, response)
+    return _paginate(response, view_key, build, limit, cursor)
+
+
+def _paginate(response: Response, view_key: str, build, limit: int, cursor: str) -> Response:
+    """
+    One page of a sorted feed. Pages come from an immutable snapshot of the
+    sorted result, so ordering is stable across pages even when sources
+    refresh in between; the cursor for the next page is returned in the
+    X-Next-Cursor header and is absent on the last page.
+    """
+    if limit is None:
+        limit = FEED_PAGE_MAX
+    if not 1 <= limit <= FEED_PAGE_MAX:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {FEED_PAGE_MAX}")
+
+    if cursor:
+        position = _decode_cursor(cursor)
+        snapshot_id, offset = position["s"], position["o"]
+        items = _load_snapshot(snapshot_id)
+        if items is None:
+            # Snapshot expired: continue after the last item seen in the current one
+            snapshot_id, _, report = _view_snapshot(view_key, build)
+            _report_headers(response, report)
+            items = _load_snapshot(snapshot_id) or []
+            links = [it.get("link") for it in items]
+            if position.get("l") not in links:
+                raise HTTPException(status_code=410, detail="Cursor expired, reload the feed")
+            offset = links.index(position["l"]) + 1
+    else:
+        snapshot_id, _, report = _view_snapshot(view_key, build)
+        _report_headers(response, report)
+        items = _load_snapshot(snapshot_id) or []
+        offset = 0
+
+    page = items[offset:offset + limit]
+    if offset + limit < len(items):
+        response.headers["X-Next-Cursor"] = _encode_cursor(snapshot_id, offset + limit, page[-1].get("link"))
+    with timing.span("render"):
+        body = fastjson.dumps(page)
+    return _json_response(body, response)
+
+
+def _stream_events(results: dict, pending: list, sort: str, budget_ms: int):
+    """(event type, payload) for each source as it becomes available, then a summary"""
+    started = time.monotonic()
+    report = {"failed": [], "timed_out": [], "skipped": []}
+    count = 0
+
+    def batch(name, records):
+        items = _response_items(feeds.sort_items(records[:15], sort))
+        return "items", {"source": name, "items": items}
+
+    # Cached and ingested sources go out at once, the rest as their fetches finish
+    for name, records in results.items():
+        count += min(len(records), 15)
+        yield batch(name, records)
+    for name, outcome, records in feeds.iter_sources_concurrently(
+        pending, budget_ms, fetch=lambda source: _cached_raw_items(source["id"])
+    ):
+        if outcome != "ok":
+            report[outcome].append(name)
+            continue
+        count += min(len(records), 15)
+        yield batch(name, records)
+    yield "summary", {
+        "sources": len(results) + len(pending), "total_items": count, **report,
+        "elapsed_ms": round((time.monotonic() - started) * 1000),
+    }
+
+
+@app.get("/feeds/stream")
+def stream_all_feeds(
+    sort: str = "hot",
+    category: str = None,
+    budget_ms: int = None,
+    format: str = "ndjson",
+    db: Session = Depends(database.get_db)
+):
+    """Streaming variant of /feeds: one event per source, sorted within the
+    source, sent as soon as that source is available, then a "summary"
+    event with the totals and the sources that failed, timed out or were
+    skipped. `format` is "ndjson" (one {"type", ...} object per line) or
+    "sse" (Server-Sent Events named "items" / "summary"). Sorting and
+    merging across sources is left to the client."""
+    if format not in ("ndjson", "sse"):
+        raise HTTPException(status_code=400, detail="format must be ndjson or sse")
+    if budget_ms is not None and budget_ms <= 0:
+        raise HTTPException(status_code=400, detail="budget_ms must be positive")
+    _check_view_params(sort)
+
     if category:
-        sources = db. query(models.Source).filter(models.Source.category == category).all()
+        sources = db.query(models.Source).filter(models.Source.category == category).all()
     else:
-        sources = db.query(models. Source).all()
-    
-    all_items = []
+        sources = db.query(models.Source).all()
+    # Database work happens here: the session is closed before the body streams
+    results, pending = _stored_items(sources, db)
+
+    def body():
+        for event, payload in _stream_events(results, pending, sort, budget_ms):
+            if format == "sse":
+                yield b"event: " + event.encode() + b"\ndata: " + fastjson.dumps(payload) + b"\n\n"
+            else:
+                yield fastjson.dumps({"type": event, **payload}) + b"\n"
+
+    media_type = "text/event-stream" if format == "sse" else "application/x-ndjson"
+    # No proxy buffering, or the first events would not arrive early
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return StreamingResponse(body(), media_type=media_type, headers=headers)
+
 
+@app.get("/feeds/{source_id}", response_model=list[schemas. FeedItemResponse])
+def get_feed(
+    response: Response,
+    source_id: int, 
+    sort: str = "hot", 
+    subreddit: str = None,
+    limit: int = None,
+    cursor: str = None,
+):
+    """Items of one source, sorted. With `limit` and/or `cursor` the list is
+    paginated; see _serve_view."""
+    _check_view_params(sort, subreddit)
+
+    def build():
+        # Sort the cached raw items; switching sort modes never goes upstream
+        return _response_items(feeds.sort_items(_cached_raw_items(source_id, subreddit), sort)), {}
+
+    view_key = f"feed:view:{source_id}:{(subreddit or 'default').strip().lower()}:{sort}"
+    return _serve_view(response, view_key, build, limit, cursor)
+
+
+def _stored_items(sources: list, db: Session) -> tuple:
+    """
+    (results, pending): records by source name for every source found in
+    the raw cache (one pipelined read) or, failing that, in the ingestion
+    table (one query), and the {"id", "name"} of sources still to fetch.
+    """
+    keys = {src.id: _raw_key(src.id) for src in sources}
+    cached = feed_cache.get_many(list(keys.values()))
+    results = {}
     for src in sources:
-        try:
-            source = {"name":  src.name, "url": src.url, "feed_type":  src.feed_type}
-            items = feeds.fetch_feed_for_source(source)
-            # attach source name - take more items per source for better mixing
-            for it in items[: 15]: 
-                it.setdefault("source", src.name)
-                all_items.append(it)
-        except Exception: 
-            # ignore failing sources to keep overall feed resilient
+        if keys[src.id] not in cached:
             continue
+        payload, fresh = cached[keys[src.id]]
+        if not fresh:
+            feed_cache.refresh_in_background(
+                keys[src.id], lambda source_id=src.id: _load_raw_items(source_id), FEED_SOFT_TTL
+            )
+        results[src.name] = _load_records(payload)
+
+    # Ingested items for the uncached sources come from one database query
+    missing = [src for src in sources if src.name not in results]
+    if missing and ingest.INGEST_ENABLED:
+        stored = ingest.load_latest_items(db, [src.id for src in missing])
+        for src in missing:
+            if src.id in stored:
+                feed_cache.set(keys[src.id], _dump_records(stored[src.id]), FEED_HARD_TTL, FEED_SOFT_TTL)
+                results[src.name] = stored[src.id]
+
+    pending = [{"id": src.id, "name": src.name} for src in sources if src.name not in results]
+    return results, pending
+
+
+def _aggregate_items(sources: list, sort: str, budget_ms: int, db: Session) -> tuple:
+    """(sorted item dicts, report of sources left out) for get_all_feeds"""
+    results, pending = _stored_items(sources, db)
+
+    # Whatever is left goes upstream; failing or slow sources are reported,
+    # not raised, to keep the overall feed resilient
+    fetched, report = feeds.fetch_sources_concurrently(
+        pending, budget_ms, fetch=lambda source: _cached_raw_items(source["id"])
+    )
+    results.update(fetched)
+
+    all_items = []
+    for src in sources:
+        # take more items per source for better mixing
+        all_items.extend(results.get(src.name, [])[: 15])
+
+    if FEED_DEDUP:
+        with metrics.DEDUP_SECONDS.time(), timing.span("dedup"):
+            all_items = dedup.merge_duplicates(all_items)
 
     # Sort ALL items together using the hot/new algorithm
-    all_items = feeds.sort_items(all_items, sort)
-
-    # Store in cache for 5 minutes
-    if redis_client: 
-        try:
-            redis_client.setex(cache_key, 300, json.dumps(all_items))
-            print(f"💾 Cached {cache_key}")
-        except Exception as e:
-            print(f"⚠️ Cache write error: {e}")
+    return _response_items(feeds.sort_items(all_items, sort)), report
+
+
+@app.get("/feeds", response_model=list[schemas. FeedItemResponse])
+def get_all_feeds(
+    response: Response,
+    sort: str = "hot",
+    category:  str = None,
+    budget_ms: int = None,
+    limit: int = None,
+    cursor: str = None,
+    db: Session = Depends(database. get_db)
+):
+    """Aggregate feed items from all enabled sources or a specific category.  
+    Returns a combined list sorted together by hot/new algorithm.
+    Built from the same per-source raw cache entries as /feeds/{source_id},
+    read in one pipelined round trip. Sources missing from the cache come
+    from the ingestion table, or are fetched in parallel; with `budget_ms`
+    the response returns once the deadline passes, and sources that did not
+    make it are listed in the X-Feeds-Failed / X-Feeds-Timed-Out /
+    X-Feeds-Skipped headers.
+    With `limit` and/or `cursor` the list is paginated; see _serve_view."""
+    if budget_ms is not None and budget_ms <= 0:
+        raise HTTPException(status_code=400, detail="budget_ms must be positive")
+    _check_view_params(sort)
     
-    return all_items
+    def build():
+        # Filter sources by category if provided
+        if category:
+            sources = db. query(models.Source).filter(models.Source.category == category).all()
+        else:
+            sources = db.query(models. Source).all()
+        return _aggregate_items(sources, sort, budget_ms, db)
+
+    # The budget decides which sources make it in, so builds with different budgets are different views
+    view_key = f"feed:view:all:{category or '*'}:{sort}:{budget_ms or '-'}"
+    return _serve_view(response, view_key, build, limit, cursor)
 
 @app.api_route("/", methods=["GET", "HEAD"])
 def read_root():
     return {"message": "Welcome to DevPulse API"}
 
 
+@app.get("/stats/http")
+def get_http_stats():
+    """Upstream connection reuse: requests sent vs. TCP/TLS connections opened, per host"""
+    return http_client.client.stats.snapshot()
+
+
+@app.get("/stats/cache")
+def get_cache_stats():
+    """Feed cache hits per tier, misses, and requests coalesced onto an in-flight fetch"""
+    return feed_cache.stats()
+
+
+@app.get("/metrics")
+def get_metrics():
+    """Prometheus metrics for this worker process"""
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+
+@app.get("/stats/sources")
+def get_source_stats():
+    """Per-source circuit breaker state, fetch latency percentiles and the current fetch deadline"""
+    return feeds.health.registry.snapshot()
+
+
+@app.get("/stats/tokens")
+def get_token_stats():
+    """OAuth token cache hits, provider fetches, and seconds until each cached token expires"""
+    return tokens.manager.stats()
+
+
+@app.get("/search", response_model=schemas.SearchResults)
+def search_feeds(
+    q: str,
+    limit: int = 20,
+    current_user: auth.AuthUser = Depends(auth.get_optional_user),
+    db: Session = Depends(database.get_db)
+):
+    """Full-text search over every ingested item, ranked with title matches
+    first; signed-in users also get matching favorites"""
+    if not q.strip():
+        raise HTTPException(status_code=400, detail="Query cannot be empty")
+    if not 1 <= limit <= search.SEARCH_MAX_LIMIT:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {search.SEARCH_MAX_LIMIT}")
+    if not search.available(db.get_bind()):
+        raise HTTPException(status_code=503, detail="Search index unavailable")
+    return {
+        "items": search.search_items(db, q, limit),
+        "favorites": search.search_favorites(db, current_user.id, q, limit) if current_user else [],
+    }
+
+
 # ============ FAVORITES ENDPOINTS ============
 
 @app. get("/favorites", response_model=list[schemas. FavoriteResponse])
 def get_favorites(
-    current_user: models.User = Depends(auth.get_current_user),
+    response: Response,
+    limit: int = None,
+    cursor: int = None,
+    current_user: auth.AuthUser = Depends(auth.get_current_user),
     db: Session = Depends(database.get_db)
 ):
-    """Get all favorites for the current user"""
-    return db.query(models.Favorite).filter(
-        models. Favorite.user_id == current_user.id
-    ).order_by(models.Favorite. created_at.desc()).all()
+    """Get favorites for the current user, newest first.
+    With `limit`, returns one page and the cursor for the next one in
+    X-Next-Cursor; pass it back as `cursor`."""
+    if limit is not None and not 1 <= limit <= favorites.FAVORITES_PAGE_MAX:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {favorites.FAVORITES_PAGE_MAX}")
+    if limit is None:
+        return favorites.list_favorites(db, current_user.id, None, cursor)
+    # One extra row tells whether there is a next page
+    rows = favorites.list_favorites(db, current_user.id, limit + 1, cursor)
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = str(rows[-1].id)
+    return rows
 
 
 @app.get("/favorites/links")
 def get_favorite_links(
-    current_user: models. User = Depends(auth.get_current_user),
+    response: Response,
+    since: int = None,
+    current_user: auth.AuthUser = Depends(auth.get_current_user),
     db: Session = Depends(database. get_db)
 ):
-    """Get just the links of favorited items for quick lookup"""
-    favorites = db. query(models.Favorite. feed_link).filter(
-        models. Favorite.user_id == current_user.id
-    ).all()
-    return [f.feed_link for f in favorites]
+    """Get just the links of favorited items for quick lookup.
+    Without `since`, a plain list of every link. With `since` (the version
+    from an earlier sync, 0 for the first one), only what changed:
+    {"version", "added", "removed"}."""
+    if since is not None:
+        return schemas.FavoritesDelta(**favorites.changes_since(db, current_user.id, since))
+    delta = favorites.changes_since(db, current_user.id, 0)
+    response.headers["X-Favorites-Version"] = str(delta["version"])
+    return delta["added"]
+
+
+def _check_bulk_size(count: int):
+    if count > favorites.FAVORITES_BULK_MAX:
+        raise HTTPException(status_code=400, detail=f"At most {favorites.FAVORITES_BULK_MAX} favorites per request")
 
 
 @app.post("/favorites", response_model=schemas.FavoriteResponse)
 def add_favorite(
     favorite: schemas.FavoriteCreate,
-    current_user: models. User = Depends(auth.get_current_user),
+    current_user: auth.AuthUser = Depends(auth.get_current_user),
     db: Session = Depends(database. get_db)
 ):
-    """Add a feed item to favorites"""
-    # Check if already favorited
-    existing = db.query(models.Favorite).filter(
-        models. Favorite.user_id == current_user.id,
-        models. Favorite.feed_link == favorite.feed_link
-    ).first()
-    
-    if existing:
-        raise HTTPException(status_code=400, detail="Already favorited")
-    
-    new_favorite = models.Favorite(
-        user_id=current_user.id,
-        feed_link=favorite.feed_link,
-        feed_title=favorite.feed_title,
-        feed_source=favorite.feed_source,
-        feed_published=favorite.feed_published,
-        feed_summary=favorite.feed_summary
-    )
-    db.add(new_favorite)
-    db.commit()
-    db.refresh(new_favorite)
-    return new_favorite
+    """Add a feed item to favorites. Saving an item again updates it."""
+    favorites.upsert_favorites(db, current_user.id, [favorite])
+    return favorites.get_favorite(db, current_user.id, favorite.feed_link)
+
+
+@app.post("/favorites/bulk", response_model=schemas.FavoritesDelta)
+def add_favorites_bulk(
+    items: list[schemas.FavoriteCreate],
+    current_user: auth.AuthUser = Depends(auth.get_current_user),
+    db: Session = Depends(database.get_db)
+):
+    """Add or update many favorites in one statement"""
+    _check_bulk_size(len(items))
+    added = favorites.upsert_favorites(db, current_user.id, items)
+    return {"version": favorites.current_version(db, current_user.id), "added": added, "removed": []}
+
+
+@app.post("/favorites/bulk/remove", response_model=schemas.FavoritesDelta)
+def remove_favorites_bulk(
+    data: schemas.FavoriteLinks,
+    current_user: auth.AuthUser = Depends(auth.get_current_user),
+    db: Session = Depends(database.get_db)
+):
+    """Remove many favorites by link; links that were not favorited are ignored"""
+    _check_bulk_size(len(data.links))
+    removed = favorites.remove_favorites(db, current_user.id, data.links)
+    return {"version": favorites.current_version(db, current_user.id), "added": [], "removed": removed}
 
 
 @app.delete("/favorites")
 def remove_favorite(
     feed_link: str,
-    current_user: models.User = Depends(auth.get_current_user),
+    current_user: auth.AuthUser = Depends(auth.get_current_user),
     db: Session = Depends(database.get_db)
 ):
     """Remove a feed item from favorites"""
-    favorite = db.query(models. Favorite).filter(
-        models. Favorite.user_id == current_user.id,
-        models.Favorite.feed_link == feed_link
-    ).first()
-    
-    if not favorite: 
+    if not favorites.remove_favorites(db, current_user.id, [feed_link]):
         raise HTTPException(status_code=404, detail="Favorite not found")
-    
-    db.delete(favorite)
-    db.commit()
     return {"message": "Favorite removed"}
+
+
+# Module import time, reported at startup: mostly FastAPI and SQLAlchemy themselves
+_import_seconds = time.perf_counter() - _import_started
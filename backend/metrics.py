@@ -0,0 +1,188 @@
+"""
+Process metrics in the Prometheus text exposition format, served at /metrics.
+
+Counters, gauges and histograms are kept in memory per worker process; a
+scrape of each worker (or a multiprocess-aware proxy) aggregates them.
+Recording is a dict update under a lock, cheap enough for the request path.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Tuple
+
+# Seconds; upstream fetches run from tens of milliseconds to the fetch deadline
+LATENCY_BUCKETS = (0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30)
+# Seconds; in-process work such as parsing a feed or sorting a page
+CPU_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1)
+
+_registry: List["_Metric"] = []
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class _Metric:
+    type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[tuple, object] = {}
+        _registry.append(self)
+
+    def _key(self, labels: dict) -> tuple:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                    for key, value in self._values.items()]
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        return "\n".join(lines + self._samples())
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    type = "gauge"
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    @contextmanager
+    def track(self, **labels):
+        """Count the block as in progress while it runs."""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # [count per bucket..., sum]
+                state = self._values[key] = [0] * len(self.buckets) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+                    break
+            state[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe how long the block took, also when it raises."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            values = {key: list(state) for key, state in self._values.items()}
+        lines = []
+        for key, state in values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, state):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(state[-1])}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+def render() -> str:
+    """Every registered metric in the text exposition format."""
+    return "\n".join(metric.render() for metric in _registry) + "\n"
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+# Upstream sources (feeds.fetch_feed_for_source)
+SOURCE_FETCH_SECONDS = Histogram(
+    "devpulse_source_fetch_seconds", "Time to fetch and parse one source, including failures.", ("source",))
+SOURCE_FETCHES = Counter(
+    "devpulse_source_fetches_total",
+    "Source fetches by outcome: ok, error, circuit_open, or last_good when stale items were served.",
+    ("source", "outcome"))
+SOURCE_FETCHES_IN_FLIGHT = Gauge(
+    "devpulse_source_fetches_in_flight", "Source fetches currently running.", ("source",))
+SOURCE_CIRCUITS_OPEN = Gauge(
+    "devpulse_source_circuits_open",
+    "Circuit breakers of the source that are open or half-open (custom subreddits have their own).",
+    ("source",))
+
+# Upstream HTTP (http_client.HttpClient)
+UPSTREAM_ERRORS = Counter(
+    "devpulse_upstream_errors_total",
+    "Upstream HTTP responses with status >= 400 by status code, and failed requests by error kind.",
+    ("host", "status"))
+
+# Feed cache (cache.TieredCache); family is the key prefix, e.g. feed:raw
+CACHE_LOOKUPS = Counter(
+    "devpulse_cache_lookups_total",
+    "Feed cache lookups by key family and result: local_hit, redis_hit, stale, miss or coalesced.",
+    ("family", "result"))
+
+# In-process work
+PARSE_SECONDS = Histogram(
+    "devpulse_parse_seconds", "Time spent parsing upstream payloads.", ("parser",), CPU_BUCKETS)
+SORT_SECONDS = Histogram(
+    "devpulse_sort_seconds", "Time spent ranking feed items.", ("sort",), CPU_BUCKETS)
+DEDUP_SECONDS = Histogram(
+    "devpulse_dedup_seconds", "Time spent merging the same story across sources.", (), CPU_BUCKETS)
+
+# Process (main.lifespan): import is loading the app module, startup the lifespan setup before serving
+STARTUP_SECONDS = Gauge(
+    "devpulse_startup_seconds", "Seconds this worker spent starting, by phase: import or startup.", ("phase",))
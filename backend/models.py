@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text, JSON, UniqueConstraint, Index
 from sqlalchemy.sql import func
 from database import Base
 
@@ -26,6 +26,12 @@ class Source(Base):
 
 class Favorite(Base):
     __tablename__ = "favorites"
+    __table_args__ = (
+        # One row per user and link; adds are upserts against this index
+        Index("uq_favorites_user_link", "user_id", "feed_link", unique=True),
+        # Keyset pagination: newest first within a user
+        Index("ix_favorites_user_id_id", "user_id", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), index=True)
@@ -35,3 +41,42 @@ class Favorite(Base):
     feed_published = Column(String, nullable=True)
     feed_summary = Column(Text, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class FavoriteChange(Base):
+    """Change log behind /favorites/links?since=: the id is the version.
+    Only the latest change per (user, link) is kept."""
+    __tablename__ = "favorite_changes"
+    __table_args__ = (
+        Index("ix_favorite_changes_user_id_id", "user_id", "id"),
+        Index("ix_favorite_changes_user_link", "user_id", "feed_link"),
+        # Never reuse ids of deleted rows, or a client could miss a change
+        {"sqlite_autoincrement": True},
+    )
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    feed_link = Column(String, nullable=False)
+    removed = Column(Boolean, nullable=False, default=False)
+    changed_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class FeedItem(Base):
+    __tablename__ = "feed_items"
+    # The same link can legitimately appear on several sources (HN, Lobste.rs, ...)
+    __table_args__ = (
+        UniqueConstraint("source_id", "link", name="uq_feed_items_source_link"),
+        # Latest batch per source (load_latest_items) and retention pruning
+        Index("ix_feed_items_source_seen", "source_id", "last_seen_at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    source_id = Column(Integer, ForeignKey("sources.id"), index=True)
+    link = Column(String, nullable=False)
+    title = Column(String)
+    published = Column(String, nullable=True)  # As reported upstream, returned to clients verbatim
+    published_at = Column(DateTime(timezone=True), nullable=True, index=True)
+    summary = Column(Text, nullable=True)
+    extra = Column(JSON, nullable=True)
+    upvotes = Column(Integer, default=0)  # Hot-ranking score, precomputed at ingest
+    position = Column(Integer)  # Rank within the latest upstream response
+    first_seen_at = Column(DateTime(timezone=True), server_default=func.now())
+    last_seen_at = Column(DateTime(timezone=True), index=True)
@@ -0,0 +1,114 @@
+import html
+import re
+from html.entities import html5
+from typing import Iterable, List
+
+# Visible characters kept from a summary
+SUMMARY_LIMIT = 500
+
+# One alternation per markup construct; the text between matches is content.
+# Mirrors what BeautifulSoup's html.parser + get_text() keeps and drops:
+# comments, declarations/PIs, and script/style/template bodies are dropped,
+# CDATA content is kept, and each construct ends the current string - except
+# "</>", which is skipped without one. A construct that is never closed is
+# kept as raw text up to the next ">" (or "<"), part of the string around
+# it ("literal"), which is what html.parser falls back to at end of input.
+_MARKUP_RE = re.compile(
+    r"""
+    <(?:
+      (?P<raw>script|style|template)\b(?:[^>"']|"[^"]*"|'[^']*')*>.*?(?:</\s*(?P=raw)\s*>|\Z)
+    | [a-zA-Z][^\s/>]*(?:[^>"']|"[^"]*"|'[^']*')*>
+    | /[a-zA-Z][^>]*>
+    | !--.*?--\s*>
+    | !\[CDATA\[(?P<cdata>.*?)\]\s*\]\s*>
+    | (?P<empty>/>)
+    | /[^a-zA-Z>][^>]*>
+    | (?!!--|!\[CDATA\[)[!?][^>]*>
+    | (?P<literal>(?=[a-zA-Z/!?])(?:[^>]*>|[^<>]*(?=<))?)
+    )
+    """,
+    re.S | re.I | re.X,
+)
+
+
+# Character references as html.parser sees them: a named reference is the
+# whole alphanumeric run, so "&ampfoo" is left alone instead of becoming "&foo"
+_ENTITY_RE = re.compile(r"&(#[0-9]+;?|#[xX][0-9a-fA-F]+;?|[a-zA-Z][a-zA-Z0-9]*;?)")
+
+
+def _decode_entity(match: re.Match) -> str:
+    ref = match.group(1)
+    if ref[0] == "#":
+        return html.unescape(match.group(0))
+    name = ref.rstrip(";")
+    char = html5.get(name + ";")
+    # Unknown names come out as "&name", dropping any ";" - what BeautifulSoup did
+    return char if char is not None else "&" + name
+
+
+def _decode_entity_at_eof(match: re.Match) -> str:
+    # html.parser leaves an unterminated reference at the very end of input as-is
+    if match.end() == len(match.string) and not match.group(0).endswith(";"):
+        return match.group(0)
+    return _decode_entity(match)
+
+
+def _unescape(text: str, at_eof: bool = False) -> str:
+    if "&" not in text:
+        return text
+    return _ENTITY_RE.sub(_decode_entity_at_eof if at_eof else _decode_entity, text)
+
+
+def html_to_text(text: str, limit: int = SUMMARY_LIMIT) -> str:
+    """
+    Strip tags and decode entities, stopping once `limit` characters of text
+    are collected, without building a tree or scanning past the part that is
+    kept. For well-formed markup the output is the same as
+    BeautifulSoup(text, "html.parser").get_text(separator=" ", strip=True)[:limit]
+    and so it is for unclosed comments and CDATA sections and "</ p>"-style
+    end tags, as Python 3.11's html.parser reads them. Start tags with
+    unbalanced quotes and misnested <template> content can still differ.
+    """
+    if not text:
+        return ""
+    if "<" not in text:
+        return _unescape(text, at_eof=True).strip()[:limit]
+
+    parts = []
+    size = -1  # length of " ".join(parts)
+    run = ""  # text before pos that belongs to the next string, see "literal"
+    pos = 0
+    for match in _MARKUP_RE.finditer(text):
+        kind = match.lastgroup
+        start = match.start()
+        if kind == "literal" or kind == "empty":
+            run += _unescape(text[pos:start]) + (match.group() if kind == "literal" else "")
+            pos = match.end()
+            continue
+        if start > pos or run:
+            piece = (run + _unescape(text[pos:start])).strip()
+            run = ""
+            if piece:
+                parts.append(piece)
+                size += len(piece) + 1
+                if size >= limit:
+                    return " ".join(parts)[:limit]
+        if kind == "cdata":
+            cdata = match.group("cdata").strip()
+            if cdata:
+                parts.append(cdata)
+                size += len(cdata) + 1
+                if size >= limit:
+                    return " ".join(parts)[:limit]
+        pos = match.end()
+
+    tail = (run + _unescape(text[pos:], at_eof=True)).strip()
+    if tail:
+        parts.append(tail)
+    return " ".join(parts)[:limit]
+
+
+def html_to_text_batch(texts: Iterable[str], limit: int = SUMMARY_LIMIT) -> List[str]:
+    """html_to_text over many summaries, e.g. every entry of one feed."""
+    convert = html_to_text
+    return [convert(text, limit) for text in texts]
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 
 class UserBase(BaseModel):
@@ -70,6 +70,16 @@ class FavoriteCreate(BaseModel):
     feed_summary: Optional[str] = None
 
 
+class FavoriteLinks(BaseModel):
+    links: List[str]
+
+
+class FavoritesDelta(BaseModel):
+    version: int
+    added: List[str]
+    removed: List[str]
+
+
 class FavoriteResponse(BaseModel):
     id: int
     user_id: int
@@ -82,3 +92,8 @@ class FavoriteResponse(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class SearchResults(BaseModel):
+    items: List[FeedItemResponse]
+    favorites: List[FavoriteResponse]
@@ -0,0 +1,184 @@
+"""
+Full-text search over ingested feed items and favorites.
+
+SQLite uses FTS5 tables kept in sync with their base tables by triggers;
+Postgres uses GIN indexes on weighted tsvector expressions, which the
+database maintains itself. Either way new items become searchable as the
+ingestion worker writes them, and titles rank above summaries.
+"""
+import logging
+import re
+from typing import List, Optional
+
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+
+import models
+
+logger = logging.getLogger(__name__)
+
+SEARCH_MAX_LIMIT = 50
+
+# Indexed tables: table -> (title column, body column)
+INDEXED = {
+    "feed_items": ("title", "summary"),
+    "favorites": ("feed_title", "feed_summary"),
+}
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+# Set by ensure_index, or by available() in workers that did not run it;
+# False when this SQLite build has no FTS5
+_available = None
+
+
+def _pg_vector(table: str, alias: str = "") -> str:
+    """The indexed expression; queries must use the same one for the GIN index to apply."""
+    title, body = INDEXED[table]
+    prefix = f"{alias}." if alias else ""
+    return (f"(setweight(to_tsvector('english', coalesce({prefix}{title}, '')), 'A') || "
+            f"setweight(to_tsvector('english', coalesce({prefix}{body}, '')), 'B'))")
+
+
+def _sqlite_statements(table: str) -> List[str]:
+    title, body = INDEXED[table]
+    fts = f"{table}_fts"
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({title}, {body}, content='{table}', content_rowid='id', "
+        f"tokenize='porter unicode61')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {fts}(rowid, {title}, {body}) VALUES (new.id, new.{title}, new.{body}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {title}, {body}) VALUES ('delete', old.id, old.{title}, old.{body}); END",
+        # Re-polls rewrite every row; only re-index when the text changed
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {title}, {body} ON {table} "
+        f"WHEN old.{title} IS NOT new.{title} OR old.{body} IS NOT new.{body} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {title}, {body}) VALUES ('delete', old.id, old.{title}, old.{body}); "
+        f"INSERT INTO {fts}(rowid, {title}, {body}) VALUES (new.id, new.{title}, new.{body}); END",
+        # Index rows written before the table existed
+        f"INSERT INTO {fts}({fts}) VALUES ('rebuild')",
+    ]
+
+
+def ensure_index(engine) -> bool:
+    """Create the search index if it does not exist yet. Returns whether search is available."""
+    global _available
+    dialect = engine.dialect.name
+    if dialect == "postgresql":
+        try:
+            with engine.begin() as conn:
+                for table in INDEXED:
+                    conn.execute(text(
+                        f"CREATE INDEX IF NOT EXISTS ix_{table}_search ON {table} USING GIN ({_pg_vector(table)})"
+                    ))
+            _available = True
+        except DBAPIError as e:
+            if "to_tsvector" not in str(e) and "tsvector" not in str(e):
+                raise
+            logger.warning(f"⚠️ Full-text search unavailable (no tsvector support): {e}")
+            _available = False
+    elif dialect == "sqlite":
+        existing = set(inspect(engine).get_table_names())
+        try:
+            # IF NOT EXISTS throughout: workers starting together may all get here
+            with engine.begin() as conn:
+                for table in INDEXED:
+                    if f"{table}_fts" in existing:
+                        continue
+                    for statement in _sqlite_statements(table):
+                        conn.execute(text(statement))
+                    logger.info(f"✅ Built search index for {table}")
+            _available = True
+        except DBAPIError as e:
+            if "no such module: fts5" not in str(e):
+                raise
+            logger.warning(f"⚠️ Full-text search unavailable (SQLite without FTS5): {e}")
+            _available = False
+    else:
+        _available = False
+    return _available
+
+
+def available(engine=None) -> bool:
+    """Whether search works; without an ensure_index in this process, checks the engine for the index."""
+    global _available
+    if _available is None and engine is not None:
+        dialect = engine.dialect.name
+        if dialect == "postgresql":
+            # The GIN index only speeds queries up; the tsvector expressions work without it
+            _available = True
+        elif dialect == "sqlite":
+            existing = set(inspect(engine).get_table_names())
+            _available = all(f"{table}_fts" in existing for table in INDEXED)
+        else:
+            _available = False
+    return bool(_available)
+
+
+def _fts5_query(query: str) -> Optional[str]:
+    """User input as an FTS5 expression: every word must match, the last one as a prefix."""
+    tokens = _TOKEN_RE.findall(query)
+    if not tokens:
+        return None
+    return " ".join(f'"{token}"' for token in tokens[:-1]) + f' "{tokens[-1]}"*'
+
+
+def _matching_ids(db: Session, table: str, query: str, limit: int, user_id: Optional[int] = None) -> List[int]:
+    """Ids of the best matches in table, best first."""
+    user_filter = "AND t.user_id = :user_id" if user_id is not None else ""
+    order_time = "t.published_at DESC" if table == "feed_items" else "t.created_at DESC"
+    if db.bind.dialect.name == "postgresql":
+        vector = _pg_vector(table, "t")
+        sql = (
+            f"SELECT t.id FROM {table} t, websearch_to_tsquery('english', :query) q "
+            f"WHERE {vector} @@ q {user_filter} "
+            f"ORDER BY ts_rank({vector}, q) DESC, {order_time} NULLS LAST LIMIT :limit"
+        )
+        params = {"query": query, "limit": limit}
+    else:
+        match = _fts5_query(query)
+        if match is None:
+            return []
+        fts = f"{table}_fts"
+        sql = (
+            f"SELECT t.id FROM {fts} JOIN {table} t ON t.id = {fts}.rowid "
+            f"WHERE {fts} MATCH :query {user_filter} "
+            f"ORDER BY bm25({fts}, 10.0, 1.0), {order_time} LIMIT :limit"
+        )
+        params = {"query": match, "limit": limit}
+    if user_id is not None:
+        params["user_id"] = user_id
+    return [row[0] for row in db.execute(text(sql), params)]
+
+
+def search_items(db: Session, query: str, limit: int) -> List[dict]:
+    """Ingested items matching query, as feed item dicts in rank order."""
+    ids = _matching_ids(db, "feed_items", query, limit)
+    if not ids:
+        return []
+    rows = {
+        row.id: (row, source_name) for row, source_name in
+        db.query(models.FeedItem, models.Source.name)
+        .join(models.Source, models.Source.id == models.FeedItem.source_id)
+        .filter(models.FeedItem.id.in_(ids))
+    }
+    items = []
+    for item_id in ids:
+        if item_id not in rows:
+            continue
+        row, source_name = rows[item_id]
+        items.append({
+            "title": row.title, "link": row.link, "source": source_name,
+            "published": row.published, "summary": row.summary, "extra": row.extra,
+        })
+    return items
+
+
+def search_favorites(db: Session, user_id: int, query: str, limit: int) -> List[models.Favorite]:
+    """The user's favorites matching query, in rank order."""
+    ids = _matching_ids(db, "favorites", query, limit, user_id)
+    if not ids:
+        return []
+    rows = {row.id: row for row in db.query(models.Favorite).filter(models.Favorite.id.in_(ids))}
+    return [rows[i] for i in ids if i in rows]
@@ -1,116 +1,182 @@
+"""
+Database setup: schema, indexes and the default sources.
+
+Run once per deploy, before the API workers start (docker-entrypoint.sh does):
+
+    python seeds.py
+
+Importing this module has no side effects and does not touch the
+database; SOURCES is the one list of default sources, also used by the
+API's startup setup (DB_AUTO_SETUP) and the benchmarks.
+"""
+import logging
+import time
+
+from sqlalchemy.exc import IntegrityError, OperationalError, ProgrammingError
 from sqlalchemy.orm import Session
-from database import SessionLocal, engine
-import models
 
-# Create tables if they don't exist
-models.Base.metadata.create_all(bind=engine)
+logger = logging.getLogger(__name__)
 
-def seed_sources():
-    db = SessionLocal()
-    
-    sources_data = [
-        # 1. News & Discussions
-        {
-            "name": "Hacker News",
-            "url": "https://hacker-news.firebaseio.com/v0/",
-            "feed_type": "API",
-            "category": "News & Discussions",
-            "icon": "Y"
-        },
-        {
-            "name": "Reddit",
-            "url": "https://www.reddit.com/r/learnprogramming/.rss",
-            "feed_type": "RSS",
-            "category": "News & Discussions",
-            "icon": "reddit"
-        },
-        {
-            "name": "Lobste.rs",
-            "url": "https://lobste.rs/hottest.json",
-            "feed_type": "JSON",
-            "category": "News & Discussions",
-            "icon": "lobster"
-        },
-        {
-            "name": "Techmeme",
-            "url": "https://www.techmeme.com/feed.xml",
-            "feed_type": "RSS",
-            "category": "News & Discussions",
-            "icon": "techmeme"
-        },
-        {
-            "name": "Ars Technica",
-            "url": "https://feeds.arstechnica.com/arstechnica/index",
-            "feed_type": "RSS",
-            "category": "News & Discussions",
-            "icon": "ars"
-        },
-        {
-            "name": "Slashdot",
-            "url": "http://rss.slashdot.org/Slashdot/slashdot",
-            "feed_type": "RSS",
-            "category": "News & Discussions",
-            "icon": "slashdot"
-        },
-        
-        # 2. Code, Tools & Products
-        {
-            "name": "GitHub Trending",
-            "url": "https://github.com/trending",
-            "feed_type": "Scraping",
-            "category": "Code, Tools & Products",
-            "icon": "github"
-        },
-        {
-            "name": "Product Hunt",
-            "url": "https://www.producthunt.com/feed",
-            "feed_type": "RSS",
-            "category": "Code, Tools & Products",
-            "icon": "producthunt"
-        },
-        {
-            "name": "The Changelog",
-            "url": "https://changelog.com/feed",
-            "feed_type": "RSS",
-            "category": "Code, Tools & Products",
-            "icon": "changelog"
-        },
-
-        # 3. Knowledge & Tutorials
-        {
-            "name": "Tech Blog",
-            "url": "https://medium.com/feed/netflix-techblog",
-            "feed_type": "RSS",
-            "category": "Knowledge & Tutorials",
-            "icon": "techblog"
-        },
-        {
-            "name": "DEV.to",
-            "url": "https://dev.to/api/articles",
-            "feed_type": "API",
-            "category": "Knowledge & Tutorials",
-            "icon": "dev"
-        },
-        {
-            "name": "HackerNoon",
-            "url": "https://hackernoon.com/feed",
-            "feed_type": "RSS",
-            "category": "Knowledge & Tutorials",
-            "icon": "hackernoon"
-        }
-    ]
-
-    for source in sources_data:
-        exists = db.query(models.Source).filter(models.Source.name == source["name"]).first()
-        if not exists:
-            new_source = models.Source(**source)
-            db.add(new_source)
-            print(f"Added {source['name']}")
-        else:
-            print(f"Skipped {source['name']} (already exists)")
+SOURCES = [
+    # 1. News & Discussions
+    {
+        "name": "Hacker News",
+        "url": "https://hacker-news.firebaseio.com/v0/",
+        "feed_type": "API",
+        "category": "News & Discussions",
+        "icon": "Y"
+    },
+    {
+        "name": "Reddit",
+        "url": "https://www.reddit.com/r/learnprogramming/.rss",
+        "feed_type": "RSS",
+        "category": "News & Discussions",
+        "icon": "reddit"
+    },
+    {
+        "name": "Lobste.rs",
+        "url": "https://lobste.rs/hottest.json",
+        "feed_type": "JSON",
+        "category": "News & Discussions",
+        "icon": "lobster"
+    },
+    {
+        "name": "Techmeme",
+        "url": "https://www.techmeme.com/feed.xml",
+        "feed_type": "RSS",
+        "category": "News & Discussions",
+        "icon": "techmeme"
+    },
+    {
+        "name": "Ars Technica",
+        "url": "https://feeds.arstechnica.com/arstechnica/index",
+        "feed_type": "RSS",
+        "category": "News & Discussions",
+        "icon": "ars"
+    },
+    {
+        "name": "Slashdot",
+        "url": "http://rss.slashdot.org/Slashdot/slashdot",
+        "feed_type": "RSS",
+        "category": "News & Discussions",
+        "icon": "slashdot"
+    },
     
+    # 2. Code, Tools & Products
+    {
+        "name": "GitHub Trending",
+        "url": "https://github.com/trending",
+        "feed_type": "Scraping",
+        "category": "Code, Tools & Products",
+        "icon": "github"
+    },
+    {
+        "name": "Product Hunt",
+        "url": "https://www.producthunt.com/feed",
+        "feed_type": "RSS",
+        "category": "Code, Tools & Products",
+        "icon": "producthunt"
+    },
+    {
+        "name": "The Changelog",
+        "url": "https://changelog.com/feed",
+        "feed_type": "RSS",
+        "category": "Code, Tools & Products",
+        "icon": "changelog"
+    },
+
+    # 3. Knowledge & Tutorials
+    {
+        "name": "Tech Blog",
+        "url": "https://medium.com/feed/netflix-techblog",
+        "feed_type": "RSS",
+        "category": "Knowledge & Tutorials",
+        "icon": "techblog"
+    },
+    {
+        "name": "DEV.to",
+        "url": "https://dev.to/api/articles",
+        "feed_type": "API",
+        "category": "Knowledge & Tutorials",
+        "icon": "dev"
+    },
+    {
+        "name": "HackerNoon",
+        "url": "https://hackernoon.com/feed",
+        "feed_type": "RSS",
+        "category": "Knowledge & Tutorials",
+        "icon": "hackernoon"
+    }
+]
+
+
+def seed_sources(db: Session) -> int:
+    """
+    Add the SOURCES that are not in the database yet; returns how many were added.
+    Safe to run from several processes at once: a source another one inserted
+    first is skipped.
+    """
+    import database
+    import models
+    existing = {name for (name,) in db.query(models.Source.name)}
+    missing = [source for source in SOURCES if source["name"] not in existing]
+    if not missing:
+        return 0
+    insert = database.dialect_insert()
+    if insert is not None:
+        added = db.execute(
+            insert(models.Source).values(missing).on_conflict_do_nothing(index_elements=["name"])
+        ).rowcount
+    else:
+        added = 0
+        for source in missing:
+            try:
+                with db.begin_nested():
+                    db.add(models.Source(**source))
+                added += 1
+            except IntegrityError:
+                pass
     db.commit()
-    db.close()
+    return max(added, 0)
+
+
+def _create_all(engine):
+    """create_all, tolerating another process creating the same tables at the same time."""
+    import models
+    for attempt in range(3):
+        try:
+            models.Base.metadata.create_all(bind=engine)
+            return
+        except (OperationalError, ProgrammingError) as e:
+            # checkfirst saw no table, then the CREATE lost the race; the next pass skips it
+            if "already exists" not in str(e) or attempt == 2:
+                raise
+
+
+def setup_database(engine=None):
+    """Create tables, indexes and the search index, then seed sources. Safe to re-run,
+    including from several workers starting together."""
+    # Imported here so that importing seeds (e.g. for SOURCES) does not create the engine
+    import database
+    import favorites
+    import ingest
+    import search
+
+    engine = engine or database.engine
+    started = time.perf_counter()
+    _create_all(engine)
+    favorites.ensure_indexes(engine)
+    ingest.ensure_indexes(engine)
+    search.ensure_index(engine)
+    db = Session(bind=engine)
+    try:
+        added = seed_sources(db)
+    finally:
+        db.close()
+    logger.info(f"✨ Database ready in {(time.perf_counter() - started) * 1000:.0f} ms ({added} sources added)")
+
 
 if __name__ == "__main__":
-    seed_sources()
+    import logs
+    logs.configure()
+    setup_database()
@@ -0,0 +1,35 @@
+import os
+import sys
+import tempfile
+import uuid
+
+import pytest
+
+# Tests import the backend's flat modules the way the app does
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("INGEST_ENABLED", "0")
+# App tests get a throwaway database and the in-process cache only, never the dev ones
+os.environ["DATABASE_URL"] = os.getenv("TEST_DATABASE_URL") or (
+    "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="devpulse-tests-"), "test.db")
+)
+os.environ["REDIS_URL"] = ""
+
+
+@pytest.fixture(scope="session")
+def client():
+    """The app with its startup run (schema, search index, sources)."""
+    from fastapi.testclient import TestClient
+
+    import main
+    with TestClient(main.app) as client:
+        yield client
+
+
+@pytest.fixture
+def auth_headers(client):
+    """Authorization headers for a newly registered user."""
+    name = f"user-{uuid.uuid4().hex[:12]}"
+    resp = client.post("/register", json={"username": name, "email": f"{name}@example.com", "password": "secret-pw"})
+    assert resp.status_code == 200, resp.text
+    token = client.post("/login", json={"username": name, "password": "secret-pw"}).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
@@ -0,0 +1,56 @@
+import auth
+import database
+import models
+
+
+def current_user_id(client, headers) -> int:
+    return client.get("/me", headers=headers).json()["id"]
+
+
+def test_me_is_served_from_the_user_cache(client, auth_headers):
+    user_id = current_user_id(client, auth_headers)
+    db = database.SessionLocal()
+    try:
+        # Changed behind the app's back: the cached snapshot is still served
+        db.get(models.User, user_id).email = "changed@example.com"
+        db.commit()
+        assert client.get("/me", headers=auth_headers).json()["email"] != "changed@example.com"
+
+        auth.invalidate_user(user_id)
+        assert client.get("/me", headers=auth_headers).json()["email"] == "changed@example.com"
+    finally:
+        db.close()
+
+
+def test_deleted_user_is_rejected_once_invalidated(client, auth_headers):
+    user_id = current_user_id(client, auth_headers)
+    db = database.SessionLocal()
+    try:
+        db.delete(db.get(models.User, user_id))
+        db.commit()
+    finally:
+        db.close()
+    auth.invalidate_user(user_id)
+    assert client.get("/me", headers=auth_headers).status_code == 401
+
+
+def test_preference_update_refreshes_the_cache(client, auth_headers):
+    client.get("/me", headers=auth_headers)
+    resp = client.put("/subreddit", json={"subreddit": "r/python"}, headers=auth_headers)
+    assert resp.json()["subreddit"] == "python"
+    assert client.get("/me", headers=auth_headers).json()["preferred_subreddit"] == "python"
+
+
+def test_invalid_subreddit_preference_is_rejected(client, auth_headers):
+    resp = client.put("/subreddit", json={"subreddit": "not a/subreddit"}, headers=auth_headers)
+    assert resp.status_code == 400
+
+
+def test_cached_user_must_match_the_token_name(client, auth_headers):
+    user_id = current_user_id(client, auth_headers)
+    token = auth.create_access_token({"sub": "someone-else", "uid": user_id})
+    assert client.get("/me", headers={"Authorization": f"Bearer {token}"}).status_code == 401
+
+
+def test_bad_token_is_rejected(client):
+    assert client.get("/me", headers={"Authorization": "Bearer nonsense"}).status_code == 401
@@ -0,0 +1,239 @@
+import threading
+import time
+
+import pytest
+
+import cache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class FakeRedis:
+    """The Redis commands TieredCache uses, expiring keys on the fake clock."""
+
+    def __init__(self, clock: FakeClock):
+        self.clock = clock
+        self.data = {}  # key -> (value, expires_at)
+
+    def _live(self, key):
+        entry = self.data.get(key)
+        if entry and entry[1] <= self.clock.now:
+            del self.data[key]
+            return None
+        return entry
+
+    def get(self, key):
+        entry = self._live(key)
+        return entry[0] if entry else None
+
+    def mget(self, keys):
+        return [self.get(key) for key in keys]
+
+    def pttl(self, key):
+        entry = self._live(key)
+        return int((entry[1] - self.clock.now) * 1000) if entry else -2
+
+    def setex(self, key, seconds, value):
+        self.data[key] = (value, self.clock.now + seconds)
+
+    def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, redis: FakeRedis):
+        self.redis = redis
+        self.calls = []
+
+    def __getattr__(self, name):
+        method = getattr(self.redis, name)
+        return lambda *args: self.calls.append(lambda: method(*args))
+
+    def execute(self):
+        return [call() for call in self.calls]
+
+
+class BrokenRedis:
+    def pipeline(self, transaction=True):
+        raise ConnectionError("redis down")
+
+    def delete(self, *keys):
+        raise ConnectionError("redis down")
+
+
+class InlinePool:
+    def submit(self, fn, *args):
+        fn(*args)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(time, "monotonic", clock)
+    monkeypatch.setattr(cache, "_refresh_pool", InlinePool())
+    return clock
+
+
+def loader(value, ttl=60):
+    calls = []
+
+    def load():
+        calls.append(value)
+        return value, ttl
+
+    load.calls = calls
+    return load
+
+
+def test_local_cache_expires_and_evicts_least_recently_used(clock):
+    local = cache.LocalCache(maxsize=2)
+    local.set("a", 1, ttl=10, soft_ttl=5)
+    local.set("b", 2, ttl=10)
+    assert local.get_entry("a") == (1, True)
+    clock.now += 6
+    assert local.get_entry("a") == (1, False)
+    local.set("c", 3, ttl=10)  # "b" is the least recently used
+    assert local.get("b") is None and local.get("a") == 1
+    clock.now += 5
+    assert local.get("a") is None
+
+
+def test_single_flight_shares_one_execution():
+    flight = cache.SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    calls, results = [], []
+
+    def slow():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "value"
+
+    leader = threading.Thread(target=lambda: results.append(flight.do("k", slow)))
+    leader.start()
+    started.wait(5)
+    followers = [threading.Thread(target=lambda: results.append(flight.do("k", slow))) for _ in range(3)]
+    for t in followers:
+        t.start()
+    while sum(1 for t in followers if t.is_alive()) < 3:
+        time.sleep(0.001)
+    time.sleep(0.05)
+    release.set()
+    for t in [leader] + followers:
+        t.join(5)
+
+    assert len(calls) == 1
+    assert sorted(results) == [("value", False)] + [("value", True)] * 3
+    assert not flight.in_flight("k")
+
+
+def test_single_flight_raises_the_error_to_every_waiter():
+    flight = cache.SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    errors = []
+
+    def failing():
+        started.set()
+        release.wait(5)
+        raise ValueError("upstream down")
+
+    def call():
+        try:
+            flight.do("k", failing)
+        except ValueError as e:
+            errors.append(str(e))
+
+    threads = [threading.Thread(target=call)]
+    threads[0].start()
+    started.wait(5)
+    threads.append(threading.Thread(target=call))
+    threads[1].start()
+    time.sleep(0.05)
+    release.set()
+    for t in threads:
+        t.join(5)
+    assert errors == ["upstream down", "upstream down"]
+
+
+def test_get_or_load_reads_through_redis(clock):
+    redis = FakeRedis(clock)
+    first = cache.TieredCache(redis)
+    load = loader("payload")
+    assert first.get_or_load("feed:raw:1", load) == "payload"
+
+    # Another worker: empty local tier, same Redis
+    second = cache.TieredCache(redis)
+    assert second.get_or_load("feed:raw:1", load) == "payload"
+    assert load.calls == ["payload"]
+    assert second.stats()["redis_hits"] == 1
+    # Mirrored locally, so the next read does not go to Redis
+    redis.data.clear()
+    assert second.get("feed:raw:1") == "payload"
+
+
+def test_stale_value_is_served_while_one_refresh_runs(clock):
+    tiered = cache.TieredCache(FakeRedis(clock))
+    tiered.get_or_load("feed:raw:1", loader("old"), soft_ttl=10)
+    clock.now += 11
+
+    refresh = loader("new")
+    assert tiered.get_or_load("feed:raw:1", refresh, soft_ttl=10) == "old"
+    assert refresh.calls == ["new"]
+    assert tiered.get_entry("feed:raw:1") == ("new", True)
+    assert tiered.stats()["stale_hits"] == 1
+
+
+def test_failed_refresh_keeps_the_stale_value(clock):
+    tiered = cache.TieredCache()
+    tiered.set("feed:raw:1", "old", ttl=60, soft_ttl=10)
+    clock.now += 11
+
+    def failing():
+        raise RuntimeError("upstream down")
+
+    assert tiered.get_or_load("feed:raw:1", failing, soft_ttl=10) == "old"
+    assert tiered.get_entry("feed:raw:1") == ("old", False)
+    assert tiered.stats()["refresh_errors"] == 1
+
+
+def test_hard_expiry_blocks_on_the_loader(clock):
+    tiered = cache.TieredCache(FakeRedis(clock))
+    tiered.get_or_load("feed:raw:1", loader("old", ttl=30), soft_ttl=10)
+    clock.now += 31
+    assert tiered.get_or_load("feed:raw:1", loader("new"), soft_ttl=10) == "new"
+
+
+def test_get_many_reads_missing_keys_from_redis(clock):
+    redis = FakeRedis(clock)
+    writer = cache.TieredCache(redis)
+    writer.set("feed:raw:1", "one", ttl=60)
+    writer.set("feed:raw:2", "two", ttl=60, soft_ttl=5)
+    clock.now += 6
+
+    reader = cache.TieredCache(redis)
+    reader.local.set("feed:raw:3", "three", ttl=60)
+    assert reader.get_many(["feed:raw:1", "feed:raw:2", "feed:raw:3", "feed:raw:4"]) == {
+        "feed:raw:1": ("one", True),
+        "feed:raw:2": ("two", False),
+        "feed:raw:3": ("three", True),
+    }
+
+
+def test_redis_errors_fall_back_to_the_local_tier(clock):
+    tiered = cache.TieredCache(BrokenRedis())
+    load = loader("payload")
+    assert tiered.get_or_load("feed:raw:1", load) == "payload"
+    assert tiered.get_or_load("feed:raw:1", load) == "payload"
+    tiered.delete("feed:raw:1")
+    assert load.calls == ["payload"]
+    assert tiered.stats()["redis_errors"] >= 2
@@ -0,0 +1,74 @@
+import favorites
+
+
+def favorite(link: str, title: str = "Title") -> dict:
+    return {"feed_link": f"https://example.com/{link}", "feed_title": title, "feed_source": "Test"}
+
+
+def test_saving_again_updates_the_favorite(client, auth_headers):
+    client.post("/favorites", json=favorite("a", "Old title"), headers=auth_headers)
+    resp = client.post("/favorites", json=favorite("a", "New title"), headers=auth_headers)
+    assert resp.status_code == 200 and resp.json()["feed_title"] == "New title"
+
+    rows = client.get("/favorites", headers=auth_headers).json()
+    assert [row["feed_title"] for row in rows] == ["New title"]
+
+
+def test_bulk_add_keeps_the_last_copy_of_a_repeated_link(client, auth_headers):
+    resp = client.post("/favorites/bulk", json=[favorite("a", "first"), favorite("b"), favorite("a", "second")],
+                       headers=auth_headers)
+    assert sorted(resp.json()["added"]) == ["https://example.com/a", "https://example.com/b"]
+    titles = {row["feed_link"]: row["feed_title"] for row in client.get("/favorites", headers=auth_headers).json()}
+    assert titles["https://example.com/a"] == "second"
+
+
+def test_links_delta_since_a_version(client, auth_headers):
+    client.post("/favorites/bulk", json=[favorite("a"), favorite("b")], headers=auth_headers)
+    full = client.get("/favorites/links", headers=auth_headers)
+    version = int(full.headers["X-Favorites-Version"])
+    assert sorted(full.json()) == ["https://example.com/a", "https://example.com/b"]
+
+    client.post("/favorites/bulk", json=[favorite("c")], headers=auth_headers)
+    client.post("/favorites/bulk/remove", json={"links": ["https://example.com/a", "https://example.com/zzz"]},
+                headers=auth_headers)
+    delta = client.get("/favorites/links", params={"since": version}, headers=auth_headers).json()
+    assert delta["added"] == ["https://example.com/c"]
+    assert delta["removed"] == ["https://example.com/a"]
+    assert delta["version"] > version
+
+    # Nothing changed since the new version
+    empty = client.get("/favorites/links", params={"since": delta["version"]}, headers=auth_headers).json()
+    assert empty == {"version": delta["version"], "added": [], "removed": []}
+
+
+def test_removing_then_re_adding_reports_only_the_latest_change(client, auth_headers):
+    version = client.post("/favorites/bulk", json=[favorite("a")], headers=auth_headers).json()["version"]
+    client.delete("/favorites", params={"feed_link": "https://example.com/a"}, headers=auth_headers)
+    client.post("/favorites", json=favorite("a"), headers=auth_headers)
+    delta = client.get("/favorites/links", params={"since": version}, headers=auth_headers).json()
+    assert delta["added"] == ["https://example.com/a"] and delta["removed"] == []
+
+
+def test_keyset_pages_cover_every_favorite_once(client, auth_headers):
+    links = [f"https://example.com/{i}" for i in range(5)]
+    for i in range(5):
+        client.post("/favorites", json=favorite(str(i)), headers=auth_headers)
+
+    seen, params = [], {"limit": 2}
+    while True:
+        resp = client.get("/favorites", params=params, headers=auth_headers)
+        seen += [row["feed_link"] for row in resp.json()]
+        if "X-Next-Cursor" not in resp.headers:
+            break
+        params["cursor"] = resp.headers["X-Next-Cursor"]
+    assert seen == links[::-1]
+
+
+def test_page_limits(client, auth_headers):
+    for limit in (0, favorites.FAVORITES_PAGE_MAX + 1):
+        assert client.get("/favorites", params={"limit": limit}, headers=auth_headers).status_code == 400
+
+
+def test_removing_a_missing_favorite_is_a_404(client, auth_headers):
+    resp = client.delete("/favorites", params={"feed_link": "https://example.com/none"}, headers=auth_headers)
+    assert resp.status_code == 404
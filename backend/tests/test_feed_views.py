@@ -0,0 +1,93 @@
+import pytest
+
+import feeds
+import main
+
+
+def records(*links):
+    # Oldest last, so "new" keeps the given order
+    return [feeds.FeedRecord(f"title {link}", f"https://example.com/{link}", "Test", None, None, None,
+                             1_700_000_000 - i, 0) for i, link in enumerate(links)]
+
+
+@pytest.fixture
+def upstream(client, monkeypatch):
+    """The raw items every source returns; swap upstream.items to simulate a refresh."""
+    class Upstream:
+        items = records("a", "b", "c", "d", "e")
+
+    monkeypatch.setattr(main, "_cached_raw_items", lambda source_id, subreddit=None: list(Upstream.items))
+    main.feed_cache.local.clear()
+    main._snapshots.clear()
+    yield Upstream
+    main.feed_cache.local.clear()
+    main._snapshots.clear()
+
+
+def links(resp):
+    return [it["link"].rsplit("/", 1)[1] for it in resp.json()]
+
+
+def test_pages_cover_the_feed_once(client, upstream):
+    seen, cursor = [], None
+    while True:
+        resp = client.get("/feeds/1", params={"sort": "new", "limit": 2, "cursor": cursor})
+        assert resp.status_code == 200
+        seen += links(resp)
+        cursor = resp.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+    assert seen == ["a", "b", "c", "d", "e"]
+
+
+def test_pages_come_from_one_snapshot(client, upstream):
+    first = client.get("/feeds/1", params={"sort": "new", "limit": 2})
+    # Upstream changes and the view is rebuilt; the cursor stays on the old snapshot
+    upstream.items = records("x", "a", "b", "c", "d", "e")
+    main.feed_cache.delete("feed:view:1:default:new")
+    assert links(client.get("/feeds/1", params={"sort": "new"})) == ["x", "a", "b", "c", "d", "e"]
+
+    second = client.get("/feeds/1", params={"sort": "new", "limit": 2, "cursor": first.headers["X-Next-Cursor"]})
+    assert links(second) == ["c", "d"]
+
+
+def test_expired_snapshot_continues_after_the_last_item_seen(client, upstream):
+    first = client.get("/feeds/1", params={"sort": "new", "limit": 2})
+    upstream.items = records("x", "a", "b", "c", "d", "e")
+    main.feed_cache.local.clear()
+    main._snapshots.clear()
+
+    second = client.get("/feeds/1", params={"sort": "new", "limit": 2, "cursor": first.headers["X-Next-Cursor"]})
+    assert links(second) == ["c", "d"]
+
+
+def test_expired_snapshot_without_the_last_item_is_gone(client, upstream):
+    first = client.get("/feeds/1", params={"sort": "new", "limit": 2})
+    upstream.items = records("x", "y")
+    main.feed_cache.local.clear()
+    main._snapshots.clear()
+
+    resp = client.get("/feeds/1", params={"sort": "new", "limit": 2, "cursor": first.headers["X-Next-Cursor"]})
+    assert resp.status_code == 410
+
+
+@pytest.mark.parametrize("params", [
+    {"cursor": "not-a-cursor"},
+    {"limit": 0},
+    {"limit": main.FEED_PAGE_MAX + 1},
+    {"sort": "top"},
+    {"subreddit": "../../r/x"},
+])
+def test_bad_view_parameters(client, upstream, params):
+    assert client.get("/feeds/1", params=params).status_code == 400
+
+
+def test_incomplete_view_reports_to_every_caller(client, upstream, monkeypatch):
+    def fetch_sources_concurrently(pending, budget_ms, fetch):
+        return {}, {"failed": [], "timed_out": [source["name"] for source in pending], "skipped": []}
+
+    monkeypatch.setattr(feeds, "fetch_sources_concurrently", fetch_sources_concurrently)
+    built = client.get("/feeds", params={"budget_ms": 50})
+    cached = client.get("/feeds", params={"budget_ms": 50, "limit": 5})
+    assert built.headers["X-Feeds-Timed-Out"]
+    assert cached.headers["X-Feeds-Timed-Out"] == built.headers["X-Feeds-Timed-Out"]
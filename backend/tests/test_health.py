@@ -0,0 +1,84 @@
+import time
+
+import pytest
+from fastapi import HTTPException
+
+import health
+import http_client
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(time, "monotonic", clock)
+    return clock
+
+
+def upstream(clock, latency: float):
+    """A fetch taking `latency` seconds that gives up at the current deadline, like http_client does."""
+
+    def fetch():
+        remaining = http_client.current_deadline() - clock.now
+        if latency > remaining:
+            clock.now += remaining
+            raise HTTPException(status_code=502, detail="Read timed out")
+        clock.now += latency
+        return []
+
+    return fetch
+
+
+def _failing():
+    raise HTTPException(status_code=502, detail="Connection refused")
+
+
+def test_source_recovers_after_latency_rises(clock):
+    breaker = health.SourceHealth("Slow")
+    for _ in range(10):
+        breaker.call(upstream(clock, 0.5))
+    assert breaker.timeout() == health.HEALTH_MIN_TIMEOUT
+
+    recovered = False
+    for _ in range(10):
+        try:
+            breaker.call(upstream(clock, 3.0))
+            recovered = True
+            break
+        except HTTPException:
+            clock.now += health.HEALTH_MAX_OPEN_SECONDS
+    assert recovered
+    assert breaker.state == health.CLOSED
+    assert breaker.timeout() > 3.0
+
+
+def test_half_open_trial_gets_the_full_timeout(clock):
+    breaker = health.SourceHealth("Slow")
+    for _ in range(10):
+        breaker.call(upstream(clock, 0.5))
+    for _ in range(health.HEALTH_FAILURE_THRESHOLD):
+        with pytest.raises(HTTPException):
+            breaker.call(_failing)
+    assert breaker.state == health.OPEN
+    with pytest.raises(health.CircuitOpen):
+        breaker.call(upstream(clock, 0.5))
+
+    clock.now = breaker.opened_until
+    breaker.call(upstream(clock, health.HEALTH_MAX_TIMEOUT - 1))
+    assert breaker.state == health.CLOSED
+
+
+def test_user_named_variants_are_bounded():
+    registry = health.HealthRegistry(max_variants=3)
+    source = registry.get("Reddit")
+    for i in range(10):
+        registry.get(f"Reddit r/sub{i}", label="Reddit")
+    assert list(registry.snapshot()) == ["Reddit", "Reddit r/sub7", "Reddit r/sub8", "Reddit r/sub9"]
+    assert registry.get("Reddit") is source
@@ -0,0 +1,30 @@
+import pytest
+
+import sanitize
+
+
+@pytest.mark.parametrize("markup, text", [
+    ("<p>Hello <b>world</b> &amp; friends</p>", "Hello world & friends"),
+    ("a <!-- hidden --> b", "a b"),
+    ("a <![CDATA[ kept ]]> b", "a kept b"),
+    ("a <script>var x = '<b>';</script> b", "a b"),
+    # Never closed: html.parser keeps them as text, up to the next ">"
+    ("a <!-- unterminated comment", "a <!-- unterminated comment"),
+    ("a <!-- x --> b <!--", "a b <!--"),
+    ("a <![CDATA[ kept text", "a <![CDATA[ kept text"),
+    ("<p>a</p><!-- x <p>b</p>", "a <!-- x <p>b"),
+    ("a<!--&amp;>b", "a<!--&amp;>b"),
+    # End tags that do not start with a letter are dropped up to the next ">"
+    ("a </ p> b", "a b"),
+    ("x </ p>y</p>z", "x y z"),
+    ("a </1> b", "a b"),
+    ("a&amp;</>&amp;b", "a&&b"),
+    ("a </ p", "a </ p"),
+    ("a < /p> b", "a < /p> b"),
+])
+def test_html_to_text_matches_beautifulsoup(markup, text):
+    assert sanitize.html_to_text(markup) == text
+
+
+def test_html_to_text_stops_at_limit():
+    assert sanitize.html_to_text("<p>" + "word " * 200 + "</p><!--", limit=20) == ("word " * 200).strip()[:20]
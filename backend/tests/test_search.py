@@ -0,0 +1,93 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import database
+import feeds
+import ingest
+import models
+import search
+
+
+@pytest.fixture
+def word():
+    """A word no other test indexes; the test database is shared."""
+    return f"zq{uuid.uuid4().hex[:10]}"
+
+
+def ingest_items(*items, source_id=1):
+    """(title, summary) pairs written the way the ingestion worker writes them."""
+    records = [feeds.FeedRecord(title, f"https://example.com/{uuid.uuid4().hex}", None, None, summary, None, None, 0)
+               for title, summary in items]
+    db = database.SessionLocal()
+    try:
+        ingest.upsert_items(db, source_id, records, datetime.now(timezone.utc))
+    finally:
+        db.close()
+    return records
+
+
+def found(client, query, **params):
+    resp = client.get("/search", params={"q": query, **params})
+    assert resp.status_code == 200, resp.text
+    return [it["title"] for it in resp.json()["items"]]
+
+
+def test_title_matches_rank_above_summary_matches(client, word):
+    ingest_items(("Unrelated title", f"a long summary that mentions {word} once"), (f"All about {word}", "summary"))
+    assert found(client, word) == [f"All about {word}", "Unrelated title"]
+
+
+def test_last_word_matches_as_a_prefix(client, word):
+    ingest_items((f"{word}ification explained", ""))
+    assert found(client, word) == [f"{word}ification explained"]
+    assert found(client, f"explained {word}") == [f"{word}ification explained"]
+
+
+def test_repolled_and_pruned_items_are_reindexed(client, word):
+    record = ingest_items((f"Old {word} title", ""))[0]
+    record.title = f"New {word}x title"
+    db = database.SessionLocal()
+    try:
+        ingest.upsert_items(db, 1, [record], datetime.now(timezone.utc))
+        assert found(client, f"{word}x") == [f"New {word}x title"]
+        assert found(client, f"old {word}") == []
+
+        db.query(models.FeedItem).filter(models.FeedItem.link == record.link).update(
+            {"last_seen_at": datetime.now(timezone.utc) - timedelta(days=ingest.INGEST_RETENTION_DAYS + 1)}
+        )
+        db.commit()
+        assert ingest.prune_items(db) == 1
+    finally:
+        db.close()
+    assert found(client, f"{word}x") == []
+
+
+def test_favorites_are_searched_for_their_owner_only(client, auth_headers, word):
+    client.post("/favorites", headers=auth_headers, json={
+        "feed_link": f"https://example.com/{word}", "feed_title": f"Saved {word}", "feed_source": "Test",
+    })
+    mine = client.get("/search", params={"q": word}, headers=auth_headers).json()["favorites"]
+    assert [fav["feed_title"] for fav in mine] == [f"Saved {word}"]
+    assert client.get("/search", params={"q": word}).json()["favorites"] == []
+
+
+def test_query_without_words_finds_nothing(client):
+    assert found(client, "!!! ???") == []
+
+
+@pytest.mark.parametrize("params", [{"q": " "}, {"q": "x", "limit": 0}, {"q": "x", "limit": search.SEARCH_MAX_LIMIT + 1}])
+def test_bad_search_parameters(client, params):
+    assert client.get("/search", params=params).status_code == 400
+
+
+def test_ensure_index_is_safe_to_rerun(client, word):
+    assert search.ensure_index(database.engine)
+    ingest_items((f"After rerun {word}", ""))
+    assert found(client, word) == [f"After rerun {word}"]
+
+
+def test_unavailable_index_is_a_503(client, monkeypatch):
+    monkeypatch.setattr(search, "_available", False)
+    assert client.get("/search", params={"q": "anything"}).status_code == 503
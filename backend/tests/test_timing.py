@@ -0,0 +1,29 @@
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+import timing
+
+
+def test_failed_statements_do_not_leak_start_times():
+    engine = create_engine("sqlite://")
+    timing.instrument_engine(engine)
+    with engine.connect() as conn:
+        for _ in range(3):
+            with pytest.raises(OperationalError):
+                conn.execute(text("SELECT * FROM missing_table"))
+        conn.execute(text("SELECT 1"))
+        assert conn.info["timing_query_start"] == []
+
+
+def test_failed_statement_time_counts_as_db():
+    engine = create_engine("sqlite://")
+    timing.instrument_engine(engine)
+    spans = timing.Spans()
+    token = timing._spans.set(spans)
+    try:
+        with engine.connect() as conn, pytest.raises(OperationalError):
+            conn.execute(text("SELECT * FROM missing_table"))
+    finally:
+        timing._spans.reset(token)
+    assert "db" in spans.header(0.01)
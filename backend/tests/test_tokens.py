@@ -0,0 +1,145 @@
+import time
+
+import pytest
+
+import tokens
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float):
+        self.now += seconds
+
+
+class FakeRedis:
+    """The few Redis commands TokenManager uses, expiring keys on the fake clock."""
+
+    def __init__(self, clock: FakeClock):
+        self.clock = clock
+        self.data = {}  # key -> (value, expires_at or None)
+
+    def _live(self, key):
+        value = self.data.get(key)
+        if value and value[1] is not None and value[1] <= self.clock.now:
+            del self.data[key]
+            return None
+        return value
+
+    def get(self, key):
+        value = self._live(key)
+        return value[0] if value else None
+
+    def pttl(self, key):
+        value = self._live(key)
+        if not value:
+            return -2
+        return -1 if value[1] is None else int((value[1] - self.clock.now) * 1000)
+
+    def setex(self, key, seconds, value):
+        self.data[key] = (value, self.clock.now + seconds)
+
+    def set(self, key, value, nx=False, px=None):
+        if nx and self._live(key):
+            return None
+        self.data[key] = (value, self.clock.now + px / 1000 if px else None)
+        return True
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, redis: FakeRedis):
+        self.redis = redis
+        self.calls = []
+
+    def get(self, key):
+        self.calls.append(lambda: self.redis.get(key))
+
+    def pttl(self, key):
+        self.calls.append(lambda: self.redis.pttl(key))
+
+    def execute(self):
+        return [call() for call in self.calls]
+
+
+class InlinePool:
+    def submit(self, fn, *args):
+        fn(*args)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(time, "time", clock.time)
+    monkeypatch.setattr(time, "monotonic", clock.time)
+    monkeypatch.setattr(time, "sleep", clock.sleep)
+    monkeypatch.setattr(tokens, "_refresh_pool", InlinePool())
+    return clock
+
+
+def counting_fetcher():
+    issued = []
+
+    def fetch():
+        issued.append(f"token-{len(issued) + 1}")
+        return issued[-1], 3600
+
+    return fetch, issued
+
+
+def test_refresh_ahead_replaces_the_token_through_redis(clock):
+    manager = tokens.TokenManager(FakeRedis(clock))
+    fetch, issued = counting_fetcher()
+    manager.register("reddit", fetch)
+    assert manager.get("reddit") == "token-1"
+
+    # Inside the refresh-ahead window: the old token is served and a new one fetched behind it
+    clock.now += 3600 - tokens.TOKEN_EXPIRY_MARGIN - tokens.TOKEN_REFRESH_AHEAD + 10
+    assert manager.get("reddit") == "token-1"
+    assert issued == ["token-1", "token-2"]
+
+    # Past the first token's expiry nothing is fetched in the foreground
+    clock.now += tokens.TOKEN_REFRESH_AHEAD
+    assert manager.get("reddit") == "token-2"
+    assert issued == ["token-1", "token-2"]
+
+
+def test_refresh_picks_up_a_newer_token_from_another_worker(clock):
+    redis = FakeRedis(clock)
+    worker_a, worker_b = tokens.TokenManager(redis), tokens.TokenManager(redis)
+    fetch, issued = counting_fetcher()
+    worker_a.register("reddit", fetch)
+    worker_b.register("reddit", fetch)
+    assert worker_a.get("reddit") == "token-1"
+    assert worker_b.get("reddit") == "token-1"
+
+    clock.now += 3600 - tokens.TOKEN_EXPIRY_MARGIN - tokens.TOKEN_REFRESH_AHEAD + 10
+    worker_a.get("reddit")
+    worker_b.get("reddit")
+    assert issued == ["token-1", "token-2"]
+    clock.now += tokens.TOKEN_REFRESH_AHEAD
+    assert worker_b.get("reddit") == "token-2"
+
+
+def test_waiting_worker_does_not_take_the_old_token(clock):
+    redis = FakeRedis(clock)
+    manager = tokens.TokenManager(redis)
+    fetch, issued = counting_fetcher()
+    manager.register("reddit", fetch)
+    manager.get("reddit")
+
+    # Another worker holds the fetch lock and never publishes: fetch after the wait
+    clock.now += 3600 - tokens.TOKEN_EXPIRY_MARGIN - tokens.TOKEN_REFRESH_AHEAD + 10
+    redis.set(f"{manager._key('reddit')}:lock", 1, nx=True, px=tokens.TOKEN_LOCK_WAIT_MS * 10)
+    manager.get("reddit")
+    assert issued == ["token-1", "token-2"]
+    assert manager._tokens["reddit"][0] == "token-2"
@@ -0,0 +1,224 @@
+"""
+Per-request timing breakdown and on-demand profiling.
+
+ServerTimingMiddleware gives every request a span recorder: code on the
+request path wraps its phases in span("name"), and the totals go out in a
+Server-Timing header, e.g.
+
+    Server-Timing: db;dur=2.1;desc="3 calls", fetch;dur=412.8, feedparser;dur=38.0, sort;dur=0.4, total;dur=431.2
+
+Spans from work the request hands to thread pools are included when the
+pool was given the request's context (see feeds.iter_sources_concurrently);
+concurrent spans are summed, so a phase can exceed the total.
+
+With PROFILE_TOKEN set, a request carrying "X-Profile: <token>" is also
+sampled by a wall-clock profiler. The stacks of every busy thread are written
+to PROFILE_DIR in the collapsed format that flamegraph.pl, speedscope and
+inferno read, and the file name is returned in X-Profile-File.
+"""
+import contextvars
+import hmac
+import itertools
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from sqlalchemy import event
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+
+SERVER_TIMING = os.getenv("SERVER_TIMING", "1") == "1"
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN")
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+
+
+class Spans:
+    """Seconds and call counts per phase for one request; safe across threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.totals: Dict[str, list] = {}
+
+    def add(self, name: str, seconds: float):
+        with self._lock:
+            total = self.totals.setdefault(name, [0.0, 0])
+            total[0] += seconds
+            total[1] += 1
+
+    def header(self, total_seconds: float) -> str:
+        with self._lock:
+            totals = list(self.totals.items())
+        parts = []
+        for name, (seconds, count) in totals:
+            part = f"{name};dur={seconds * 1000:.1f}"
+            if count > 1:
+                part += f';desc="{count} calls"'
+            parts.append(part)
+        parts.append(f"total;dur={total_seconds * 1000:.1f}")
+        return ", ".join(parts)
+
+
+_spans = contextvars.ContextVar("request_spans", default=None)
+
+
+@contextmanager
+def span(name: str):
+    """Time the block into the current request's Server-Timing, if there is one."""
+    spans = _spans.get()
+    if spans is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        spans.add(name, time.perf_counter() - start)
+
+
+def instrument_engine(engine):
+    """Record every SQL statement run for a request as the "db" span."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("timing_query_start", []).append(time.perf_counter())
+
+    def _finish(conn):
+        started = conn.info["timing_query_start"].pop()
+        spans = _spans.get()
+        if spans is not None:
+            spans.add("db", time.perf_counter() - started)
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        _finish(conn)
+
+    # A failed statement gets no after_cursor_execute; without this its start
+    # time would stay on the stack of a pooled connection for good
+    @event.listens_for(engine, "handle_error")
+    def _error(exception_context):
+        conn = exception_context.connection
+        # Connect errors and failures before the cursor ran pushed nothing
+        if conn is None or exception_context.execution_context is None:
+            return
+        if conn.info.get("timing_query_start"):
+            _finish(conn)
+
+
+# Leaf frames of threads parked waiting for work, left out of profiles
+_IDLE_FRAMES = {
+    ("threading.py", "wait"), ("selectors.py", "select"), ("thread.py", "_worker"),
+    ("queue.py", "get"), ("socketserver.py", "serve_forever"),
+}
+
+
+class SamplingProfiler(threading.Thread):
+    """Samples the stacks of every busy thread until stopped; writes collapsed stacks."""
+
+    def __init__(self, path: str, interval: float):
+        super().__init__(name="sampling-profiler", daemon=True)
+        self.path = path
+        self.interval = interval
+        self.samples = Counter()
+        self._stop_event = threading.Event()
+
+    def _sample(self):
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == self.ident:
+                continue
+            code = frame.f_code
+            if (os.path.basename(code.co_filename), code.co_name) in _IDLE_FRAMES:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            # Pool threads are numbered; group them by pool
+            thread = re.sub(r"[_-]\d+$", "", names.get(ident, str(ident)))
+            self.samples[";".join([thread] + stack[::-1])] += 1
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            self._sample()
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "w") as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+# One profile at a time: it samples every thread in the process
+_profile_lock = threading.Lock()
+# Keeps file names unique when profiles start within the same millisecond
+_profile_seq = itertools.count()
+
+
+def _start_profiler(scope) -> Optional[SamplingProfiler]:
+    if not PROFILE_TOKEN:
+        return None
+    token = Headers(scope=scope).get("x-profile")
+    if not token or not hmac.compare_digest(token, PROFILE_TOKEN):
+        return None
+    if not _profile_lock.acquire(blocking=False):
+        return None
+    slug = re.sub(r"[^A-Za-z0-9]+", "-", scope["path"]).strip("-") or "root"
+    now = time.time()
+    stamp = f"{time.strftime('%Y%m%d-%H%M%S', time.localtime(now))}.{int(now * 1000) % 1000:03d}"
+    name = f"{stamp}-{scope['method'].lower()}-{slug}-{os.getpid()}-{next(_profile_seq)}.folded"
+    profiler = SamplingProfiler(os.path.join(PROFILE_DIR, name), PROFILE_INTERVAL_MS / 1000)
+    profiler.start()
+    return profiler
+
+
+def _stop_profiler(profiler: SamplingProfiler):
+    try:
+        profiler.stop()
+    finally:
+        _profile_lock.release()
+
+
+class ServerTimingMiddleware:
+    """ASGI middleware adding Server-Timing (and, on request, a profile) to HTTP responses."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        profiler = _start_profiler(scope)
+        if not SERVER_TIMING and profiler is None:
+            await self.app(scope, receive, send)
+            return
+
+        spans = Spans()
+        token = _spans.set(spans)
+        start = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                if SERVER_TIMING:
+                    headers.append("Server-Timing", spans.header(time.perf_counter() - start))
+                if profiler is not None:
+                    headers.append("X-Profile-File", os.path.basename(profiler.path))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _spans.reset(token)
+            # Streamed bodies are profiled to the end
+            if profiler is not None:
+                await run_in_threadpool(_stop_profiler, profiler)
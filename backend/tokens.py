@@ -0,0 +1,195 @@
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional, Tuple
+
+from cache import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# Treat tokens as expired this many seconds before the provider says they are
+TOKEN_EXPIRY_MARGIN = int(os.getenv("TOKEN_EXPIRY_MARGIN", "60"))
+# Refresh in the background once less than this many seconds of validity remain
+TOKEN_REFRESH_AHEAD = int(os.getenv("TOKEN_REFRESH_AHEAD", "300"))
+# Lifetime assumed when a token response has no expires_in
+TOKEN_DEFAULT_TTL = int(os.getenv("TOKEN_DEFAULT_TTL", "3600"))
+# How long other workers wait on the one fetching a token before fetching themselves
+TOKEN_LOCK_WAIT_MS = int(os.getenv("TOKEN_LOCK_WAIT_MS", "2000"))
+
+# Fetcher returns (access_token, expires_in seconds or None)
+TokenFetcher = Callable[[], Tuple[str, Optional[int]]]
+
+_refresh_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="token-refresh")
+
+
+class TokenManager:
+    """
+    Caches OAuth client-credential tokens until shortly before they expire.
+
+    Tokens live in process memory and, when a Redis client is set, under
+    "oauth:token:<name>" so every worker shares one token per provider.
+    Concurrent misses in a process share one fetch; across workers a short
+    Redis lock lets one worker fetch while the others wait for its result.
+    Tokens close to expiry are still handed out while a background refresh
+    replaces them.
+    """
+
+    def __init__(self, redis_client=None):
+        self.redis = redis_client
+        self.flight = SingleFlight()
+        self._fetchers: Dict[str, TokenFetcher] = {}
+        self._tokens: Dict[str, Tuple[str, float, float]] = {}  # name -> (token, expires_at, refresh_at), wall clock
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "redis_hits": 0, "fetches": 0, "refreshes": 0, "errors": 0, "invalidations": 0}
+
+    def register(self, name: str, fetcher: TokenFetcher):
+        self._fetchers[name] = fetcher
+
+    def _count(self, name: str):
+        with self._lock:
+            self._counters[name] += 1
+
+    @staticmethod
+    def _key(name: str) -> str:
+        return f"oauth:token:{name}"
+
+    @staticmethod
+    def _entry(token: str, ttl: float) -> Tuple[str, float, float]:
+        # Short-lived tokens start refreshing halfway through, not right away
+        now = time.time()
+        return token, now + ttl, now + ttl - min(TOKEN_REFRESH_AHEAD, ttl / 2)
+
+    @staticmethod
+    def _newer(entry: Tuple[str, float, float], current: Optional[Tuple[str, float, float]]) -> bool:
+        """Whether a token read from Redis replaces current: a different token, or the same one
+        expiring later. Re-reading the same token recomputes refresh_at, so that is not a test."""
+        if current is None:
+            return entry[1] > time.time()
+        # expires_at is rebuilt from PTTL on every read; allow for the rounding
+        return entry[0] != current[0] or entry[1] > current[1] + 1
+
+    def _redis_read(self, name: str) -> Optional[Tuple[str, float, float]]:
+        if not self.redis:
+            return None
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.get(self._key(name))
+            pipe.pttl(self._key(name))
+            token, ttl_ms = pipe.execute()
+        except Exception as e:
+            logger.warning(f"⚠️ Token cache read error: {e}")
+            return None
+        if token is None or not ttl_ms or ttl_ms <= 0:
+            return None
+        return self._entry(token, ttl_ms / 1000)
+
+    def _fetch(self, name: str) -> Tuple[str, float, float]:
+        """Ask the provider for a new token and publish it to both tiers."""
+        token, expires_in = self._fetchers[name]()
+        if not token:
+            raise ValueError(f"{name} token response had no access_token")
+        ttl = max(int(expires_in or TOKEN_DEFAULT_TTL) - TOKEN_EXPIRY_MARGIN, 1)
+        entry = self._entry(token, ttl)
+        self._count("fetches")
+        with self._lock:
+            self._tokens[name] = entry
+        if self.redis:
+            try:
+                self.redis.setex(self._key(name), ttl, token)
+            except Exception as e:
+                logger.warning(f"⚠️ Token cache write error: {e}")
+        return entry
+
+    def _fetch_shared(self, name: str, current: Optional[Tuple[str, float, float]] = None) -> Tuple[str, float, float]:
+        """_fetch, but only one worker at a time per provider when Redis is available.
+        current is the token being replaced, which waiting for another worker must not return."""
+        if not self.redis:
+            return self._fetch(name)
+        lock_key = f"{self._key(name)}:lock"
+        try:
+            acquired = self.redis.set(lock_key, 1, nx=True, px=TOKEN_LOCK_WAIT_MS)
+        except Exception:
+            acquired = True  # Redis trouble: fetch ourselves
+        if acquired:
+            try:
+                return self._fetch(name)
+            finally:
+                try:
+                    self.redis.delete(lock_key)
+                except Exception:
+                    pass
+        # Another worker is fetching; pick its token up from Redis
+        deadline = time.monotonic() + TOKEN_LOCK_WAIT_MS / 1000
+        while time.monotonic() < deadline:
+            time.sleep(0.05)
+            entry = self._redis_read(name)
+            if entry and entry[1] > time.time() and self._newer(entry, current):
+                with self._lock:
+                    self._tokens[name] = entry
+                return entry
+        return self._fetch(name)
+
+    def _load(self, name: str, refreshing: bool = False) -> Tuple[str, float, float]:
+        # Another worker may already have a token (or, when refreshing, a newer one) in Redis
+        current = self._tokens.get(name) if refreshing else None
+        entry = self._redis_read(name)
+        if entry and self._newer(entry, current):
+            self._count("redis_hits")
+            with self._lock:
+                self._tokens[name] = entry
+            return entry
+        return self._fetch_shared(name, current)
+
+    def _refresh(self, name: str):
+        try:
+            self.flight.do(name, lambda: self._load(name, refreshing=True))
+            self._count("refreshes")
+        except Exception as e:
+            # The current token stays in use until it actually expires
+            self._count("errors")
+            logger.warning(f"⚠️ Background token refresh failed for {name}: {e}")
+
+    def get(self, name: str) -> str:
+        """A valid access token for name, fetching one only when none is cached."""
+        entry = self._tokens.get(name)
+        now = time.time()
+        if entry and entry[1] > now:
+            self._count("hits")
+            if entry[2] <= now and not self.flight.in_flight(name):
+                _refresh_pool.submit(self._refresh, name)
+            return entry[0]
+        try:
+            token = self.flight.do(name, lambda: self._load(name))[0][0]
+        except Exception:
+            self._count("errors")
+            raise
+        return token
+
+    def invalidate(self, name: str, token: Optional[str] = None):
+        """Drop a token the provider rejected. With token, only if it is still the cached one."""
+        with self._lock:
+            entry = self._tokens.get(name)
+            if entry and (token is None or entry[0] == token):
+                del self._tokens[name]
+            else:
+                return
+        self._count("invalidations")
+        if self.redis:
+            try:
+                if token is None or self.redis.get(self._key(name)) == token:
+                    self.redis.delete(self._key(name))
+            except Exception as e:
+                logger.warning(f"⚠️ Token cache delete error: {e}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            counters = dict(self._counters)
+            now = time.time()
+            expires_in = {name: int(entry[1] - now) for name, entry in self._tokens.items()}
+        return {**counters, "expires_in": expires_in, "redis_enabled": self.redis is not None}
+
+
+# Shared manager used by the fetchers; main.py attaches the Redis client
+manager = TokenManager()